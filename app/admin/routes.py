@@ -382,7 +382,8 @@ def reprocess(photo_id):
 @login_required
 def flash_process():
     """Trigger immediate queue processing."""
-    result = process_queue(batch_size=20)
+    # Stay in-process: no worker pool inside a web request
+    result = process_queue(batch_size=20, max_workers=1)
     return jsonify(result)
 
 
@@ -15,6 +15,12 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 PHOTO_STORAGE_ROOT = Path(os.getenv('PHOTO_STORAGE_ROOT', BASE_DIR / 'photos'))
 DATABASE_PATH = Path(os.getenv('DATABASE_PATH', BASE_DIR / 'data' / 'photos.db'))
 
+# SQLite durability/concurrency. NORMAL is safe with WAL (only the last
+# commits can be lost on power failure); OFF speeds up one-off bulk imports.
+DATABASE_SYNCHRONOUS = os.getenv('DATABASE_SYNCHRONOUS', 'NORMAL').upper()
+# Seconds a writer waits for the lock held by another queue worker
+DATABASE_BUSY_TIMEOUT = float(os.getenv('DATABASE_BUSY_TIMEOUT', 30))
+
 # Ensure directories exist
 PHOTO_STORAGE_ROOT.mkdir(parents=True, exist_ok=True)
 DATABASE_PATH.parent.mkdir(parents=True, exist_ok=True)
@@ -32,6 +38,9 @@ IMAP_SERVER = os.getenv('IMAP_SERVER', 'mail.sbnewcomers.org')
 IMAP_PORT = int(os.getenv('IMAP_PORT', '993'))
 IMAP_USER = os.getenv('IMAP_USER', 'photos@sbnewcomers.org')
 IMAP_PASSWORD = os.getenv('IMAP_PASSWORD', '')
+IMAP_FETCH_BATCH_SIZE = int(os.getenv('IMAP_FETCH_BATCH_SIZE', '50'))
+IMAP_MAX_MESSAGE_SIZE = int(os.getenv('IMAP_MAX_MESSAGE_SIZE', str(100 * 1024 * 1024)))
+IMAP_MAX_ATTEMPTS = int(os.getenv('IMAP_MAX_ATTEMPTS', '3'))
 
 # Wild Apricot API
 WA_API_KEY = os.getenv('WA_API_KEY', '')
@@ -43,6 +52,10 @@ WA_AUTH_URL = 'https://oauth.wildapricot.org/auth/token'
 WA_WEBDAV_URL = os.getenv('WA_WEBDAV_URL', '')
 WA_WEBDAV_USER = os.getenv('WA_WEBDAV_USER', '')
 WA_WEBDAV_PASSWORD = os.getenv('WA_WEBDAV_PASSWORD', '')
+# Concurrent uploads per event when exporting (1 uploads serially)
+WA_EXPORT_WORKERS = int(os.getenv('WA_EXPORT_WORKERS', '8'))
+# Concurrent downloads when backing up WA file storage (1 downloads serially)
+WA_SYNC_WORKERS = int(os.getenv('WA_SYNC_WORKERS', '8'))
 
 # Geocoding (optional - for event location matching)
 GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY', '')
@@ -56,15 +69,49 @@ FACE_MATCH_MEDIUM_CONFIDENCE = float(os.getenv('FACE_MATCH_MEDIUM_CONFIDENCE', '
 # For public events, use stricter thresholds
 FACE_MATCH_PUBLIC_EVENT_THRESHOLD = float(os.getenv('FACE_MATCH_PUBLIC_EVENT_THRESHOLD', '0.35'))
 
+# Photos are shrunk to this many pixels on the long side before HOG face
+# detection; embeddings are still computed at full resolution (0 disables)
+FACE_DETECTION_MAX_DIM = int(os.getenv('FACE_DETECTION_MAX_DIM', '1024'))
+
+# Size of the thumbnail scanned to skip photos with no faces before the
+# full-resolution decode (0, the default, disables the prefilter). Faces
+# that shrink below ~80px at this size are missed, so group shots can lose
+# all their faces; only enable it for collections of close-up photos.
+FACE_PREFILTER_SIZE = int(os.getenv('FACE_PREFILTER_SIZE', '0'))
+
+# With at least this many stored embeddings, faces are first matched against
+# an int8 copy of the embedding matrix and only the shortlist is scored exactly
+FACE_QUANTIZED_MIN_EMBEDDINGS = int(os.getenv('FACE_QUANTIZED_MIN_EMBEDDINGS', '20000'))
+
 # Image processing settings
 THUMBNAIL_SIZE = (300, 300)  # Max dimensions for thumbnails
 DISPLAY_SIZE = (1200, 1200)  # Max dimensions for display images
 JPEG_QUALITY_THUMB = 80
 JPEG_QUALITY_DISPLAY = 85
 
+# Library used to create display/thumbnail versions: 'auto' picks libvips
+# when installed, else Pillow; 'pillow' forces Pillow
+IMAGE_BACKEND = os.getenv('IMAGE_BACKEND', 'auto').lower()
+
 # Processing settings
 PROCESS_BATCH_SIZE = int(os.getenv('PROCESS_BATCH_SIZE', '50'))
 
+# Worker processes for the processing queue (1 processes photos one at a time)
+QUEUE_WORKERS = int(os.getenv('QUEUE_WORKERS', str(os.cpu_count() or 1)))
+# Threads reading and hashing queued files ahead of the worker processes
+QUEUE_IO_WORKERS = int(os.getenv('QUEUE_IO_WORKERS', '4'))
+
+# Background threads that validate and duplicate-check web uploads
+UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', '4'))
+
+# Persistent exiftool processes shared by metadata reads and writes
+EXIFTOOL_WORKERS = int(os.getenv('EXIFTOOL_WORKERS', str(os.cpu_count() or 1)))
+
+# Near-duplicate flagging: a new photo within this Hamming distance of a stored
+# photo's perceptual hash gets a review note (negative disables the check).
+# It is still imported - burst shots of one scene hash alike.
+NEAR_DUPLICATE_MAX_DISTANCE = int(os.getenv('NEAR_DUPLICATE_MAX_DISTANCE', '-1'))
+
 # Flask settings
 SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
 DEBUG = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
@@ -74,7 +121,7 @@ EVENT_MATCH_HIGH_CONFIDENCE_METERS = 500
 EVENT_MATCH_MEDIUM_CONFIDENCE_METERS = 2000
 
 # Supported image formats
-SUPPORTED_IMAGE_EXTENSIONS = {
+SUPPORTED_IMAGE_EXTENSIONS = frozenset({
     # Standard formats
     '.jpg', '.jpeg', '.png', '.heic', '.heif',
     '.tiff', '.tif', '.webp', '.bmp',
@@ -89,13 +136,13 @@ SUPPORTED_IMAGE_EXTENSIONS = {
     '.pef',              # Pentax
     '.dng',              # Adobe Digital Negative (universal)
     '.raw',              # Generic RAW
-}
+})
 
 # RAW formats that need special processing (rawpy/libraw)
-RAW_EXTENSIONS = {
+RAW_EXTENSIONS = frozenset({
     '.nef', '.nrw', '.cr2', '.cr3', '.arw', '.srf',
     '.raf', '.orf', '.rw2', '.pef', '.dng', '.raw'
-}
+})
 
 # Photo status values
 class PhotoStatus:
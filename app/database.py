@@ -3,42 +3,100 @@ SBNC Photo Gallery System - Database Module
 SQLite database connection and schema management.
 """
 
+import os
 import sqlite3
+import threading
 from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from app.config import DATABASE_PATH
+from app.config import DATABASE_PATH, DATABASE_SYNCHRONOUS, DATABASE_BUSY_TIMEOUT
+
+# Per-thread cached connection used by get_db()
+_local = threading.local()
+
+if DATABASE_SYNCHRONOUS not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+    raise ValueError(f"Invalid DATABASE_SYNCHRONOUS: {DATABASE_SYNCHRONOUS}")
+
+# Applied to every new connection. WAL lets readers and the writer work
+# concurrently; the rest trade a little memory for fewer disk reads.
+CONNECTION_PRAGMAS = [
+    'PRAGMA foreign_keys = ON',
+    'PRAGMA journal_mode = WAL',
+    f'PRAGMA synchronous = {DATABASE_SYNCHRONOUS}',
+    'PRAGMA cache_size = -64000',        # 64MB page cache
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA mmap_size = 268435456',      # 256MB memory-mapped I/O
+]
 
 
 def get_connection():
     """Get a database connection with row factory enabled."""
-    conn = sqlite3.connect(DATABASE_PATH)
+    conn = sqlite3.connect(DATABASE_PATH, timeout=DATABASE_BUSY_TIMEOUT)
     conn.row_factory = sqlite3.Row
-    conn.execute('PRAGMA foreign_keys = ON')
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def _get_thread_connection():
+    """Get this thread's cached connection, opening it on first use."""
+    conn = getattr(_local, 'conn', None)
+    # A connection inherited across fork() must not be reused
+    if conn is None or _local.pid != os.getpid():
+        conn = get_connection()
+        _local.conn = conn
+        _local.pid = os.getpid()
     return conn
 
 
 @contextmanager
 def get_db():
-    """Context manager for database connections."""
-    conn = get_connection()
+    """
+    Context manager for database connections.
+
+    Reuses one connection per thread instead of opening a new one for every
+    block; call close_db() to release it (done at Flask app-context teardown).
+    """
+    conn = _get_thread_connection()
     try:
         yield conn
         conn.commit()
     except Exception:
         conn.rollback()
         raise
-    finally:
+
+
+def close_db(exception=None):
+    """Close this thread's cached connection, if one is open."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.pid == os.getpid():
         conn.close()
+    _local.conn = None
 
 
 def init_db():
     """Initialize the database with the required schema."""
     with get_db() as conn:
         conn.executescript(SCHEMA)
+        _apply_column_migrations(conn)
     print(f"Database initialized at {DATABASE_PATH}")
 
 
+# Columns added after the initial schema. CREATE TABLE IF NOT EXISTS won't
+# add them to an existing database, so init_db adds any that are missing.
+COLUMN_MIGRATIONS = [
+    ('photos', 'perceptual_hash', 'INTEGER'),
+]
+
+
+def _apply_column_migrations(conn):
+    """Add any columns from COLUMN_MIGRATIONS that the database lacks."""
+    for table, column, column_type in COLUMN_MIGRATIONS:
+        existing = {row['name'] for row in conn.execute(f'PRAGMA table_info({table})')}
+        if column not in existing:
+            conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+
+
 SCHEMA = """
 -- Members (synced from Wild Apricot)
 CREATE TABLE IF NOT EXISTS members (
@@ -61,7 +119,7 @@ CREATE INDEX IF NOT EXISTS idx_members_name ON members(last_name, first_name);
 CREATE TABLE IF NOT EXISTS face_embeddings (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     member_id TEXT REFERENCES members(id) ON DELETE CASCADE,
-    embedding BLOB,                         -- 128-dim vector as bytes
+    embedding BLOB,                         -- 128-dim float32 vector as raw bytes
     source TEXT,                            -- 'profile', 'directory', 'confirmed', 'self-tag'
     quality_score REAL,                     -- Quality metric for the embedding
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -69,6 +127,15 @@ CREATE TABLE IF NOT EXISTS face_embeddings (
 
 CREATE INDEX IF NOT EXISTS idx_face_embeddings_member ON face_embeddings(member_id);
 
+-- All face embeddings packed into one row, so the full set loads with a single read
+CREATE TABLE IF NOT EXISTS face_embeddings_blob (
+    snapshot_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    version TEXT NOT NULL,                  -- face_embeddings/members fingerprint it was built from
+    embedding_ids BLOB NOT NULL,            -- face_embeddings.id per row, int64
+    matrix BLOB NOT NULL,                   -- (N, 128) float32 embeddings, row-major
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Events (synced from Wild Apricot)
 CREATE TABLE IF NOT EXISTS events (
     id TEXT PRIMARY KEY,                    -- WA event ID
@@ -89,6 +156,7 @@ CREATE TABLE IF NOT EXISTS events (
 );
 
 CREATE INDEX IF NOT EXISTS idx_events_date ON events(start_date);
+CREATE INDEX IF NOT EXISTS idx_events_range ON events(start_date, end_date);
 CREATE INDEX IF NOT EXISTS idx_events_activity ON events(activity_group);
 
 -- Event Registrations/RSVPs (synced from Wild Apricot)
@@ -144,6 +212,7 @@ CREATE TABLE IF NOT EXISTS photos (
     height INTEGER,
     file_size INTEGER,
     content_hash TEXT,                      -- SHA-256 hash for duplicate detection
+    perceptual_hash INTEGER,                -- 64-bit dHash for near-duplicate detection
 
     -- WA Export tracking
     exported_to_wa INTEGER DEFAULT 0,       -- 1 if exported to WA file storage
@@ -172,7 +241,7 @@ CREATE TABLE IF NOT EXISTS photo_faces (
     box_left INTEGER,
 
     -- Face embedding for matching
-    embedding BLOB,                         -- 128-dim vector as bytes
+    embedding BLOB,                         -- 128-dim float32 vector as raw bytes (older rows: pickle)
 
     -- Recognition results
     matched_member_id TEXT REFERENCES members(id),
@@ -219,7 +288,7 @@ CREATE TABLE IF NOT EXISTS processing_queue (
     original_filename TEXT,
 
     -- Processing status
-    status TEXT DEFAULT 'pending',          -- pending, processing, completed, failed
+    status TEXT DEFAULT 'pending',          -- received, checking, pending, processing, completed, failed, duplicate
     priority INTEGER DEFAULT 0,             -- Higher = process first
     attempts INTEGER DEFAULT 0,
     error_message TEXT,
@@ -279,6 +348,17 @@ CREATE TABLE IF NOT EXISTS sync_status (
     items_synced INTEGER DEFAULT 0
 );
 
+-- Folders known to exist in WA file storage, so exports can skip probing them
+CREATE TABLE IF NOT EXISTS wa_known_folders (
+    path TEXT PRIMARY KEY
+) WITHOUT ROWID;
+
+-- Files already uploaded to WA, keyed by a 64-bit hash of the remote path
+CREATE TABLE IF NOT EXISTS wa_exports_index (
+    key INTEGER PRIMARY KEY,
+    remote_path TEXT NOT NULL
+);
+
 -- Initialize default sync status entries
 INSERT OR IGNORE INTO sync_status (sync_type) VALUES ('members');
 INSERT OR IGNORE INTO sync_status (sync_type) VALUES ('events');
@@ -304,6 +384,21 @@ def get_member_by_id(member_id):
         return dict_from_row(row)
 
 
+def get_member_display_names(member_ids):
+    """Get {member_id: display_name} for several members in one query."""
+    member_ids = list(set(member_ids))
+    if not member_ids:
+        return {}
+
+    placeholders = ','.join('?' * len(member_ids))
+    with get_db() as conn:
+        rows = conn.execute(
+            f'SELECT id, display_name FROM members WHERE id IN ({placeholders})',
+            member_ids
+        ).fetchall()
+        return {row['id']: row['display_name'] for row in rows}
+
+
 def get_member_by_email(email):
     """Get a member by their email address."""
     with get_db() as conn:
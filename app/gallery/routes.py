@@ -443,7 +443,8 @@ def upload_page():
         return jsonify({
             'success': True,
             'queue_id': result['queue_id'],
-            'filename': result['filename']
+            'filename': result['filename'],
+            'status': 'received'
         })
     else:
         return jsonify({
@@ -452,6 +453,18 @@ def upload_page():
         }), 400
 
 
+@gallery_bp.route('/upload/status/<int:queue_id>')
+def upload_status(queue_id):
+    """Processing status of an upload, for clients polling after /upload."""
+    from app.ingest.upload_handler import get_upload_progress
+    progress = get_upload_progress(queue_id)
+
+    if not progress:
+        return jsonify({'error': 'Upload not found'}), 404
+
+    return jsonify(progress)
+
+
 # =============================================================================
 # Editorial Queue API - Public endpoints for WA-embedded admin interface
 # These are accessible without Flask login since WA handles access control
@@ -593,7 +606,6 @@ def photo_detail(photo_id):
             face_dict = dict(face)
             # Parse candidates JSON
             if face_dict.get('candidates_json'):
-                import json
                 face_dict['candidates'] = json.loads(face_dict['candidates_json'])
             else:
                 face_dict['candidates'] = []
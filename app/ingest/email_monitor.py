@@ -8,6 +8,9 @@ import email
 from email.header import decode_header
 from email.utils import parseaddr
 import os
+import re
+import select
+import time
 import uuid
 from datetime import datetime
 from pathlib import Path
@@ -15,12 +18,63 @@ import logging
 
 from app.config import (
     IMAP_SERVER, IMAP_PORT, IMAP_USER, IMAP_PASSWORD,
+    IMAP_FETCH_BATCH_SIZE, IMAP_MAX_MESSAGE_SIZE, IMAP_MAX_ATTEMPTS,
     PHOTO_STORAGE_ROOT, SUPPORTED_IMAGE_EXTENSIONS
 )
 from app.database import get_db, get_member_by_email
 
 logger = logging.getLogger(__name__)
 
+# RFC 2177: clients must re-issue IDLE at least every 29 minutes
+IDLE_MAX_SECONDS = 29 * 60
+
+# IMAP keywords (custom flags) tracking messages the inbox check must skip:
+# one already handled whose move out of the inbox failed, and one attempt
+# keyword per failed processing run
+HANDLED_KEYWORD = 'SbncHandled'
+ATTEMPT_KEYWORD = 'SbncAttempt'
+
+_FETCH_START_RE = re.compile(rb'\d+ \(')
+_FETCH_UID_RE = re.compile(rb'UID (\d+)')
+_FETCH_SIZE_RE = re.compile(rb'RFC822\.SIZE (\d+)')
+_FETCH_FLAGS_RE = re.compile(rb'FLAGS \(([^)]*)\)')
+
+
+def _parse_fetch_response(data):
+    """
+    Split a UID FETCH response into per-message items.
+
+    imaplib returns a tuple (header, literal) for each message carrying a
+    body, followed by the rest of its response line as bytes; messages
+    without a body come back as plain bytes lines.
+
+    Returns:
+        dict mapping UID (bytes) -> {'size': int or None, 'body': bytes or None,
+        'flags': list of flag names (str)}
+    """
+    items = []
+    for part in data:
+        if isinstance(part, tuple):
+            items.append([part[0], part[1]])
+        elif isinstance(part, bytes):
+            if items and not _FETCH_START_RE.match(part):
+                items[-1][0] += part
+            else:
+                items.append([part, None])
+
+    messages = {}
+    for header, body in items:
+        uid = _FETCH_UID_RE.search(header)
+        if uid:
+            size = _FETCH_SIZE_RE.search(header)
+            flags = _FETCH_FLAGS_RE.search(header)
+            messages[uid.group(1)] = {
+                'size': int(size.group(1)) if size else None,
+                'body': body,
+                'flags': flags.group(1).decode('ascii', 'replace').split() if flags else [],
+            }
+    return messages
+
 
 class EmailMonitor:
     """Monitor IMAP mailbox for photo submissions."""
@@ -64,8 +118,35 @@ class EmailMonitor:
                 pass
             self.connection = None
 
-    def process_inbox(self):
-        """Process all unread emails in the inbox."""
+    def ensure_connected(self):
+        """
+        Make sure there is a live connection, reconnecting if needed.
+
+        An existing connection is checked with NOOP, so a long-running
+        monitor keeps one login across polls and only reconnects after the
+        server drops it (BYE, timeout).
+        """
+        if self.connection:
+            try:
+                self.connection.noop()
+                return True
+            except (imaplib.IMAP4.error, OSError) as e:
+                logger.info(f"IMAP connection lost ({e}), reconnecting")
+                self.connection = None
+        return self.connect()
+
+    def process_inbox(self, batch_size=IMAP_FETCH_BATCH_SIZE):
+        """
+        Process all unread emails in the inbox.
+
+        Messages are fetched by UID, batch_size per round trip: one FETCH
+        for their sizes, then one for the bodies of those small enough to
+        take. Moved messages are expunged once at the end. Messages marked
+        handled (see _move_to_folder) are skipped.
+
+        Args:
+            batch_size: Messages fetched per IMAP command
+        """
         if not self.connection:
             if not self.connect():
                 return []
@@ -73,32 +154,180 @@ class EmailMonitor:
         results = []
         try:
             self.connection.select(self.inbox_folder)
-            _, message_numbers = self.connection.search(None, 'UNSEEN')
+            _, uid_data = self.connection.uid(
+                'SEARCH', None, f'UNSEEN UNDELETED UNKEYWORD {HANDLED_KEYWORD}'
+            )
+            uids = uid_data[0].split()
+
+            for start in range(0, len(uids), max(1, batch_size)):
+                results.extend(self._process_batch(uids[start:start + batch_size]))
 
-            for num in message_numbers[0].split():
-                if num:
-                    result = self._process_email(num)
-                    results.append(result)
+            if results:
+                self.connection.expunge()
 
+        except (imaplib.IMAP4.abort, OSError) as e:
+            # Connection is gone - reconnect on the next check
+            logger.error(f"Error processing inbox: {e}")
+            self.connection = None
         except Exception as e:
             logger.error(f"Error processing inbox: {e}")
 
         return results
 
-    def _process_email(self, msg_num):
-        """Process a single email message."""
+    def idle_wait(self, timeout):
+        """
+        Block until the server announces new mail or timeout seconds pass.
+
+        Uses IMAP IDLE (RFC 2177), so new submissions are picked up within
+        seconds instead of at the next poll. Servers without IDLE fall back
+        to sleeping for the timeout.
+
+        Args:
+            timeout: Seconds to wait (capped at IDLE_MAX_SECONDS)
+
+        Returns:
+            True if the server reported new messages
+        """
+        timeout = min(timeout, IDLE_MAX_SECONDS)
+        if not self.ensure_connected() or 'IDLE' not in self.connection.capabilities:
+            time.sleep(timeout)
+            return False
+
+        conn = self.connection
+        tag = f"IDLE{int(time.time())}".encode()
+        deadline = time.monotonic() + timeout
+        new_mail = False
+        try:
+            conn.select(self.inbox_folder)
+            conn.send(tag + b' IDLE\r\n')
+            if not conn.readline().startswith(b'+'):
+                raise imaplib.IMAP4.error("server refused IDLE")
+
+            while not new_mail:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._wait_readable(remaining):
+                    break
+                line = conn.readline()
+                if not line or line.startswith(b'* BYE'):
+                    raise imaplib.IMAP4.abort("server closed the connection during IDLE")
+                new_mail = b'EXISTS' in line or b'RECENT' in line
+
+            conn.send(b'DONE\r\n')
+            while True:
+                line = conn.readline()
+                if not line:
+                    raise imaplib.IMAP4.abort("server closed the connection during IDLE")
+                if line.startswith(tag):
+                    break
+
+        except (imaplib.IMAP4.error, OSError) as e:
+            logger.warning(f"IMAP IDLE failed ({e}), reconnecting on next check")
+            self.disconnect()
+            # Don't spin reconnecting if IDLE keeps failing
+            time.sleep(max(0, deadline - time.monotonic()))
+
+        return new_mail
+
+    def _wait_readable(self, timeout):
+        """Wait up to timeout seconds for the server to send something."""
+        sock = self.connection.sock
+        # TLS may already hold decrypted bytes that select() can't see
+        pending = getattr(sock, 'pending', None)
+        if pending and pending():
+            return True
+        readable, _, _ = select.select([sock], [], [], timeout)
+        return bool(readable)
+
+    def _process_batch(self, uids):
+        """Fetch and process one batch of messages by UID."""
+        _, size_data = self.connection.uid('FETCH', b','.join(uids), '(RFC822.SIZE FLAGS)')
+        sizes = _parse_fetch_response(size_data)
+
+        results = []
+        wanted = []
+        attempts = {}
+        for uid in uids:
+            size = sizes.get(uid, {}).get('size')
+            attempts[uid] = sum(
+                flag.startswith(ATTEMPT_KEYWORD) for flag in sizes.get(uid, {}).get('flags', [])
+            )
+            if attempts[uid] >= IMAP_MAX_ATTEMPTS:
+                # Out of attempts, e.g. after IMAP_MAX_ATTEMPTS was lowered
+                self._move_to_folder(uid, self.rejected_folder)
+                continue
+            if size is not None and size > IMAP_MAX_MESSAGE_SIZE:
+                logger.warning(f"Skipping email {uid.decode()}: {size} bytes exceeds size limit")
+                self._move_to_folder(uid, self.rejected_folder)
+                results.append({
+                    'success': False,
+                    'msg_num': uid,
+                    'sender': None,
+                    'member': None,
+                    'photos': [],
+                    'errors': [f"Message too large ({size} bytes)"]
+                })
+            else:
+                wanted.append(uid)
+
+        if wanted:
+            # PEEK leaves \Seen alone, so a message that fails to process is
+            # retried, up to IMAP_MAX_ATTEMPTS times (see _record_failure)
+            _, body_data = self.connection.uid('FETCH', b','.join(wanted), '(BODY.PEEK[])')
+            bodies = _parse_fetch_response(body_data)
+            for uid in wanted:
+                body = bodies.get(uid, {}).get('body')
+                if body is None:
+                    logger.warning(f"Email {uid.decode()} disappeared before it could be fetched")
+                    continue
+                result = self._process_email(uid, body)
+                if result.get('retry'):
+                    self._record_failure(uid, attempts[uid] + 1)
+                results.append(result)
+
+        return results
+
+    def check_once(self, batch_size=IMAP_FETCH_BATCH_SIZE):
+        """
+        Run one check of the inbox, reusing the open connection.
+
+        Args:
+            batch_size: Messages fetched per IMAP command
+
+        Returns:
+            List of per-email result dicts (see _process_email)
+        """
+        if not self.ensure_connected():
+            return []
+
+        results = self.process_inbox(batch_size)
+        total_photos = sum(len(r['photos']) for r in results)
+        successful = sum(1 for r in results if r['success'])
+        logger.info(f"Processed {len(results)} emails, {successful} successful, {total_photos} photos queued")
+        return results
+
+    def _process_email(self, msg_num, email_body):
+        """
+        Process a single email message.
+
+        Args:
+            msg_num: Message UID
+            email_body: Raw RFC822 message bytes
+
+        Returns:
+            Result dict; 'retry' is set when processing failed before the
+            message was moved out of the inbox
+        """
         result = {
             'success': False,
             'msg_num': msg_num,
             'sender': None,
             'member': None,
             'photos': [],
-            'errors': []
+            'errors': [],
+            'retry': False
         }
 
         try:
-            _, msg_data = self.connection.fetch(msg_num, '(RFC822)')
-            email_body = msg_data[0][1]
             msg = email.message_from_bytes(email_body)
 
             # Extract sender info
@@ -182,6 +411,7 @@ class EmailMonitor:
         except Exception as e:
             logger.error(f"Error processing email {msg_num}: {e}")
             result['errors'].append(str(e))
+            result['retry'] = True
 
         return result
 
@@ -218,13 +448,51 @@ class EmailMonitor:
                 ''', (photo['path'], sender_email, member['id'], photo['original_filename']))
 
     def _move_to_folder(self, msg_num, folder):
-        """Move an email to a different folder."""
+        """
+        Move an email (by UID) to a different folder.
+
+        The original is only flagged as deleted; process_inbox expunges once
+        per check. If the move fails the message is flagged as seen and
+        handled instead, so the next check doesn't process it again.
+        """
         try:
-            self.connection.copy(msg_num, folder)
-            self.connection.store(msg_num, '+FLAGS', '\\Deleted')
-            self.connection.expunge()
+            self.connection.uid('COPY', msg_num, folder)
+            self.connection.uid('STORE', msg_num, '+FLAGS', '\\Deleted')
         except Exception as e:
             logger.error(f"Failed to move message to {folder}: {e}")
+            self._mark_handled(msg_num)
+
+    def _mark_handled(self, msg_num):
+        """Flag a message so the inbox check skips it, even though it is still there."""
+        try:
+            self.connection.uid('STORE', msg_num, '+FLAGS', f'(\\Seen {HANDLED_KEYWORD})')
+        except Exception as e:
+            # Servers without custom keywords still honour \Seen
+            logger.warning(f"Could not flag message {msg_num.decode()} as handled ({e})")
+            try:
+                self.connection.uid('STORE', msg_num, '+FLAGS', '\\Seen')
+            except Exception as e:
+                logger.error(f"Could not flag message {msg_num.decode()} as seen: {e}")
+
+    def _record_failure(self, msg_num, attempt):
+        """
+        Count a failed processing attempt on the message itself.
+
+        The message stays unread for another try until IMAP_MAX_ATTEMPTS
+        attempts have failed; then it is moved to the rejected folder.
+        """
+        if attempt >= IMAP_MAX_ATTEMPTS:
+            logger.error(f"Giving up on email {msg_num.decode()} after {attempt} failed attempts")
+            self._move_to_folder(msg_num, self.rejected_folder)
+            return
+
+        try:
+            self.connection.uid('STORE', msg_num, '+FLAGS', f'({ATTEMPT_KEYWORD}{attempt})')
+            logger.warning(f"Email {msg_num.decode()} failed (attempt {attempt} of {IMAP_MAX_ATTEMPTS}), will retry")
+        except Exception as e:
+            # Without a way to count attempts, don't retry forever
+            logger.error(f"Could not record failed attempt on email {msg_num.decode()} ({e}), not retrying")
+            self._mark_handled(msg_num)
 
     def _send_confirmation_email(self, to_email, first_name, photo_count):
         """Send a confirmation email to the submitter."""
@@ -240,15 +508,16 @@ class EmailMonitor:
         logger.info(f"Would send rejection to {to_email}: {reason}")
 
 
-def run_email_check():
-    """Run a single check of the email inbox."""
+def run_email_check(batch_size=IMAP_FETCH_BATCH_SIZE):
+    """
+    Run a single check of the email inbox.
+
+    Args:
+        batch_size: Messages fetched per IMAP command
+    """
     monitor = EmailMonitor()
     try:
-        results = monitor.process_inbox()
-        total_photos = sum(len(r['photos']) for r in results)
-        successful = sum(1 for r in results if r['success'])
-        logger.info(f"Processed {len(results)} emails, {successful} successful, {total_photos} photos queued")
-        return results
+        return monitor.check_once(batch_size)
     finally:
         monitor.disconnect()
 
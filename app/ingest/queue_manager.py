@@ -50,6 +50,46 @@ class QueueManager:
                 WHERE id = ?
             ''', (datetime.utcnow(), queue_id))
 
+    @staticmethod
+    def mark_processing_many(queue_ids):
+        """Mark several queue items as being processed in one transaction."""
+        now = datetime.utcnow()
+        with get_db() as conn:
+            conn.executemany('''
+                UPDATE processing_queue
+                SET status = 'processing', started_at = ?, attempts = attempts + 1
+                WHERE id = ?
+            ''', [(now, queue_id) for queue_id in queue_ids])
+
+    @staticmethod
+    def mark_finished_many(completed_ids, failures, duplicates=()):
+        """
+        Record the outcome of several queue items in one transaction.
+
+        Args:
+            completed_ids: Queue IDs to mark completed
+            failures: List of (queue_id, error_message) to mark failed
+            duplicates: List of (queue_id, error_message) for files already
+                        in the gallery; unlike failures these aren't retried
+        """
+        now = datetime.utcnow()
+        with get_db() as conn:
+            conn.executemany('''
+                UPDATE processing_queue
+                SET status = 'completed', completed_at = ?
+                WHERE id = ?
+            ''', [(now, queue_id) for queue_id in completed_ids])
+            conn.executemany('''
+                UPDATE processing_queue
+                SET status = 'failed', error_message = ?, completed_at = ?
+                WHERE id = ?
+            ''', [(error, now, queue_id) for queue_id, error in failures])
+            conn.executemany('''
+                UPDATE processing_queue
+                SET status = 'duplicate', error_message = ?, completed_at = ?
+                WHERE id = ?
+            ''', [(error, now, queue_id) for queue_id, error in duplicates])
+
     @staticmethod
     def mark_completed(queue_id, photo_id=None):
         """Mark a queue item as completed."""
@@ -70,6 +110,74 @@ class QueueManager:
                 WHERE id = ?
             ''', (error_message, datetime.utcnow(), queue_id))
 
+    @staticmethod
+    def mark_duplicate(queue_id, error_message):
+        """Mark a queue item as a copy of a photo already in the gallery."""
+        with get_db() as conn:
+            conn.execute('''
+                UPDATE processing_queue
+                SET status = 'duplicate', error_message = ?, completed_at = ?
+                WHERE id = ?
+            ''', (error_message, datetime.utcnow(), queue_id))
+
+    @staticmethod
+    def claim_upload_check(queue_id, status='received', started_at=None):
+        """
+        Take ownership of an upload's background check.
+
+        Moves the item to 'checking' only if it is still in the given status
+        (and, for a check being taken over, still has the same started_at),
+        so two threads can never check the same upload.
+
+        Returns:
+            True if this caller now owns the check
+        """
+        with get_db() as conn:
+            result = conn.execute('''
+                UPDATE processing_queue
+                SET status = 'checking', started_at = ?
+                WHERE id = ? AND status = ? AND started_at IS ?
+            ''', (datetime.utcnow(), queue_id, status, started_at))
+            return result.rowcount == 1
+
+    @staticmethod
+    def get_stale_uploads(minutes_old=10):
+        """Get uploads whose background check hasn't finished after some minutes."""
+        with get_db() as conn:
+            rows = conn.execute('''
+                SELECT * FROM processing_queue
+                WHERE (status = 'received' AND submitted_at < datetime('now', ? || ' minutes'))
+                OR (status = 'checking' AND started_at < datetime('now', ? || ' minutes'))
+            ''', (f'-{minutes_old}', f'-{minutes_old}')).fetchall()
+            return [dict(row) for row in rows]
+
+    @staticmethod
+    def recover_stale_processing(minutes_old=60, max_attempts=3):
+        """
+        Release items left 'processing' by a run that crashed or was killed.
+
+        Items still under max_attempts go back to 'pending' for the next
+        run; the rest are marked failed.
+
+        Returns:
+            Number of items released
+        """
+        cutoff = f'-{minutes_old}'
+        with get_db() as conn:
+            requeued = conn.execute('''
+                UPDATE processing_queue
+                SET status = 'pending'
+                WHERE status = 'processing' AND attempts < ?
+                AND started_at < datetime('now', ? || ' minutes')
+            ''', (max_attempts, cutoff)).rowcount
+            failed = conn.execute('''
+                UPDATE processing_queue
+                SET status = 'failed', error_message = 'Processing was interrupted', completed_at = ?
+                WHERE status = 'processing'
+                AND started_at < datetime('now', ? || ' minutes')
+            ''', (datetime.utcnow(), cutoff)).rowcount
+            return requeued + failed
+
     @staticmethod
     def retry_failed(max_attempts=3):
         """Reset failed items for retry if under max attempts."""
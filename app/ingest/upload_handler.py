@@ -3,23 +3,163 @@ SBNC Photo Gallery System - Web Upload Handler
 Handle photo uploads via the web interface.
 """
 
+import hashlib
+import io
+import mmap
+import os
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 import logging
 
 from werkzeug.utils import secure_filename
-from PIL import Image
 import pillow_heif
 
-from app.config import PHOTO_STORAGE_ROOT, SUPPORTED_IMAGE_EXTENSIONS
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    import numpy as np
+    _turbo_jpeg = TurboJPEG()
+    TURBOJPEG_SUPPORT = True
+except (ImportError, OSError):
+    # PyTurboJPEG not installed or libjpeg-turbo missing - use Pillow's encoder
+    TURBOJPEG_SUPPORT = False
+
+from app.config import PHOTO_STORAGE_ROOT, SUPPORTED_IMAGE_EXTENSIONS, UPLOAD_WORKERS
 from app.database import get_db
+from app.ingest.queue_manager import QueueManager
+from app.processing.duplicate_detector import check_duplicate_by_hash
 
 logger = logging.getLogger(__name__)
 
 # Register HEIF opener with Pillow
 pillow_heif.register_heif_opener()
 
+# Validation, HEIC conversion and duplicate checks run here, off the request thread
+_upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix='upload')
+
+# Uploads whose check hasn't finished after this long lost it with the process
+STALE_UPLOAD_MINUTES = 10
+
+# Leading bytes of each supported container format
+_MAGIC_PREFIXES = {
+    b'\xff\xd8\xff': 'jpeg',
+    b'\x89PNG\r\n\x1a\n': 'png',
+    b'II*\x00': 'tiff',             # Also NEF, CR2, ARW, DNG, PEF, ...
+    b'MM\x00*': 'tiff',
+    b'BM': 'bmp',
+    b'FUJIFILMCCD-RAW': 'raw',      # Fujifilm RAF
+    b'IIRO': 'raw',                 # Olympus ORF
+    b'IIRS': 'raw',
+    b'MMOR': 'raw',
+    b'IIU\x00': 'raw',              # Panasonic RW2
+}
+
+# ISO base media brands used by HEIC/HEIF files
+_HEIF_BRANDS = {b'heic', b'heix', b'heim', b'heis', b'hevc', b'hevx', b'mif1', b'msf1'}
+
+
+def detect_image_format(header):
+    """
+    Identify an image format from its first bytes.
+
+    Args:
+        header: At least the first 16 bytes of the file
+
+    Returns:
+        Format name ('jpeg', 'png', 'heif', 'raw', ...) or None if unrecognized
+    """
+    for prefix, image_format in _MAGIC_PREFIXES.items():
+        if header.startswith(prefix):
+            return image_format
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    if header[4:8] == b'ftyp':
+        brand = header[8:12]
+        if brand in _HEIF_BRANDS:
+            return 'heif'
+        if brand == b'crx ':
+            return 'raw'                # Canon CR3
+    return None
+
+
+def _encode_heif_as_jpeg(source):
+    """Decode a HEIC/HEIF file object and return it encoded as JPEG bytes."""
+    heif = pillow_heif.open_heif(source, convert_hdr_to_8bit=True)
+    if TURBOJPEG_SUPPORT and heif.mode == 'RGB':
+        # Hand libheif's decoded pixels straight to libjpeg-turbo
+        return _turbo_jpeg.encode(np.asarray(heif), quality=95, pixel_format=TJPF_RGB)
+
+    img = heif.to_pillow()
+    # Convert to RGB if necessary (HEIC might be RGBA)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    buffer = io.BytesIO()
+    img.save(buffer, 'JPEG', quality=95)
+    return buffer.getvalue()
+
+
+class IngestPipeline:
+    """
+    Validate, convert and hash an uploaded file in a single pass.
+
+    The file is memory-mapped once. Its header is checked against known
+    image signatures (instead of a full Image.verify() decode), HEIC files
+    are converted to JPEG from the same mapping, and the hash used for
+    duplicate detection is taken from the bytes already in memory.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = Path(file_path)
+
+    def run(self):
+        """
+        Process the file.
+
+        Returns:
+            dict with keys:
+                - is_valid: True if the file is a recognized image
+                - format: Detected image format
+                - hash: SHA-256 hex digest of the file that will be queued
+                - converted_path: Path of the JPEG written for HEIC input, else None
+        """
+        result = {
+            'is_valid': False,
+            'format': None,
+            'hash': None,
+            'converted_path': None
+        }
+
+        try:
+            with open(self.file_path, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                result['format'] = detect_image_format(mm[:16])
+                if result['format'] is None:
+                    return result
+
+                if result['format'] == 'heif':
+                    jpeg_bytes = _encode_heif_as_jpeg(mm)
+                    jpg_path = self.file_path.with_suffix('.jpg')
+                    if jpg_path == self.file_path:
+                        # HEIC content uploaded with a .jpg name
+                        jpg_path = self.file_path.with_name(f"{self.file_path.stem}-converted.jpg")
+                    jpg_path.write_bytes(jpeg_bytes)
+                    logger.info(f"Converted HEIC to JPG: {jpg_path}")
+                    result['converted_path'] = jpg_path
+                    result['hash'] = hashlib.sha256(jpeg_bytes).hexdigest()
+                else:
+                    result['hash'] = hashlib.sha256(mm).hexdigest()
+
+            result['is_valid'] = True
+
+        except (OSError, ValueError) as e:
+            # ValueError: mmap of an empty file
+            logger.warning(f"Could not read upload {self.file_path}: {e}")
+        except Exception as e:
+            logger.error(f"HEIC conversion failed: {e}")
+
+        return result
+
 
 class UploadHandler:
     """Handle web-based photo uploads."""
@@ -54,7 +194,7 @@ class UploadHandler:
             result['filename'] = original_filename
 
             # Validate file extension
-            ext = Path(original_filename).suffix.lower()
+            ext = os.path.splitext(original_filename)[1].lower()
             if ext not in SUPPORTED_IMAGE_EXTENSIONS:
                 result['error'] = f"Unsupported file type: {ext}"
                 return result
@@ -67,34 +207,10 @@ class UploadHandler:
             file_storage.save(str(file_path))
             logger.info(f"Saved upload: {file_path}")
 
-            # Convert HEIC to JPG if needed
-            if ext in {'.heic', '.heif'}:
-                jpg_path = self._convert_heic_to_jpg(file_path)
-                if jpg_path:
-                    file_path.unlink()  # Remove original HEIC
-                    file_path = jpg_path
-
-            # Validate it's a real image
-            try:
-                with Image.open(file_path) as img:
-                    img.verify()
-            except Exception as e:
-                file_path.unlink()
-                result['error'] = f"Invalid image file: {e}"
-                return result
-
-            # Check for duplicates
-            from app.processing.duplicate_detector import check_duplicate
-            is_duplicate, existing_photo = check_duplicate(str(file_path))
-            if is_duplicate:
-                file_path.unlink()  # Remove the duplicate
-                result['error'] = f"Duplicate photo - already imported as {existing_photo.get('original_filename', 'unknown')}"
-                result['duplicate_of'] = existing_photo.get('id')
-                logger.info(f"Rejected duplicate upload: {original_filename}")
-                return result
-
-            # Add to processing queue
-            queue_id = self._add_to_queue(str(file_path), original_filename, event_id)
+            # Queue it right away and finish checking it in the background;
+            # the client polls get_upload_progress() for the outcome
+            queue_id = self._add_to_queue(str(file_path), original_filename, event_id, status='received')
+            _upload_executor.submit(_finish_upload, queue_id, file_path, original_filename)
             result['queue_id'] = queue_id
             result['success'] = True
 
@@ -129,33 +245,119 @@ class UploadHandler:
             'results': results
         }
 
-    def _convert_heic_to_jpg(self, heic_path):
-        """Convert HEIC file to JPG."""
-        try:
-            jpg_path = heic_path.with_suffix('.jpg')
-            with Image.open(heic_path) as img:
-                # Convert to RGB if necessary (HEIC might be RGBA)
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    img = img.convert('RGB')
-                img.save(jpg_path, 'JPEG', quality=95)
-            logger.info(f"Converted HEIC to JPG: {jpg_path}")
-            return jpg_path
-        except Exception as e:
-            logger.error(f"HEIC conversion failed: {e}")
-            return None
-
-    def _add_to_queue(self, file_path, original_filename, event_id=None):
+    def _add_to_queue(self, file_path, original_filename, event_id=None, status='pending'):
         """Add a photo to the processing queue."""
         with get_db() as conn:
             cursor = conn.execute('''
                 INSERT INTO processing_queue
                 (photo_path, submitter_email, submitter_member_id, source, original_filename, status)
-                VALUES (?, ?, ?, 'upload', ?, 'pending')
-            ''', (file_path, self.member_email, self.member_id, original_filename))
+                VALUES (?, ?, ?, 'upload', ?, ?)
+            ''', (file_path, self.member_email, self.member_id, original_filename, status))
             return cursor.lastrowid
 
 
-def get_upload_progress(batch_id):
-    """Get the processing progress for an upload batch."""
-    # TODO: Implement batch tracking
-    pass
+def _finish_upload(queue_id, file_path, original_filename):
+    """
+    Validate, convert and duplicate-check a received upload.
+
+    Runs on the upload executor. Does nothing if the recovery sweep has
+    already claimed the upload.
+    """
+    if QueueManager.claim_upload_check(queue_id):
+        _check_upload(queue_id, file_path, original_filename)
+
+
+def _check_upload(queue_id, file_path, original_filename):
+    """
+    Check an upload claimed with QueueManager.claim_upload_check.
+
+    On success the queue item moves from 'checking' to 'pending' so the
+    processing pipeline picks it up; otherwise the file is removed and the
+    item marked failed or duplicate.
+    """
+    try:
+        # Validate, convert HEIC to JPG and hash in one pass
+        ingest = IngestPipeline(file_path).run()
+        if not ingest['is_valid']:
+            file_path.unlink(missing_ok=True)
+            QueueManager.mark_failed(queue_id, "Invalid image file")
+            return
+
+        if ingest['converted_path']:
+            file_path.unlink()  # Remove original HEIC
+            file_path = ingest['converted_path']
+
+        # Check for duplicates
+        is_duplicate, existing_photo = check_duplicate_by_hash(ingest['hash'], str(file_path))
+        if is_duplicate:
+            file_path.unlink()  # Remove the duplicate
+            QueueManager.mark_duplicate(
+                queue_id,
+                f"Duplicate photo - already imported as {existing_photo.get('original_filename', 'unknown')}"
+            )
+            logger.info(f"Rejected duplicate upload: {original_filename}")
+            return
+
+        with get_db() as conn:
+            conn.execute('''
+                UPDATE processing_queue
+                SET photo_path = ?, status = 'pending'
+                WHERE id = ?
+            ''', (str(file_path), queue_id))
+
+    except Exception as e:
+        logger.error(f"Upload processing failed: {e}")
+        QueueManager.mark_failed(queue_id, str(e))
+
+
+def recover_stale_uploads(minutes_old=STALE_UPLOAD_MINUTES):
+    """
+    Finish checking uploads whose background check never completed.
+
+    Covers uploads still 'received' (their job was lost with the process,
+    or is still waiting on a backed-up executor) and checks that stalled in
+    'checking'. Each is claimed first, so an executor job that starts later
+    finds it taken. Checks run here, on the calling thread.
+
+    Args:
+        minutes_old: How long an upload must have been waiting
+
+    Returns:
+        Number of uploads recovered
+    """
+    recovered = 0
+    for item in QueueManager.get_stale_uploads(minutes_old):
+        if not QueueManager.claim_upload_check(item['id'], item['status'], item['started_at']):
+            continue  # Picked up by its executor job meanwhile
+        recovered += 1
+        file_path = Path(item['photo_path'])
+        if not file_path.exists():
+            QueueManager.mark_failed(item['id'], "Upload was interrupted")
+            continue
+        logger.info(f"Rechecking stale upload {item['id']}: {item['original_filename']}")
+        _check_upload(item['id'], file_path, item['original_filename'])
+    return recovered
+
+
+def get_upload_progress(queue_id):
+    """
+    Get the processing progress for an upload.
+
+    Args:
+        queue_id: ID returned by UploadHandler.process_upload
+
+    Returns:
+        dict with queue_id, filename, status and error, or None if not found.
+        Status goes received -> checking -> pending -> processing ->
+        completed, or failed or duplicate.
+    """
+    item = QueueManager.get_item(queue_id)
+    if not item or item['source'] != 'upload':
+        return None
+
+    return {
+        'queue_id': item['id'],
+        'filename': item['original_filename'],
+        'status': item['status'],
+        'error': item['error_message']
+    }
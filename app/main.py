@@ -7,7 +7,7 @@ from flask_login import LoginManager
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from app.config import SECRET_KEY, DEBUG
-from app.database import get_db, init_db
+from app.database import get_db, init_db, close_db
 
 
 def create_app():
@@ -19,6 +19,9 @@ def create_app():
     app.config['SECRET_KEY'] = SECRET_KEY
     app.config['DEBUG'] = DEBUG
 
+    # Release each thread's pooled database connection after the request
+    app.teardown_appcontext(close_db)
+
     # Initialize Flask-Login
     login_manager = LoginManager()
     login_manager.init_app(app)
@@ -4,18 +4,30 @@ Prevent importing the same photo twice by checking file content hash.
 
 Uses SHA-256 hash of file content for reliable duplicate detection.
 This catches duplicates regardless of filename (IMG_1234.jpg vs copy_IMG_1234.jpg).
+
+A perceptual hash (dHash) can also spot re-encoded or resized copies, which
+have different bytes but look the same. Burst shots of one scene hash alike
+too, so a perceptual match only flags a photo for review - it never rejects one.
 """
 
 import hashlib
 import logging
+import math
 from pathlib import Path
-from typing import Optional, Tuple, Dict
+from typing import Optional, Tuple, Dict, List
 
 logger = logging.getLogger(__name__)
 
 # Hash algorithm - SHA-256 is reliable and fast enough for photos
 HASH_ALGORITHM = 'sha256'
-CHUNK_SIZE = 65536  # 64KB chunks for large files
+CHUNK_SIZE = 1024 * 1024  # 1MB reads - fewer loop iterations per file
+
+# Bloom filter sizing for DuplicateChecker (~1.2MB per million hashes at 1%)
+BLOOM_MIN_CAPACITY = 100000
+BLOOM_ERROR_RATE = 0.01
+
+# dHash grid size - 8x8 comparisons gives a 64-bit hash
+PERCEPTUAL_HASH_SIZE = 8
 
 
 def compute_file_hash(file_path: str) -> Optional[str]:
@@ -34,7 +46,7 @@ def compute_file_hash(file_path: str) -> Optional[str]:
         return None
 
     try:
-        hasher = hashlib.new(HASH_ALGORITHM)
+        hasher = hashlib.sha256()
         with open(file_path, 'rb') as f:
             while chunk := f.read(CHUNK_SIZE):
                 hasher.update(chunk)
@@ -44,6 +56,94 @@ def compute_file_hash(file_path: str) -> Optional[str]:
         return None
 
 
+def compute_perceptual_hash(file_path: str) -> Optional[int]:
+    """
+    Compute a 64-bit difference hash (dHash) of an image.
+
+    The image is shrunk to a 9x8 grayscale grid and each bit records whether
+    a pixel is brighter than its right-hand neighbour, so re-encoding or
+    resizing the photo barely changes the hash.
+
+    Args:
+        file_path: Path to the image
+
+    Returns:
+        Hash as a signed 64-bit int (fits a SQLite INTEGER), or None if the
+        image can't be decoded
+    """
+    from PIL import Image, ImageOps
+
+    size = PERCEPTUAL_HASH_SIZE
+    try:
+        with Image.open(file_path) as img:
+            # Let the JPEG decoder downscale while decoding
+            img.draft('L', (size * 8, size * 8))
+            img = ImageOps.exif_transpose(img)
+            small = img.convert('L').resize((size + 1, size), Image.LANCZOS)
+    except Exception as e:
+        logger.warning(f"Could not compute perceptual hash for {file_path}: {e}")
+        return None
+
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+
+    # SQLite integers are signed 64-bit
+    if value >= 1 << 63:
+        value -= 1 << 64
+    return value
+
+
+def hamming_distance(hash_a: int, hash_b: int) -> int:
+    """Count the differing bits between two 64-bit perceptual hashes."""
+    return bin((hash_a ^ hash_b) & 0xFFFFFFFFFFFFFFFF).count('1')
+
+
+def load_perceptual_hashes() -> List[Tuple[int, str, str]]:
+    """
+    Load the perceptual hashes of every stored photo.
+
+    Returns:
+        List of (perceptual_hash, photo_id, original_filename) tuples
+    """
+    from app.database import get_db
+
+    with get_db() as conn:
+        rows = conn.execute('''
+            SELECT perceptual_hash, id, original_filename
+            FROM photos
+            WHERE perceptual_hash IS NOT NULL
+        ''').fetchall()
+    return [tuple(row) for row in rows]
+
+
+def find_near_duplicate(perceptual_hash: int, known_hashes: list,
+                        max_distance: int) -> Optional[Tuple[str, str, int]]:
+    """
+    Find the stored photo that looks most like a new one.
+
+    Args:
+        perceptual_hash: dHash of the new photo
+        known_hashes: List from load_perceptual_hashes()
+        max_distance: Largest Hamming distance that counts as a match
+
+    Returns:
+        (photo_id, original_filename, distance) of the closest match, or None
+    """
+    best, best_distance = None, max_distance + 1
+    for known_hash, photo_id, filename in known_hashes:
+        distance = hamming_distance(perceptual_hash, known_hash)
+        if distance < best_distance:
+            best, best_distance = (photo_id, filename), distance
+            if distance == 0:
+                break
+
+    return (*best, best_distance) if best else None
+
+
 def check_duplicate(file_path: str) -> Tuple[bool, Optional[Dict]]:
     """
     Check if a file is a duplicate of an already imported photo.
@@ -55,23 +155,37 @@ def check_duplicate(file_path: str) -> Tuple[bool, Optional[Dict]]:
         Tuple of (is_duplicate: bool, existing_photo: dict or None)
         If duplicate, existing_photo contains the matching photo record
     """
-    from app.database import get_db
-
     file_hash = compute_file_hash(file_path)
     if not file_hash:
         # Can't compute hash - not a duplicate (or file error)
         return False, None
 
+    return check_duplicate_by_hash(file_hash, file_path)
+
+
+def check_duplicate_by_hash(file_hash: str, file_path: Optional[str] = None) -> Tuple[bool, Optional[Dict]]:
+    """
+    Check a precomputed content hash against already imported photos.
+
+    Args:
+        file_hash: SHA-256 hex digest of the file
+        file_path: Path to the file, for logging
+
+    Returns:
+        Tuple of (is_duplicate: bool, existing_photo: dict or None)
+    """
+    from app.database import get_db
+
     with get_db() as conn:
         existing = conn.execute('''
-            SELECT id, original_filename, submitted_at, status, file_path
+            SELECT id, original_filename, submitted_at, status, original_path
             FROM photos
             WHERE content_hash = ?
         ''', (file_hash,)).fetchone()
 
-    if existing:
-        logger.info(f"Duplicate detected: {file_path} matches existing photo {existing['id']}")
-        return True, dict(existing)
+        if existing:
+            logger.info(f"Duplicate detected: {file_path} matches existing photo {existing['id']}")
+            return True, dict(existing)
 
     return False, None
 
@@ -104,7 +218,7 @@ def check_duplicates_batch(file_paths: list) -> Dict[str, Dict]:
         # SQLite IN clause with many values
         placeholders = ','.join('?' * len(hash_to_path))
         query = f'''
-            SELECT id, original_filename, submitted_at, status, file_path, content_hash
+            SELECT id, original_filename, submitted_at, status, original_path, content_hash
             FROM photos
             WHERE content_hash IN ({placeholders})
         '''
@@ -157,14 +271,50 @@ def get_or_compute_hash(photo_id: str, file_path: str) -> Optional[str]:
     return file_hash
 
 
+class HashBloomFilter:
+    """
+    Bloom filter over SHA-256 content hashes.
+
+    The digests are already uniformly distributed, so the bit positions are
+    sliced straight out of them rather than computed with extra hash
+    functions.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        # Each position uses 4 bytes of the 32-byte digest
+        self.num_positions = min(8, max(1, round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, digest: bytes):
+        for i in range(0, self.num_positions * 4, 4):
+            yield int.from_bytes(digest[i:i + 4], 'big') % self.num_bits
+
+    def add(self, file_hash: str):
+        """Add a hex content hash."""
+        for pos in self._positions(bytes.fromhex(file_hash)):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, file_hash: str) -> bool:
+        return all(
+            self.bits[pos >> 3] & (1 << (pos & 7))
+            for pos in self._positions(bytes.fromhex(file_hash))
+        )
+
+
 class DuplicateChecker:
     """
     Helper class for checking duplicates during batch imports.
     Caches hashes to avoid redundant database queries.
+
+    Existing hashes are held in a Bloom filter: a miss means the file is
+    definitely new and no query is needed, while a hit is confirmed against
+    the content_hash index to rule out false positives.
     """
 
     def __init__(self):
-        self.known_hashes = set()
+        self.known_hashes = HashBloomFilter(BLOOM_MIN_CAPACITY)
+        self.added_hashes = set()
         self._load_existing_hashes()
 
     def _load_existing_hashes(self):
@@ -173,14 +323,31 @@ class DuplicateChecker:
 
         try:
             with get_db() as conn:
+                count = conn.execute(
+                    'SELECT COUNT(content_hash) FROM photos'
+                ).fetchone()[0]
+                # Leave headroom for photos added during the batch
+                self.known_hashes = HashBloomFilter(max(BLOOM_MIN_CAPACITY, count * 2))
+
                 rows = conn.execute(
                     'SELECT content_hash FROM photos WHERE content_hash IS NOT NULL'
-                ).fetchall()
-                self.known_hashes = {row['content_hash'] for row in rows}
-                logger.info(f"Loaded {len(self.known_hashes)} existing photo hashes")
+                )
+                for row in rows:
+                    self.known_hashes.add(row['content_hash'])
+                logger.info(f"Loaded {count} existing photo hashes")
         except Exception as e:
             logger.warning(f"Could not load existing hashes: {e}")
-            self.known_hashes = set()
+
+    def _hash_in_database(self, file_hash: str) -> bool:
+        """Look a hash up via the content_hash index."""
+        from app.database import get_db
+
+        with get_db() as conn:
+            row = conn.execute(
+                'SELECT 1 FROM photos WHERE content_hash = ?',
+                (file_hash,)
+            ).fetchone()
+        return row is not None
 
     def is_duplicate(self, file_path: str) -> Tuple[bool, Optional[str]]:
         """
@@ -196,7 +363,10 @@ class DuplicateChecker:
         if not file_hash:
             return False, None
 
-        if file_hash in self.known_hashes:
+        if file_hash not in self.known_hashes:
+            return False, file_hash
+
+        if file_hash in self.added_hashes or self._hash_in_database(file_hash):
             return True, file_hash
 
         return False, file_hash
@@ -205,6 +375,7 @@ class DuplicateChecker:
         """Add a hash to the known set (after successful import)."""
         if file_hash:
             self.known_hashes.add(file_hash)
+            self.added_hashes.add(file_hash)
 
     def check_batch(self, file_paths: list) -> Dict[str, bool]:
         """
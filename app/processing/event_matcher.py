@@ -84,21 +84,18 @@ class EventMatcher:
         date_range_start = photo_date - timedelta(days=1)
         date_range_end = photo_date + timedelta(days=1)
 
+        # Events overlapping [range_start, range_end + 1 day). Comparing the raw
+        # ISO strings (no date() wrapping) lets SQLite use idx_events_range.
         with get_db() as conn:
             rows = conn.execute('''
                 SELECT id, name, start_date, end_date, location_name, location_address,
                        location_lat, location_lon, activity_group, is_public
                 FROM events
-                WHERE date(start_date) BETWEEN date(?) AND date(?)
-                   OR date(end_date) BETWEEN date(?) AND date(?)
-                   OR (date(start_date) <= date(?) AND date(end_date) >= date(?))
+                WHERE start_date < ?
+                  AND COALESCE(end_date, start_date) >= ?
             ''', (
-                date_range_start.isoformat(),
-                date_range_end.isoformat(),
-                date_range_start.isoformat(),
-                date_range_end.isoformat(),
-                photo_date.isoformat(),
-                photo_date.isoformat()
+                (date_range_end + timedelta(days=1)).isoformat(),
+                date_range_start.isoformat()
             )).fetchall()
 
             return [dict(row) for row in rows]
@@ -3,16 +3,181 @@ SBNC Photo Gallery System - EXIF/XMP Tag Writer
 Write tags, people, and event info to photo metadata for portability.
 """
 
+import atexit
+import itertools
+import json
+import os
+import queue
+import select
 import subprocess
 import shutil
+import tempfile
+import threading
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from app.config import EXIFTOOL_WORKERS
+from app.database import get_member_display_names
+
 logger = logging.getLogger(__name__)
 
 # Check if exiftool is available
 EXIFTOOL_AVAILABLE = shutil.which('exiftool') is not None
 
+# Seconds to wait for exiftool to finish one photo
+EXIFTOOL_TIMEOUT = 30
+
+# Quote characters removed from tag values
+_STRIP = str.maketrans('', '', '"\'')
+
+# MWG region dimensions - coordinates are relative (0-1)
+_MWG_DIMENSIONS = 'AppliedToDimensions={W=1,H=1,Unit=normalized}'
+
+# Characters with meaning in exiftool's struct notation are escaped with '|'
+_STRUCT_ESCAPE = str.maketrans({c: '|' + c for c in ',[]{}|'})
+
+
+class _ExifToolDaemon:
+    """
+    A long-running `exiftool -stay_open` process.
+
+    Starting exiftool loads a Perl interpreter and its modules, which costs
+    far more than tagging a single photo. The daemon pays that once, then
+    runs each command written to its stdin. Commands end with a numbered
+    -execute{N}, and exiftool answers "{readyN}" when done, so a reply can
+    never be mistaken for the end of a different command.
+    """
+
+    def __init__(self):
+        self._process = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+
+    def _start(self):
+        self._pid = os.getpid()
+        self._process = subprocess.Popen(
+            ['exiftool', '-stay_open', 'True', '-@', '-'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        # Drain stderr so a chatty exiftool can never block on a full pipe
+        threading.Thread(
+            target=self._log_stderr, args=(self._process.stderr,), daemon=True
+        ).start()
+
+    @staticmethod
+    def _log_stderr(stream):
+        for line in stream:
+            line = line.decode('utf-8', 'replace').strip()
+            if line:
+                logger.warning(f"exiftool warning: {line}")
+
+    def _read_until_ready(self, ready, timeout):
+        fd = self._process.stdout.fileno()
+        deadline = time.monotonic() + timeout
+        output = b''
+        while not output.endswith(ready):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise subprocess.TimeoutExpired('exiftool', timeout)
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                raise RuntimeError("exiftool exited unexpectedly")
+            output += chunk
+        return output[:-len(ready)].decode('utf-8', 'replace')
+
+    def execute(self, args, timeout=EXIFTOOL_TIMEOUT):
+        """
+        Run one exiftool command (arguments without the 'exiftool' itself).
+
+        Returns:
+            The command's stdout as text
+        """
+        with self._lock:
+            # A forked worker must not share its parent's exiftool pipes
+            if self._process is None or self._pid != os.getpid() or self._process.poll() is not None:
+                self._start()
+
+            # One argument per line; a newline inside a value would split it
+            command = ''.join(str(arg).replace('\n', ' ') + '\n' for arg in args)
+            seq = next(self._sequence)
+            try:
+                self._process.stdin.write(f'{command}-execute{seq}\n'.encode('utf-8'))
+                self._process.stdin.flush()
+                return self._read_until_ready(f'{{ready{seq}}}\n'.encode('ascii'), timeout)
+            except Exception:
+                # Output is out of sync now - start fresh next time
+                self._process.kill()
+                self._process = None
+                raise
+
+    def close(self):
+        """Ask exiftool to exit."""
+        with self._lock:
+            if self._process is None or self._pid != os.getpid() or self._process.poll() is not None:
+                return
+            try:
+                self._process.stdin.write(b'-stay_open\nFalse\n')
+                self._process.stdin.flush()
+                self._process.wait(timeout=5)
+            except Exception:
+                self._process.kill()
+            self._process = None
+
+
+class ExifToolPool:
+    """
+    A pool of exiftool daemons, so several photos can be tagged at once.
+
+    Each command runs on whichever daemon is idle. Daemons start on first
+    use and the most recently used one is picked first, so extra exiftool
+    processes only start when commands actually overlap.
+    """
+
+    def __init__(self, size=EXIFTOOL_WORKERS):
+        self.size = max(1, size)
+        self._daemons = [_ExifToolDaemon() for _ in range(self.size)]
+        self._idle = queue.LifoQueue()
+        for daemon in reversed(self._daemons):
+            self._idle.put(daemon)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def execute(self, args, timeout=EXIFTOOL_TIMEOUT):
+        """Run one exiftool command on an idle daemon and return its stdout."""
+        daemon = self._idle.get()
+        try:
+            return daemon.execute(args, timeout)
+        finally:
+            self._idle.put(daemon)
+
+    def submit(self, args, timeout=EXIFTOOL_TIMEOUT):
+        """
+        Queue a command to run in the background.
+
+        Returns:
+            concurrent.futures.Future resolving to the command's stdout
+        """
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.size, thread_name_prefix='exiftool'
+                )
+        return self._executor.submit(self.execute, args, timeout)
+
+    def close(self):
+        """Stop all daemons."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        for daemon in self._daemons:
+            daemon.close()
+
+
+_exiftool = ExifToolPool()
+atexit.register(_exiftool.close)
+
 
 def write_tags_to_photo(photo_path, tags=None, people=None, event_name=None,
                         event_date=None, location=None, faces_with_regions=None,
@@ -45,25 +210,52 @@ def write_tags_to_photo(photo_path, tags=None, people=None, event_name=None,
         logger.error(f"Photo not found: {photo_path}")
         return False
 
-    args = ['exiftool', '-overwrite_original', '-ignoreMinorErrors']
+    args = ['-overwrite_original', '-ignoreMinorErrors']
+    args += _build_tag_args(
+        tags=tags, people=people, event_name=event_name, event_date=event_date,
+        location=location, faces_with_regions=faces_with_regions,
+        submitter_name=submitter_name, submitter_email=submitter_email, source=source
+    )
+    args.append(str(photo_path))
+
+    try:
+        output = _exiftool.execute(args)
+        if "weren't updated" in output:
+            logger.warning(f"exiftool warning for {photo_path}: {output.strip()}")
+        else:
+            logger.debug(f"Wrote EXIF tags to {photo_path}")
+        return True
+    except subprocess.TimeoutExpired:
+        logger.error(f"exiftool timeout for {photo_path}")
+        return False
+    except Exception as e:
+        logger.error(f"Failed to write EXIF to {photo_path}: {e}")
+        return False
+
+
+def _build_tag_args(tags=None, people=None, event_name=None, event_date=None,
+                    location=None, faces_with_regions=None, submitter_name=None,
+                    submitter_email=None, source=None):
+    """Build the exiftool tag-assignment arguments for write_tags_to_photo."""
+    args = []
 
     # Keywords/Subject tags (IPTC and XMP)
     if tags:
         for tag in tags:
             # Clean tag for EXIF (no special chars)
-            clean_tag = str(tag).replace('"', '').replace("'", '')
+            clean_tag = str(tag).translate(_STRIP)
             args.append(f'-IPTC:Keywords={clean_tag}')
             args.append(f'-XMP:Subject={clean_tag}')
 
     # People in image (XMP standard)
     if people:
         for person in people:
-            clean_name = str(person).replace('"', '').replace("'", '')
+            clean_name = str(person).translate(_STRIP)
             args.append(f'-XMP:PersonInImage={clean_name}')
 
     # Event/Caption
     if event_name:
-        clean_event = str(event_name).replace('"', '').replace("'", '')
+        clean_event = str(event_name).translate(_STRIP)
         args.append(f'-IPTC:Caption-Abstract={clean_event}')
         args.append(f'-XMP:Description={clean_event}')
         args.append(f'-IPTC:Headline={clean_event}')
@@ -74,13 +266,13 @@ def write_tags_to_photo(photo_path, tags=None, people=None, event_name=None,
 
     # Location
     if location:
-        clean_loc = str(location).replace('"', '').replace("'", '')
+        clean_loc = str(location).translate(_STRIP)
         args.append(f'-IPTC:Sub-location={clean_loc}')
         args.append(f'-XMP:Location={clean_loc}')
 
     # Submitter info (who sent the photo and how)
     if submitter_name:
-        clean_submitter = str(submitter_name).replace('"', '').replace("'", '')
+        clean_submitter = str(submitter_name).translate(_STRIP)
         # Credit field is standard for "who provided this image"
         args.append(f'-IPTC:Credit={clean_submitter}')
         args.append(f'-XMP:Credit={clean_submitter}')
@@ -88,57 +280,111 @@ def write_tags_to_photo(photo_path, tags=None, people=None, event_name=None,
         args.append(f'-IPTC:SpecialInstructions=Submitted by: {clean_submitter}')
 
     if submitter_email:
-        clean_email = str(submitter_email).replace('"', '').replace("'", '')
+        clean_email = str(submitter_email).translate(_STRIP)
         # Use IPTC Contact field for email
         args.append(f'-XMP-iptcCore:CreatorContactInfoCiEmailWork={clean_email}')
 
     if source:
-        clean_source = str(source).replace('"', '').replace("'", '')
+        clean_source = str(source).translate(_STRIP)
         # Source field indicates how/where image was obtained
         args.append(f'-IPTC:Source={clean_source}')
         args.append(f'-XMP:Source={clean_source}')
 
     # Face regions (XMP-mwg-rs standard - used by Lightroom, Picasa, etc.)
-    # This is more complex and requires proper XMP structure
     if faces_with_regions:
-        # For face regions, we need to build a proper XMP structure
-        # Using exiftool's struct notation
-        for i, face in enumerate(faces_with_regions):
-            if face.get('name') and all(k in face for k in ['x', 'y', 'w', 'h']):
-                # MWG Region format (used by Lightroom, Picasa)
-                # Coordinates are relative (0-1)
-                args.append(f'-XMP-mwg-rs:RegionAppliedToDimensionsUnit=normalized')
-                args.append(f'-XMP-mwg-rs:RegionAppliedToDimensionsW=1')
-                args.append(f'-XMP-mwg-rs:RegionAppliedToDimensionsH=1')
-
-                # Each region
-                prefix = f'-XMP-mwg-rs:RegionAreaX={face["x"]}'
-                args.append(prefix)
-                args.append(f'-XMP-mwg-rs:RegionAreaY={face["y"]}')
-                args.append(f'-XMP-mwg-rs:RegionAreaW={face["w"]}')
-                args.append(f'-XMP-mwg-rs:RegionAreaH={face["h"]}')
-                args.append(f'-XMP-mwg-rs:RegionName={face["name"]}')
-                args.append(f'-XMP-mwg-rs:RegionType=Face')
+        # The whole RegionInfo structure goes in one argument using exiftool's
+        # struct notation, one {...} per face. Assigning it replaces any
+        # regions already in the file, so rewriting a photo doesn't duplicate them.
+        regions = [
+            f'{{Area={{X={face["x"]},Y={face["y"]},W={face["w"]},H={face["h"]},Unit=normalized}},'
+            f'Name={str(face["name"]).translate(_STRUCT_ESCAPE)},Type=Face}}'
+            for face in faces_with_regions
+            if face.get('name') and all(k in face for k in ('x', 'y', 'w', 'h'))
+        ]
+        if regions:
+            args.append(f'-XMP-mwg-rs:RegionInfo={{{_MWG_DIMENSIONS},RegionList=[{",".join(regions)}]}}')
+
+    return args
+
+
+class ExifBatch:
+    """
+    Collect metadata writes for many photos and apply them in one exiftool run.
 
-    args.append(str(photo_path))
+    The per-photo argument groups go into a single argfile separated by
+    -execute, so exiftool starts once for the whole batch. Writes are
+    flushed when the context exits.
 
-    try:
-        result = subprocess.run(args, capture_output=True, text=True, timeout=30)
-        if result.returncode != 0:
-            logger.warning(f"exiftool warning for {photo_path}: {result.stderr}")
-        else:
-            logger.debug(f"Wrote EXIF tags to {photo_path}")
-        return True
-    except subprocess.TimeoutExpired:
-        logger.error(f"exiftool timeout for {photo_path}")
-        return False
-    except Exception as e:
-        logger.error(f"Failed to write EXIF to {photo_path}: {e}")
+    Usage:
+        with ExifBatch() as batch:
+            write_photo_metadata(path, photo_data, faces, tags, event, batch=batch)
+    """
+
+    def __init__(self):
+        self.groups = []
+        self.written = 0
+
+    def add(self, photo_path, **tag_kwargs):
+        """Queue a write; takes the same keyword arguments as write_tags_to_photo."""
+        self.groups.append((Path(photo_path), _build_tag_args(**tag_kwargs)))
+
+    def flush(self):
+        """
+        Write all queued metadata.
+
+        Returns:
+            Number of photos written
+        """
+        groups, self.groups = self.groups, []
+        if not groups:
+            return 0
+
+        if not EXIFTOOL_AVAILABLE:
+            logger.warning("exiftool not installed - skipping EXIF write")
+            return 0
+
+        groups = [(path, args) for path, args in groups if path.exists()]
+        if not groups:
+            return 0
+
+        with tempfile.NamedTemporaryFile('w', suffix='.args', encoding='utf-8', delete=False) as argfile:
+            for i, (path, args) in enumerate(groups):
+                if i:
+                    argfile.write('-execute\n')
+                for arg in args + [str(path)]:
+                    argfile.write(str(arg).replace('\n', ' ') + '\n')
+
+        try:
+            result = subprocess.run(
+                ['exiftool', '-@', argfile.name,
+                 '-common_args', '-overwrite_original', '-ignoreMinorErrors'],
+                capture_output=True, text=True, timeout=EXIFTOOL_TIMEOUT * len(groups)
+            )
+            if result.returncode != 0:
+                logger.warning(f"exiftool warning for batch of {len(groups)}: {result.stderr}")
+            else:
+                logger.debug(f"Wrote EXIF tags to {len(groups)} photos")
+            self.written += len(groups)
+        except subprocess.TimeoutExpired:
+            logger.error(f"exiftool timeout for batch of {len(groups)} photos")
+        except Exception as e:
+            logger.error(f"Failed to write EXIF batch: {e}")
+        finally:
+            os.unlink(argfile.name)
+
+        return len(groups)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
         return False
 
 
 def write_photo_metadata(photo_path, photo_data, faces, tags, event=None,
-                         submitter_name=None, submitter_email=None, source=None):
+                         submitter_name=None, submitter_email=None, source=None,
+                         batch=None):
     """
     Convenience function to write all metadata for a processed photo.
 
@@ -151,6 +397,7 @@ def write_photo_metadata(photo_path, photo_data, faces, tags, event=None,
         submitter_name: Name of person who submitted the photo
         submitter_email: Email of submitter
         source: How photo was submitted (email, upload, bulk_import, etc.)
+        batch: Optional ExifBatch to queue the write on instead of writing now
     """
     # Extract tag strings
     tag_strings = [t['tag'] for t in tags]
@@ -159,20 +406,21 @@ def write_photo_metadata(photo_path, photo_data, faces, tags, event=None,
     people = []
     faces_with_regions = []
 
+    # Confirmed identities, else high-confidence matches
+    face_member_ids = []
     for face in faces:
-        name = None
+        member_id = None
         if face.get('confirmed_member_id') and not face.get('is_guest'):
-            # Get confirmed name from database
-            from app.database import get_member_by_id
-            member = get_member_by_id(face['confirmed_member_id'])
-            if member:
-                name = member['display_name']
+            member_id = face['confirmed_member_id']
         elif face.get('matched_member_id') and face.get('is_high_confidence'):
-            # Use high-confidence match
-            from app.database import get_member_by_id
-            member = get_member_by_id(face['matched_member_id'])
-            if member:
-                name = member['display_name']
+            member_id = face['matched_member_id']
+        face_member_ids.append(member_id)
+
+    # Look up all names in one query
+    names = get_member_display_names(m for m in face_member_ids if m)
+
+    for face, member_id in zip(faces, face_member_ids):
+        name = names.get(member_id)
 
         if name:
             people.append(name)
@@ -202,8 +450,7 @@ def write_photo_metadata(photo_path, photo_data, faces, tags, event=None,
             event_date = str(event['start_date'])[:10].replace('-', ':')
         location = event.get('location_name')
 
-    return write_tags_to_photo(
-        photo_path,
+    tag_kwargs = dict(
         tags=tag_strings,
         people=people,
         event_name=event_name,
@@ -215,6 +462,62 @@ def write_photo_metadata(photo_path, photo_data, faces, tags, event=None,
         source=source
     )
 
+    if batch is not None:
+        batch.add(photo_path, **tag_kwargs)
+        return True
+
+    return write_tags_to_photo(photo_path, **tag_kwargs)
+
+
+def write_photo_metadata_batch(items):
+    """
+    Write metadata for many photos with a single exiftool invocation.
+
+    Args:
+        items: List of dicts of write_photo_metadata keyword arguments
+               (photo_path, photo_data, faces, tags, event, ...)
+
+    Returns:
+        Number of photos written
+    """
+    with ExifBatch() as batch:
+        for item in items:
+            write_photo_metadata(batch=batch, **item)
+    return batch.written
+
+
+# Tags read back by read_embedded_tags; -fast2 skips trailers and maker
+# notes since only IPTC/XMP is needed
+_READ_TAG_ARGS = [
+    '-json', '-fast2', '-q', '-q',
+    '-IPTC:Keywords',
+    '-XMP:Subject',
+    '-XMP:PersonInImage',
+    '-IPTC:Caption-Abstract',
+    '-IPTC:Sub-location',
+    '-IPTC:Credit',
+    '-XMP:Credit',
+    '-IPTC:Source',
+    '-XMP:Source',
+    '-XMP-iptcCore:CreatorContactInfoCiEmailWork',
+]
+
+# Files per exiftool run in read_embedded_tags_batch
+READ_BATCH_SIZE = 500
+
+
+def _embedded_tags_from_json(item):
+    """Map one exiftool -json record to the read_embedded_tags result."""
+    return {
+        'keywords': item.get('Keywords', []) or item.get('Subject', []),
+        'people': item.get('PersonInImage', []),
+        'caption': item.get('Caption-Abstract', ''),
+        'location': item.get('Sub-location', ''),
+        'submitter': item.get('Credit', ''),
+        'submitter_email': item.get('CreatorContactInfoCiEmailWork', ''),
+        'source': item.get('Source', '')
+    }
+
 
 def read_embedded_tags(photo_path):
     """
@@ -228,41 +531,58 @@ def read_embedded_tags(photo_path):
         return {}
 
     try:
-        result = subprocess.run([
-            'exiftool', '-json',
-            '-IPTC:Keywords',
-            '-XMP:Subject',
-            '-XMP:PersonInImage',
-            '-IPTC:Caption-Abstract',
-            '-IPTC:Sub-location',
-            '-IPTC:Credit',
-            '-XMP:Credit',
-            '-IPTC:Source',
-            '-XMP:Source',
-            '-XMP-iptcCore:CreatorContactInfoCiEmailWork',
-            str(photo_path)
-        ], capture_output=True, text=True, timeout=10)
-
-        if result.returncode == 0:
-            import json
-            data = json.loads(result.stdout)
+        # Unreadable files produce no output (errors are quieted by -q -q)
+        output = _exiftool.execute(_READ_TAG_ARGS + [str(photo_path)], timeout=10)
+        if output.strip():
+            data = json.loads(output)
             if data:
-                item = data[0]
-                return {
-                    'keywords': item.get('Keywords', []) or item.get('Subject', []),
-                    'people': item.get('PersonInImage', []),
-                    'caption': item.get('Caption-Abstract', ''),
-                    'location': item.get('Sub-location', ''),
-                    'submitter': item.get('Credit', ''),
-                    'submitter_email': item.get('CreatorContactInfoCiEmailWork', ''),
-                    'source': item.get('Source', '')
-                }
+                return _embedded_tags_from_json(data[0])
     except Exception as e:
         logger.error(f"Failed to read EXIF from {photo_path}: {e}")
 
     return {}
 
 
+def read_embedded_tags_batch(photo_paths):
+    """
+    Read tags back from many photos, READ_BATCH_SIZE files per exiftool command.
+
+    Chunks run concurrently on the exiftool pool. File names are sent over
+    the daemons' stdin, so long lists never hit the OS command-line limit.
+
+    Args:
+        photo_paths: Iterable of photo paths
+
+    Returns:
+        Dict mapping str(photo_path) -> tag dict (as read_embedded_tags).
+        Photos exiftool couldn't read are left out.
+    """
+    if not EXIFTOOL_AVAILABLE:
+        return {}
+
+    paths = [str(p) for p in photo_paths]
+    results = {}
+
+    chunks = [paths[start:start + READ_BATCH_SIZE] for start in range(0, len(paths), READ_BATCH_SIZE)]
+    futures = [
+        _exiftool.submit(_READ_TAG_ARGS + chunk, timeout=10 + len(chunk) // 10)
+        for chunk in chunks
+    ]
+
+    for chunk, future in zip(chunks, futures):
+        try:
+            # Files exiftool couldn't read are simply missing from the output
+            output = future.result()
+            for item in json.loads(output) if output.strip() else []:
+                results[item['SourceFile']] = _embedded_tags_from_json(item)
+        except subprocess.TimeoutExpired:
+            logger.error(f"exiftool timeout reading {len(chunk)} photos")
+        except Exception as e:
+            logger.error(f"Failed to read EXIF from {len(chunk)} photos: {e}")
+
+    return results
+
+
 def check_exiftool():
     """Check if exiftool is installed and return version."""
     if not EXIFTOOL_AVAILABLE:
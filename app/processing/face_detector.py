@@ -3,16 +3,31 @@ SBNC Photo Gallery System - Face Detection and Recognition
 Detect faces in photos and match them to SBNC members.
 """
 
+import asyncio
 import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 import logging
 import pickle
 
+import dlib
 import numpy as np
 import face_recognition
+from face_recognition import api as face_api
+
+try:
+    import httpx
+    HTTPX_SUPPORT = True
+except ImportError:
+    HTTPX_SUPPORT = False
 
 from app.database import get_db
 from app.config import (
+    FACE_DETECTION_MAX_DIM,
+    FACE_PREFILTER_SIZE,
+    FACE_QUANTIZED_MIN_EMBEDDINGS,
     FACE_MATCH_HIGH_CONFIDENCE,
     FACE_MATCH_MEDIUM_CONFIDENCE,
     FACE_MATCH_PUBLIC_EVENT_THRESHOLD
@@ -20,22 +35,138 @@ from app.config import (
 
 logger = logging.getLogger(__name__)
 
+# Number of candidate matches kept for admin review
+MAX_CANDIDATES = 5
+
+# Embeddings are stored as raw float32 bytes: 128 dims x 4 bytes
+EMBEDDING_BYTES = 128 * 4
+
+# Rows re-scored in float32 after the int8 first pass
+QUANTIZED_SHORTLIST = 64
+
+# Concurrent connections used to prefetch member photos
+PHOTO_DOWNLOAD_CONNECTIONS = 32
+
+
+def compute_face_encodings(image, face_locations):
+    """
+    Compute 128-dim encodings for faces at known locations in one dlib call.
+
+    Uses the landmark predictor and ResNet encoder that face_recognition has
+    already loaded, but passes all faces to compute_face_descriptor together
+    instead of one call per face as face_recognition.face_encodings does.
+    Results match face_encodings with its defaults (5-point landmarks, one jitter).
+
+    Args:
+        image: RGB image array
+        face_locations: List of (top, right, bottom, left) boxes
+
+    Returns:
+        List of 128-dim numpy arrays, one per location
+    """
+    if not face_locations:
+        return []
+
+    shapes = dlib.full_object_detections()
+    for top, right, bottom, left in face_locations:
+        shapes.append(face_api.pose_predictor_5_point(image, dlib.rectangle(left, top, right, bottom)))
+
+    descriptors = face_api.face_encoder.compute_face_descriptor(image, shapes, 1)
+    return [np.array(descriptor) for descriptor in descriptors]
+
+
+def embedding_to_bytes(embedding):
+    """Serialize a face embedding for storage as raw float32 bytes."""
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+
+def embedding_from_bytes(blob):
+    """Deserialize a stored face embedding (raw float32 or legacy pickle)."""
+    if len(blob) == EMBEDDING_BYTES:
+        return np.frombuffer(blob, dtype=np.float32)
+    return np.asarray(pickle.loads(blob), dtype=np.float32)
+
 
 class FaceDetector:
     """Detect and recognize faces in photos."""
 
+    # Loaded embedding sets shared by all detectors, keyed by the member-id
+    # set (empty = everyone). Entries carry the DB version they were built at.
+    _embedding_cache = OrderedDict()
+    EMBEDDING_CACHE_SIZE = 16
+
     def __init__(self):
-        self._member_embeddings = None
+        # (N, 128) float32 matrix, one row per embedding in _member_lookup
+        self._member_embeddings_matrix = None
+        self._member_sq_norms = None
+        self._member_ids = None
         self._member_lookup = None
+        # int8 copy of the matrix and per-row scales, for large sets only
+        self._member_quantized = None
+        self._member_scales = None
+        # (member_ids array, RSVP list, matching row indices) from the last lookup
+        self._rsvp_rows = None
+
+    @classmethod
+    def clear_embedding_cache(cls):
+        """Drop all cached embedding sets and the stored snapshot (after embeddings change)."""
+        cls._embedding_cache.clear()
+        with get_db() as conn:
+            conn.execute('DELETE FROM face_embeddings_blob')
+
+    @staticmethod
+    def _embeddings_version(conn):
+        """Cheap fingerprint of the embedding and member tables."""
+        return tuple(conn.execute('''
+            SELECT (SELECT MAX(id) FROM face_embeddings),
+                   (SELECT COUNT(*) FROM face_embeddings),
+                   (SELECT MAX(updated_at) FROM members)
+        ''').fetchone())
 
     def load_member_embeddings(self, member_ids=None):
         """
         Load face embeddings for members.
 
+        Sets already loaded for the same members are reused from a
+        class-level cache, as long as the embeddings haven't changed since.
+        The full set is read from the face_embeddings_blob snapshot when
+        it is current, and the snapshot is rebuilt when it isn't.
+
         Args:
             member_ids: Optional list of member IDs to load (e.g., event RSVPs)
                        If None, loads all embeddings.
         """
+        key = frozenset(member_ids or [])
+        cache = FaceDetector._embedding_cache
+
+        with get_db() as conn:
+            version = self._embeddings_version(conn)
+
+        embedding_set = cache.get(key)
+        if embedding_set is None or embedding_set['version'] != version:
+            if member_ids:
+                embedding_set = self._read_embedding_set(member_ids)
+            else:
+                embedding_set = self._read_snapshot(version)
+                if embedding_set is None:
+                    embedding_set = self._read_embedding_set()
+                    self._write_snapshot(embedding_set, version)
+            embedding_set['version'] = version
+            cache[key] = embedding_set
+            while len(cache) > self.EMBEDDING_CACHE_SIZE:
+                cache.popitem(last=False)
+            logger.info(f"Loaded {len(embedding_set['lookup'])} face embeddings")
+        cache.move_to_end(key)
+
+        self._member_embeddings_matrix = embedding_set['matrix']
+        self._member_sq_norms = embedding_set['sq_norms']
+        self._member_ids = embedding_set['member_ids']
+        self._member_lookup = embedding_set['lookup']
+        self._member_quantized = embedding_set['quantized']
+        self._member_scales = embedding_set['scales']
+
+    def _read_embedding_set(self, member_ids=None):
+        """Read embeddings from the database into matrix form."""
         with get_db() as conn:
             if member_ids:
                 placeholders = ','.join('?' * len(member_ids))
@@ -54,19 +185,99 @@ class FaceDetector:
                     WHERE m.face_recognition_opt_out = FALSE
                 ''').fetchall()
 
-        self._member_embeddings = []
-        self._member_lookup = []
+        matrix = np.empty((len(rows), 128), dtype=np.float32)
+        lookup = []
+        legacy = []
 
-        for row in rows:
-            embedding = pickle.loads(row['embedding'])
-            self._member_embeddings.append(embedding)
-            self._member_lookup.append({
+        for i, row in enumerate(rows):
+            matrix[i] = embedding_from_bytes(row['embedding'])
+            if len(row['embedding']) != EMBEDDING_BYTES:
+                legacy.append((embedding_to_bytes(matrix[i]), row['id']))
+            lookup.append({
                 'embedding_id': row['id'],
                 'member_id': row['member_id'],
                 'display_name': row['display_name']
             })
 
-        logger.info(f"Loaded {len(self._member_embeddings)} face embeddings")
+        if legacy:
+            # Rewrite pickled embeddings in the compact format as we meet them
+            with get_db() as conn:
+                conn.executemany(
+                    'UPDATE face_embeddings SET embedding = ? WHERE id = ?', legacy
+                )
+            logger.info(f"Converted {len(legacy)} pickled face embeddings to float32")
+
+        return self._embedding_set(matrix, lookup)
+
+    def _read_snapshot(self, version):
+        """
+        Load the full embedding set from face_embeddings_blob.
+
+        Returns:
+            Embedding set dict, or None if there is no snapshot for this version
+        """
+        with get_db() as conn:
+            snapshot = conn.execute('''
+                SELECT embedding_ids, matrix FROM face_embeddings_blob
+                WHERE version = ?
+                ORDER BY snapshot_id DESC LIMIT 1
+            ''', (json.dumps(version),)).fetchone()
+            if snapshot is None:
+                return None
+
+            # Names and opt-outs come from the live tables; only the
+            # vectors come from the snapshot
+            members = {
+                row['id']: row for row in conn.execute('''
+                    SELECT fe.id, fe.member_id, m.display_name
+                    FROM face_embeddings fe
+                    JOIN members m ON fe.member_id = m.id
+                    WHERE m.face_recognition_opt_out = FALSE
+                ''')
+            }
+
+        embedding_ids = np.frombuffer(snapshot['embedding_ids'], dtype=np.int64)
+        matrix = np.frombuffer(snapshot['matrix'], dtype=np.float32).reshape(-1, 128)
+        keep = np.fromiter((int(i) in members for i in embedding_ids), dtype=bool, count=len(embedding_ids))
+        if not keep.all():
+            matrix, embedding_ids = matrix[keep], embedding_ids[keep]
+
+        lookup = [
+            {
+                'embedding_id': int(i),
+                'member_id': members[int(i)]['member_id'],
+                'display_name': members[int(i)]['display_name']
+            }
+            for i in embedding_ids
+        ]
+        return self._embedding_set(matrix, lookup)
+
+    @staticmethod
+    def _write_snapshot(embedding_set, version):
+        """Replace the stored snapshot with a full embedding set."""
+        embedding_ids = np.array([info['embedding_id'] for info in embedding_set['lookup']], dtype=np.int64)
+        with get_db() as conn:
+            conn.execute('DELETE FROM face_embeddings_blob')
+            conn.execute('''
+                INSERT INTO face_embeddings_blob (version, embedding_ids, matrix)
+                VALUES (?, ?, ?)
+            ''', (json.dumps(version), embedding_ids.tobytes(), embedding_set['matrix'].tobytes()))
+
+    def _embedding_set(self, matrix, lookup):
+        """Package a matrix and its row lookup for matching."""
+        quantized, scales = None, None
+        if len(lookup) >= FACE_QUANTIZED_MIN_EMBEDDINGS:
+            quantized, scales = self._quantize(matrix)
+
+        return {
+            'matrix': matrix,
+            # Squared row norms, so distances need only a matrix-vector product
+            'sq_norms': np.einsum('ij,ij->i', matrix, matrix),
+            'quantized': quantized,
+            'scales': scales,
+            'member_ids': np.array([str(info['member_id']) for info in lookup]),
+            'lookup': lookup
+        }
 
     def detect_faces(self, image_path):
         """
@@ -79,27 +290,18 @@ class FaceDetector:
             # Load image
             image = face_recognition.load_image_file(image_path)
 
-            # Detect face locations
-            face_locations = face_recognition.face_locations(image, model='hog')
+            # Detect face locations on a downscaled copy - HOG cost grows with
+            # pixel count, and detection doesn't improve past ~1MP
+            small, scale = self._downscale_for_detection(image)
+            face_locations = face_recognition.face_locations(small, model='hog')
+            if scale != 1.0:
+                face_locations = self._rescale_locations(face_locations, scale, image.shape)
 
             if not face_locations:
                 logger.debug(f"No faces found in {image_path}")
                 return []
 
-            # Get face encodings (embeddings)
-            face_encodings = face_recognition.face_encodings(image, face_locations)
-
-            faces = []
-            for location, encoding in zip(face_locations, face_encodings):
-                top, right, bottom, left = location
-                faces.append({
-                    'box_top': top,
-                    'box_right': right,
-                    'box_bottom': bottom,
-                    'box_left': left,
-                    'embedding': encoding
-                })
-
+            faces = self._encode_faces(image, face_locations)
             logger.info(f"Detected {len(faces)} faces in {image_path}")
             return faces
 
@@ -107,6 +309,91 @@ class FaceDetector:
             logger.error(f"Face detection failed for {image_path}: {e}")
             return []
 
+    @staticmethod
+    def _probably_has_faces(image_path):
+        """
+        Quick check for faces on a small thumbnail.
+
+        JPEGs are decoded at reduced size (draft mode), so photos with no
+        faces (landscapes, food) are rejected without a full-resolution
+        decode. Returns True if unsure, so real faces aren't skipped.
+        Off unless FACE_PREFILTER_SIZE is set, since faces too small to
+        find on the thumbnail would be skipped too.
+        """
+        from PIL import Image, ImageOps
+
+        if FACE_PREFILTER_SIZE <= 0:
+            return True
+
+        size = (FACE_PREFILTER_SIZE, FACE_PREFILTER_SIZE)
+        try:
+            with Image.open(image_path) as img:
+                img.draft('RGB', size)
+                img = ImageOps.exif_transpose(img).convert('RGB')
+                img.thumbnail(size)
+                thumb = np.asarray(img)
+            return bool(face_recognition.face_locations(
+                thumb, number_of_times_to_upsample=0, model='hog'
+            ))
+        except Exception as e:
+            logger.debug(f"Face prefilter failed for {image_path}: {e}")
+            return True
+
+    @staticmethod
+    def _downscale_for_detection(image):
+        """
+        Shrink an image array to FACE_DETECTION_MAX_DIM on its long side.
+
+        Returns:
+            (image, scale) - the original image and 1.0 if no resize was needed
+        """
+        from PIL import Image
+
+        height, width = image.shape[:2]
+        if FACE_DETECTION_MAX_DIM <= 0 or max(height, width) <= FACE_DETECTION_MAX_DIM:
+            return image, 1.0
+
+        scale = FACE_DETECTION_MAX_DIM / max(height, width)
+        small = Image.fromarray(image).resize(
+            (int(width * scale), int(height * scale)), Image.BILINEAR
+        )
+        return np.asarray(small), scale
+
+    @staticmethod
+    def _rescale_locations(face_locations, scale, shape):
+        """Map (top, right, bottom, left) boxes back to full-resolution pixels."""
+        height, width = shape[:2]
+        return [
+            (
+                max(0, int(top / scale)),
+                min(width, int(right / scale)),
+                min(height, int(bottom / scale)),
+                max(0, int(left / scale))
+            )
+            for top, right, bottom, left in face_locations
+        ]
+
+    @staticmethod
+    def _encode_faces(image, face_locations):
+        """Compute embeddings for detected locations and build face dicts."""
+        if not face_locations:
+            return []
+
+        # Get face encodings (embeddings)
+        face_encodings = compute_face_encodings(image, face_locations)
+
+        faces = []
+        for location, encoding in zip(face_locations, face_encodings):
+            top, right, bottom, left = location
+            faces.append({
+                'box_top': top,
+                'box_right': right,
+                'box_bottom': bottom,
+                'box_left': left,
+                'embedding': encoding
+            })
+        return faces
+
     def match_face(self, face_embedding, is_public_event=False, rsvp_member_ids=None):
         """
         Match a face embedding to known members.
@@ -119,10 +406,10 @@ class FaceDetector:
         Returns:
             dict with match results and candidates
         """
-        if self._member_embeddings is None:
+        if self._member_embeddings_matrix is None:
             self.load_member_embeddings()
 
-        if not self._member_embeddings:
+        if not len(self._member_embeddings_matrix):
             return {
                 'matched_member_id': None,
                 'match_confidence': None,
@@ -130,26 +417,45 @@ class FaceDetector:
                 'candidates': []
             }
 
+        # Determine match threshold
+        if is_public_event:
+            high_threshold = FACE_MATCH_PUBLIC_EVENT_THRESHOLD
+        else:
+            high_threshold = FACE_MATCH_HIGH_CONFIDENCE
+
+        probe = np.asarray(face_embedding, dtype=np.float32)
+        probe_sq_norm = probe.dot(probe)
+        rsvp_set = set(rsvp_member_ids or [])
+
+        # Attendees first: score only their rows, and stop there if one of
+        # them is already a high-confidence match
+        rsvp_rows = self._get_rsvp_rows(rsvp_member_ids) if rsvp_member_ids else None
+        if rsvp_rows is not None and len(rsvp_rows) and len(rsvp_rows) < len(self._member_ids):
+            rsvp_sq_distances = self._sq_distances(probe, probe_sq_norm, rsvp_rows)
+            nearest = self._smallest(rsvp_sq_distances, MAX_CANDIDATES)
+            if rsvp_sq_distances[nearest[0]] <= high_threshold ** 2:
+                candidates = self._build_candidates(
+                    rsvp_rows[nearest], rsvp_sq_distances[nearest], rsvp_set
+                )
+                return self._match_result(candidates, high_threshold)
+
         # Calculate distances to all known faces
-        distances = face_recognition.face_distance(
-            self._member_embeddings,
-            face_embedding
-        )
+        if self._member_quantized is not None:
+            sq_distances = self._sq_distances_quantized(probe, probe_sq_norm, rsvp_rows)
+        else:
+            sq_distances = self._sq_distances(probe, probe_sq_norm)
 
-        # Create candidate list with distances
-        candidates = []
-        for i, distance in enumerate(distances):
-            member_info = self._member_lookup[i]
-            candidates.append({
-                'member_id': member_info['member_id'],
-                'display_name': member_info['display_name'],
-                'distance': float(distance),
-                'confidence': self._distance_to_confidence(distance),
-                'is_rsvp': member_info['member_id'] in (rsvp_member_ids or [])
-            })
+        # Only the closest few are ever reported, so select them with
+        # argpartition rather than sorting everyone. With an RSVP list, also
+        # keep the closest attendees so they can be prioritized below.
+        nearest = self._smallest(sq_distances, MAX_CANDIDATES)
+        if rsvp_rows is not None and len(rsvp_rows):
+            nearest_rsvp = rsvp_rows[self._smallest(sq_distances[rsvp_rows], MAX_CANDIDATES)]
+            nearest = np.union1d(nearest, nearest_rsvp)
+            nearest = nearest[np.argsort(sq_distances[nearest], kind='stable')]
 
-        # Sort by distance (lower is better)
-        candidates.sort(key=lambda x: x['distance'])
+        # Create candidate list with distances (sorted, lower is better)
+        candidates = self._build_candidates(nearest, sq_distances[nearest], rsvp_set)
 
         # Prioritize RSVP members if close enough
         if rsvp_member_ids:
@@ -163,12 +469,89 @@ class FaceDetector:
                     if best_rsvp['distance'] <= best_overall['distance'] + 0.1:
                         candidates = rsvp_candidates + [c for c in candidates if not c['is_rsvp']]
 
-        # Determine match threshold
-        if is_public_event:
-            high_threshold = FACE_MATCH_PUBLIC_EVENT_THRESHOLD
+        return self._match_result(candidates, high_threshold)
+
+    def _get_rsvp_rows(self, rsvp_member_ids):
+        """Row indices of the loaded embeddings that belong to RSVP'd members."""
+        cached = self._rsvp_rows
+        if cached and cached[0] is self._member_ids and cached[1] == rsvp_member_ids:
+            return cached[2]
+
+        rows = np.flatnonzero(
+            np.isin(self._member_ids, [str(m) for m in rsvp_member_ids])
+        )
+        self._rsvp_rows = (self._member_ids, list(rsvp_member_ids), rows)
+        return rows
+
+    def _sq_distances(self, probe, probe_sq_norm, rows=None):
+        """
+        Squared L2 distances from probe to the loaded embeddings.
+
+        |m - p|^2 = |m|^2 + |p|^2 - 2 m.p, with m.p for every row in one GEMV.
+        If rows is given, only those rows are scored.
+        """
+        matrix = self._member_embeddings_matrix
+        sq_norms = self._member_sq_norms
+        if rows is not None:
+            matrix = matrix[rows]
+            sq_norms = sq_norms[rows]
+        return sq_norms + probe_sq_norm - 2.0 * (matrix @ probe)
+
+    @staticmethod
+    def _quantize(vectors):
+        """
+        Quantize float32 rows to int8 with one scale per row.
+
+        Returns:
+            (int8 array, float32 scales) where row ~= int8_row * scale
+        """
+        vectors = np.atleast_2d(vectors)
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+
+    def _sq_distances_quantized(self, probe, probe_sq_norm, extra_rows=None):
+        """
+        Squared distances using an int8 first pass over the whole matrix.
+
+        The int8 dot products (accumulated in int32) read a quarter of the
+        memory of the float32 matrix. The closest QUANTIZED_SHORTLIST rows,
+        plus extra_rows (RSVP attendees), are then scored exactly in float32;
+        every other row is reported as infinitely far.
+        """
+        probe_q, probe_scale = self._quantize(probe)
+        dots = np.einsum('ij,j->i', self._member_quantized, probe_q[0], dtype=np.int32)
+        approx = self._member_sq_norms + probe_sq_norm - 2.0 * (dots * self._member_scales * probe_scale[0])
+
+        if len(approx) > QUANTIZED_SHORTLIST:
+            shortlist = np.argpartition(approx, QUANTIZED_SHORTLIST)[:QUANTIZED_SHORTLIST]
         else:
-            high_threshold = FACE_MATCH_HIGH_CONFIDENCE
+            shortlist = np.arange(len(approx))
+        if extra_rows is not None and len(extra_rows):
+            shortlist = np.union1d(shortlist, extra_rows)
 
+        sq_distances = np.full(len(approx), np.inf, dtype=np.float32)
+        sq_distances[shortlist] = self._sq_distances(probe, probe_sq_norm, shortlist)
+        return sq_distances
+
+    def _build_candidates(self, rows, sq_distances, rsvp_set):
+        """Build candidate dicts for embedding rows, in the order given."""
+        distances = np.sqrt(np.maximum(sq_distances, 0.0))
+        candidates = []
+        for i, distance in zip(rows, distances):
+            member_info = self._member_lookup[i]
+            candidates.append({
+                'member_id': member_info['member_id'],
+                'display_name': member_info['display_name'],
+                'distance': float(distance),
+                'confidence': self._distance_to_confidence(distance),
+                'is_rsvp': member_info['member_id'] in rsvp_set
+            })
+        return candidates
+
+    def _match_result(self, candidates, high_threshold):
+        """Turn a ranked candidate list into a match_face result."""
         # Get top candidate
         top = candidates[0] if candidates else None
         matched_member_id = None
@@ -182,10 +565,19 @@ class FaceDetector:
             'matched_member_id': matched_member_id,
             'match_confidence': 1 - top['distance'] if top else None,
             'match_rank': match_rank,
-            'candidates': candidates[:5],  # Top 5 candidates
+            'candidates': candidates[:MAX_CANDIDATES],
             'is_high_confidence': top['distance'] <= high_threshold if top else False
         }
 
+    @staticmethod
+    def _smallest(values, k):
+        """Indices of the k smallest values, in ascending order of value."""
+        if len(values) > k:
+            indices = np.argpartition(values, k - 1)[:k]
+        else:
+            indices = np.arange(len(values))
+        return indices[np.argsort(values[indices], kind='stable')]
+
     def _distance_to_confidence(self, distance):
         """Convert face distance to a confidence percentage."""
         # Distance of 0 = 100% confidence
@@ -206,6 +598,11 @@ class FaceDetector:
         Returns:
             List of face dicts with matches
         """
+        # Optionally reject photos without people from a thumbnail
+        if not self._probably_has_faces(image_path):
+            logger.debug(f"No faces found in {image_path} (prefilter)")
+            return []
+
         # Get RSVP list if event specified
         rsvp_member_ids = None
         if event_id:
@@ -251,15 +648,103 @@ class FaceDetector:
             return [row['member_id'] for row in rows]
 
 
-def build_face_database_from_profiles():
+# Per-process HTTP session used by _fetch_and_encode workers
+_worker_session = None
+
+
+def _member_photo_url(member):
+    """Pick the photo to learn a member's face from, and its source label."""
+    # Prefer directory headshot over profile photo
+    if member.get('directory_headshot_url'):
+        return member['directory_headshot_url'], 'directory'
+    return member.get('profile_photo_url'), 'profile'
+
+
+async def _download_all(urls):
     """
-    Build the face embeddings database from member profile photos.
-    This is a one-time setup or periodic refresh task.
+    Download many URLs concurrently over a shared connection pool.
+
+    Returns:
+        Dict mapping url -> response bytes, or the exception if it failed
+    """
+    limits = httpx.Limits(max_connections=PHOTO_DOWNLOAD_CONNECTIONS)
+    async with httpx.AsyncClient(limits=limits, timeout=30, follow_redirects=True) as client:
+        async def fetch(url):
+            response = await client.get(url)
+            response.raise_for_status()
+            return response.content
+
+        results = await asyncio.gather(*(fetch(url) for url in urls), return_exceptions=True)
+    return dict(zip(urls, results))
+
+
+def _fetch_and_encode(member, content=None):
     """
-    import requests
+    Download a member's photo and compute its face encoding.
+
+    Runs in a worker process, so it touches no database handles.
+
+    Args:
+        member: dict with id, display_name, profile_photo_url, directory_headshot_url
+        content: Photo bytes if already downloaded (skips the download)
+
+    Returns:
+        Tuple of (member, source, encoding_bytes or None, error message or None)
+    """
+    global _worker_session
     from PIL import Image
     from io import BytesIO
 
+    photo_url, source = _member_photo_url(member)
+
+    try:
+        if content is None:
+            import requests
+
+            if _worker_session is None:
+                _worker_session = requests.Session()
+
+            # Download the photo
+            response = _worker_session.get(photo_url, timeout=30)
+            response.raise_for_status()
+            content = response.content
+
+        # Load as image
+        img = Image.open(BytesIO(content))
+
+        # Convert to RGB if necessary
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        # Detect face (face_recognition takes the pixel array directly)
+        image = np.asarray(img)
+        face_locations = face_recognition.face_locations(image)
+
+        if len(face_locations) == 1:
+            # Found exactly one face - good
+            encoding = compute_face_encodings(image, face_locations)[0]
+            return member, source, embedding_to_bytes(encoding), None
+        elif len(face_locations) == 0:
+            return member, source, None, f"No face found in photo for {member['display_name']}"
+        else:
+            return member, source, None, f"Multiple faces in photo for {member['display_name']}"
+
+    except Exception as e:
+        return member, source, None, f"Failed to process {member['display_name']}: {e}"
+
+
+def build_face_database_from_profiles(max_workers=None):
+    """
+    Build the face embeddings database from member profile photos.
+    This is a one-time setup or periodic refresh task.
+
+    Face encoding runs in a process pool; database writes happen here in
+    the parent as results come back. With httpx installed, all photos are
+    first downloaded concurrently; otherwise each worker downloads its own.
+
+    Args:
+        max_workers: Number of worker processes (defaults to CPU count)
+    """
     logger.info("Building face database from member profiles...")
 
     with get_db() as conn:
@@ -271,78 +756,61 @@ def build_face_database_from_profiles():
             AND (profile_photo_url IS NOT NULL OR directory_headshot_url IS NOT NULL)
         ''').fetchall()
 
+    members = [
+        dict(row) for row in rows
+        if row['directory_headshot_url'] or row['profile_photo_url']
+    ]
+
     processed = 0
     failed = 0
 
-    for row in rows:
-        member = dict(row)
-        # Prefer directory headshot over profile photo
-        photo_url = member.get('directory_headshot_url') or member.get('profile_photo_url')
-        source = 'directory' if member.get('directory_headshot_url') else 'profile'
-
-        if not photo_url:
-            continue
-
-        try:
-            # Download the photo
-            response = requests.get(photo_url, timeout=30)
-            response.raise_for_status()
-
-            # Load as image
-            img = Image.open(BytesIO(response.content))
-
-            # Convert to RGB if necessary
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-
-            # Save temporarily
-            temp_path = f"/tmp/face_build_{member['id']}.jpg"
-            img.save(temp_path, 'JPEG')
-
-            # Detect face
-            image = face_recognition.load_image_file(temp_path)
-            face_locations = face_recognition.face_locations(image)
-
-            if len(face_locations) == 1:
-                # Found exactly one face - good
-                encoding = face_recognition.face_encodings(image, face_locations)[0]
-
-                with get_db() as conn:
-                    # Check if embedding already exists
-                    existing = conn.execute('''
-                        SELECT id FROM face_embeddings
-                        WHERE member_id = ? AND source = ?
-                    ''', (member['id'], source)).fetchone()
-
-                    if existing:
-                        conn.execute('''
-                            UPDATE face_embeddings
-                            SET embedding = ?
-                            WHERE id = ?
-                        ''', (pickle.dumps(encoding), existing['id']))
-                    else:
-                        conn.execute('''
-                            INSERT INTO face_embeddings (member_id, embedding, source)
-                            VALUES (?, ?, ?)
-                        ''', (member['id'], pickle.dumps(encoding), source))
-
-                processed += 1
-                logger.debug(f"Added face for {member['display_name']}")
-
-            elif len(face_locations) == 0:
-                logger.warning(f"No face found in photo for {member['display_name']}")
-                failed += 1
-            else:
-                logger.warning(f"Multiple faces in photo for {member['display_name']}")
+    downloads = {}
+    if HTTPX_SUPPORT and members:
+        urls = list({_member_photo_url(member)[0] for member in members})
+        downloads = asyncio.run(_download_all(urls))
+        logger.info(f"Downloaded {len(urls)} member photos")
+
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        futures = []
+        for member in members:
+            content = downloads.get(_member_photo_url(member)[0])
+            if isinstance(content, Exception):
+                logger.warning(f"Failed to process {member['display_name']}: {content}")
                 failed += 1
+                continue
+            futures.append(executor.submit(_fetch_and_encode, member, content))
 
-            # Cleanup temp file
-            Path(temp_path).unlink(missing_ok=True)
-
-        except Exception as e:
-            logger.error(f"Failed to process {member['display_name']}: {e}")
-            failed += 1
+        for future in as_completed(futures):
+            member, source, encoding_bytes, error = future.result()
 
+            if encoding_bytes is None:
+                logger.warning(error)
+                failed += 1
+                continue
+
+            with get_db() as conn:
+                # Check if embedding already exists
+                existing = conn.execute('''
+                    SELECT id FROM face_embeddings
+                    WHERE member_id = ? AND source = ?
+                ''', (member['id'], source)).fetchone()
+
+                if existing:
+                    conn.execute('''
+                        UPDATE face_embeddings
+                        SET embedding = ?
+                        WHERE id = ?
+                    ''', (encoding_bytes, existing['id']))
+                else:
+                    conn.execute('''
+                        INSERT INTO face_embeddings (member_id, embedding, source)
+                        VALUES (?, ?, ?)
+                    ''', (member['id'], encoding_bytes, source))
+
+            processed += 1
+            logger.debug(f"Added face for {member['display_name']}")
+
+    FaceDetector.clear_embedding_cache()
     logger.info(f"Face database build complete: {processed} processed, {failed} failed")
     return {'processed': processed, 'failed': failed}
 
@@ -365,6 +833,7 @@ def save_confirmed_face_embedding(photo_face_id, member_id):
         conn.execute('''
             INSERT INTO face_embeddings (member_id, embedding, source)
             VALUES (?, ?, 'confirmed')
-        ''', (member_id, face['embedding']))
+        ''', (member_id, embedding_to_bytes(embedding_from_bytes(face['embedding']))))
 
-        return True
+    FaceDetector.clear_embedding_cache()
+    return True
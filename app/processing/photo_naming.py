@@ -13,15 +13,42 @@ This replaces generic names like IMG_1234.jpg with:
 
 import re
 import hashlib
+import time
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Dict
 
-
+# Characters not allowed in the short ID
+_NON_ALNUM_RE = re.compile(r'[^a-z0-9]')
+
+# Common EXIF datetime formats
+_EXIF_DATETIME_FORMATS = (
+    "%Y:%m:%d %H:%M:%S",      # Standard EXIF
+    "%Y-%m-%d %H:%M:%S",      # ISO-ish
+    "%Y-%m-%dT%H:%M:%S",      # ISO
+    "%Y:%m:%d",               # Date only
+    "%Y-%m-%d",               # ISO date only
+)
+
+# Format for each well-formed layout, keyed by (length, year separator,
+# date/time separator)
+_EXIF_DATETIME_LAYOUTS = {
+    (19, ':', ' '): _EXIF_DATETIME_FORMATS[0],
+    (19, '-', ' '): _EXIF_DATETIME_FORMATS[1],
+    (19, '-', 'T'): _EXIF_DATETIME_FORMATS[2],
+    (10, ':', ''): _EXIF_DATETIME_FORMATS[3],
+    (10, '-', ''): _EXIF_DATETIME_FORMATS[4],
+}
+
+
+@lru_cache(maxsize=1024)
 def get_initials(name: str, max_chars: int = 2) -> str:
     """
     Extract initials from a name.
 
+    Cached - an export repeats the same few submitter names many times.
+
     Examples:
         "John Doe" -> "JD"
         "Mary Jane Watson" -> "MJ" (first 2)
@@ -49,11 +76,12 @@ def generate_short_id(photo_path: str, length: int = 4) -> str:
     """
     Generate a short unique ID from photo path/content.
 
-    Uses hash of original path + timestamp for uniqueness.
+    Uses hash of original path + a monotonic clock reading for uniqueness;
+    unlike wall-clock time it never repeats when the system clock steps back.
     """
-    unique_string = f"{photo_path}_{datetime.now().isoformat()}"
-    hash_hex = hashlib.md5(unique_string.encode()).hexdigest()
-    return hash_hex[:length].lower()
+    unique_string = f"{photo_path}_{time.monotonic_ns()}"
+    # BLAKE2b with a tiny digest produces just the bytes needed
+    return hashlib.blake2b(unique_string.encode(), digest_size=(length + 1) // 2).hexdigest()[:length]
 
 
 def format_datetime_for_filename(dt: datetime) -> str:
@@ -66,36 +94,50 @@ def format_datetime_for_filename(dt: datetime) -> str:
     Returns:
         String like "20250915_143022"
     """
-    return dt.strftime("%Y%m%d_%H%M%S")
+    # Plain integer formatting - strftime re-parses its format every call
+    return f"{dt.year:04d}{dt.month:02d}{dt.day:02d}_{dt.hour:02d}{dt.minute:02d}{dt.second:02d}"
 
 
+@lru_cache(maxsize=4096)
 def parse_exif_datetime(exif_datetime: str) -> Optional[datetime]:
     """
     Parse EXIF datetime string to datetime object.
 
     EXIF format is typically "YYYY:MM:DD HH:MM:SS"
+
+    Results are cached, and well-formed strings are routed straight to
+    their format by length and separators, so they cost one strptime.
+    Anything else (e.g. unpadded fields) falls back to trying each format.
     """
     if not exif_datetime:
         return None
 
-    # Common EXIF datetime formats
-    formats = [
-        "%Y:%m:%d %H:%M:%S",      # Standard EXIF
-        "%Y-%m-%d %H:%M:%S",      # ISO-ish
-        "%Y-%m-%dT%H:%M:%S",      # ISO
-        "%Y:%m:%d",               # Date only
-        "%Y-%m-%d",               # ISO date only
-    ]
-
-    for fmt in formats:
+    s = exif_datetime.strip()
+    n = len(s)
+    if n > 4:
+        layout = (n, s[4], s[10] if n > 10 else '')
+        fmt = _EXIF_DATETIME_LAYOUTS.get(layout)
+        if fmt:
+            try:
+                return datetime.strptime(s, fmt)
+            except ValueError:
+                pass
+
+    for fmt in _EXIF_DATETIME_FORMATS:
         try:
-            return datetime.strptime(exif_datetime.strip(), fmt)
+            return datetime.strptime(s, fmt)
         except ValueError:
             continue
 
     return None
 
 
+@lru_cache(maxsize=256)
+def _parse_event_date(event_date: str) -> datetime:
+    """Parse the date part of an ISO event date; photos of one event share it."""
+    return datetime.fromisoformat(event_date[:10])
+
+
 def generate_export_filename(
     original_path: str,
     taken_at: Optional[datetime] = None,
@@ -141,17 +183,17 @@ def generate_export_filename(
     if not date_part and event_date:
         try:
             if isinstance(event_date, str):
-                event_dt = datetime.fromisoformat(event_date[:10])
+                event_dt = _parse_event_date(event_date)
             else:
                 event_dt = event_date
             # Use noon as placeholder time for event date
-            date_part = event_dt.strftime("%Y%m%d") + "_120000"
+            date_part = f"{event_dt.year:04d}{event_dt.month:02d}{event_dt.day:02d}_120000"
         except:
             date_part = None
 
     # Last fallback - current timestamp
     if not date_part:
-        date_part = datetime.now().strftime("%Y%m%d_%H%M%S")
+        date_part = format_datetime_for_filename(datetime.now())
 
     # Get submitter initials
     initials = get_initials(submitter_name)
@@ -161,7 +203,7 @@ def generate_export_filename(
         # Use last 4 chars of photo ID if available
         short_id = str(photo_id)[-4:].lower()
         # Ensure it's alphanumeric
-        short_id = re.sub(r'[^a-z0-9]', '', short_id) or generate_short_id(original_path)
+        short_id = _NON_ALNUM_RE.sub('', short_id) or generate_short_id(original_path)
     else:
         short_id = generate_short_id(original_path)
 
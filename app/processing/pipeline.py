@@ -3,40 +3,82 @@ SBNC Photo Gallery System - Processing Pipeline
 Orchestrate the full photo processing workflow.
 """
 
+import json
+import multiprocessing
+import sqlite3
 import uuid
-import pickle
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 import logging
 
+try:
+    import orjson
+    ORJSON_SUPPORT = True
+except ImportError:
+    # orjson not installed - fall back to the standard library encoder
+    ORJSON_SUPPORT = False
+
 from app.database import get_db
-from app.config import PhotoStatus, PHOTO_STORAGE_ROOT
+from app.config import (
+    PhotoStatus, PHOTO_STORAGE_ROOT, QUEUE_WORKERS, QUEUE_IO_WORKERS,
+    NEAR_DUPLICATE_MAX_DISTANCE
+)
 from app.ingest.queue_manager import QueueManager
+from app.ingest.upload_handler import recover_stale_uploads
 from app.processing.exif_extractor import ExifExtractor
+from app.processing.duplicate_detector import (
+    check_duplicate_by_hash, compute_file_hash, compute_perceptual_hash,
+    find_near_duplicate, load_perceptual_hashes
+)
 from app.processing.event_matcher import EventMatcher
-from app.processing.face_detector import FaceDetector
+from app.processing.face_detector import FaceDetector, embedding_to_bytes
 from app.processing.thumbnail_creator import ThumbnailCreator
 from app.processing.tag_generator import TagGenerator, save_photo_tags
-from app.processing.exif_writer import write_photo_metadata
+from app.processing.exif_writer import ExifBatch, write_photo_metadata
 
 logger = logging.getLogger(__name__)
 
+# Bound once; called for every photo in the queue loop
+_utcnow = datetime.utcnow
+
+# Stored for faces with no candidates, which is most of them in crowd shots
+_EMPTY_JSON = '[]'
+
+
+def _dumps_json(value):
+    """Serialize a face's candidate list to a JSON string."""
+    if not value:
+        return _EMPTY_JSON
+    if ORJSON_SUPPORT:
+        # Candidate scores can be NumPy floats
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(value)
+
 
 class PhotoProcessor:
     """Process a single photo through the full pipeline."""
 
-    def __init__(self, queue_item):
+    def __init__(self, queue_item, exif_batch=None, caches=None):
         """
         Initialize with a queue item.
 
         Args:
             queue_item: dict from processing_queue table
+            exif_batch: Optional ExifBatch to queue the metadata write on
+            caches: Optional lookups shared across a queue run, from
+                    _prefetch_caches(): 'members' ({id: display_name}),
+                    'events' ({id: event dict}, filled as events are matched)
+                    and 'perceptual_hashes' (None unless near-duplicate
+                    flagging is on)
         """
         self.queue_item = queue_item
+        self.exif_batch = exif_batch
+        self.caches = caches or {'members': {}, 'events': {}}
         self.photo_path = Path(queue_item['photo_path'])
         self.submitter_member_id = queue_item.get('submitter_member_id')
         self.submitter_email = queue_item.get('submitter_email')
-        self.photo_id = str(uuid.uuid4())
+        self.photo_id = uuid.uuid4().hex
         self.result = {}
 
     def process(self):
@@ -49,29 +91,41 @@ class PhotoProcessor:
         logger.info(f"Processing photo: {self.photo_path}")
 
         try:
+            # Skip files already in the gallery before any images are written.
+            # The queue's I/O stage has usually hashed the file already.
+            content_hash = self.queue_item.get('content_hash') or compute_file_hash(self.photo_path)
+            is_duplicate, existing = check_duplicate_by_hash(content_hash, str(self.photo_path))
+            if is_duplicate:
+                return self._duplicate(existing.get('original_filename'))
+
             # 1. Extract EXIF metadata
             exif_data = self._extract_exif()
 
             # 2. Create thumbnails and save originals
             image_data = self._create_images()
 
-            # 3. Match to event
+            # 3. Match to event (the event row is fetched once and shared below)
             event_match = self._match_event(exif_data)
+            event = self._get_event(event_match)
 
             # 4. Detect and recognize faces
-            faces = self._process_faces(event_match)
+            faces = self._process_faces(event_match, event)
 
             # 5. Generate tags
-            tags = self._generate_tags(exif_data, event_match, faces)
-
-            # 6. Save to database
-            photo_record = self._save_photo_record(exif_data, image_data, event_match)
+            tags = self._generate_tags(exif_data, event_match, faces, event)
 
-            # 7. Save faces to database
-            self._save_faces(faces)
+            # 6. Save photo, faces and tags to the database in one transaction
+            try:
+                self._save_to_database(exif_data, image_data, event_match, faces, tags, content_hash)
+            except sqlite3.IntegrityError as e:
+                if 'content_hash' not in str(e):
+                    raise
+                # Another copy of the file was stored since the check above
+                self._remove_images(image_data)
+                return self._duplicate(None)
 
-            # 8. Write tags to EXIF/XMP for portability
-            self._write_exif_tags(image_data, exif_data, faces, tags, event_match)
+            # 7. Write tags to EXIF/XMP for portability
+            self._write_exif_tags(image_data, exif_data, faces, tags, event)
 
             self.result = {
                 'success': True,
@@ -92,6 +146,23 @@ class PhotoProcessor:
             }
             return self.result
 
+    def _duplicate(self, existing_filename):
+        """Build the process() result for a file that's already in the gallery."""
+        logger.info(f"Skipping duplicate photo: {self.photo_path}")
+        self.result = {
+            'success': False,
+            'duplicate': True,
+            'error': f"Duplicate photo - already imported as {existing_filename or 'unknown'}"
+        }
+        return self.result
+
+    @staticmethod
+    def _remove_images(image_data):
+        """Delete the stored original and thumbnails of a photo that wasn't saved."""
+        for key in ('original_path', 'display_path', 'thumb_path'):
+            if image_data.get(key):
+                (PHOTO_STORAGE_ROOT / image_data[key]).unlink(missing_ok=True)
+
     def _extract_exif(self):
         """Extract EXIF metadata."""
         extractor = ExifExtractor(self.photo_path)
@@ -116,20 +187,28 @@ class PhotoProcessor:
             submitter_member_id=self.submitter_member_id
         )
 
-    def _process_faces(self, event_match):
-        """Detect and recognize faces."""
-        detector = FaceDetector()
+    def _get_event(self, event_match):
+        """Fetch the matched event's row as a dict, or None if unmatched."""
+        event_id = event_match.get('event_id')
+        if not event_id:
+            return None
 
-        # Get event info for public event check
-        is_public_event = False
-        if event_match.get('event_id'):
+        events = self.caches['events']
+        if event_id not in events:
             with get_db() as conn:
-                event = conn.execute(
-                    'SELECT is_public FROM events WHERE id = ?',
-                    (event_match['event_id'],)
+                event_row = conn.execute(
+                    'SELECT * FROM events WHERE id = ?',
+                    (event_id,)
                 ).fetchone()
-                if event:
-                    is_public_event = event['is_public']
+            events[event_id] = dict(event_row) if event_row else None
+        return events[event_id]
+
+    def _process_faces(self, event_match, event):
+        """Detect and recognize faces."""
+        detector = FaceDetector()
+
+        # Public events use stricter matching
+        is_public_event = bool(event and event['is_public'])
 
         return detector.process_photo_faces(
             self.photo_path,
@@ -137,106 +216,110 @@ class PhotoProcessor:
             is_public_event=is_public_event
         )
 
-    def _generate_tags(self, exif_data, event_match, faces):
+    def _generate_tags(self, exif_data, event_match, faces, event):
         """Generate tags for the photo."""
         photo_data = {
             'taken_at': exif_data.get('taken_at'),
             'event_id': event_match.get('event_id'),
+            'event': event,
             'submitter_member_id': self.submitter_member_id,
             'faces': faces
         }
 
-        generator = TagGenerator(photo_data)
-        tags = generator.generate_all_tags()
+        generator = TagGenerator(photo_data, member_names=self.caches['members'])
+        return generator.generate_all_tags()
 
-        save_photo_tags(self.photo_id, tags)
-        return tags
+    def _save_to_database(self, exif_data, image_data, event_match, faces, tags, content_hash):
+        """
+        Save the photo record, its faces and its tags.
+
+        All rows are written in one transaction, so they share one commit
+        and a failure leaves no partial photo behind. The content hash is
+        stored so later uploads of the file are caught as duplicates.
+        """
+        # Done before the transaction opens, to keep it short
+        perceptual_hash = compute_perceptual_hash(self.photo_path)
+        review_notes = self._near_duplicate_note(perceptual_hash)
 
-    def _save_photo_record(self, exif_data, image_data, event_match):
-        """Save the photo record to the database."""
         with get_db() as conn:
-            conn.execute('''
-                INSERT INTO photos (
-                    id, original_filename, submitter_member_id, submitter_email,
-                    submitted_at, submitted_via,
-                    taken_at, gps_lat, gps_lon, camera_make, camera_model,
-                    event_id, event_match_confidence, event_match_method,
-                    processed_at, status,
-                    original_path, display_path, thumb_path,
-                    width, height, file_size
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                self.photo_id,
-                self.queue_item.get('original_filename'),
-                self.submitter_member_id,
-                self.submitter_email,
-                self.queue_item.get('submitted_at'),
-                self.queue_item.get('source', 'upload'),
-                exif_data.get('taken_at'),
-                exif_data.get('gps_lat'),
-                exif_data.get('gps_lon'),
-                exif_data.get('camera_make'),
-                exif_data.get('camera_model'),
-                event_match.get('event_id'),
-                event_match.get('confidence'),
-                event_match.get('match_method'),
-                datetime.utcnow(),
-                PhotoStatus.AWAITING_APPROVAL,
-                image_data.get('original_path'),
-                image_data.get('display_path'),
-                image_data.get('thumb_path'),
-                image_data.get('width'),
-                image_data.get('height'),
-                image_data.get('file_size')
-            ))
+            self._save_photo_record(conn, exif_data, image_data, event_match,
+                                    content_hash, perceptual_hash, review_notes)
+            _insert_faces(conn, self.photo_id, faces)
+            save_photo_tags(self.photo_id, tags, conn=conn)
 
-        return self.photo_id
+        known_hashes = self.caches.get('perceptual_hashes')
+        if known_hashes is not None and perceptual_hash is not None:
+            known_hashes.append((perceptual_hash, self.photo_id, self.queue_item.get('original_filename')))
 
-    def _save_faces(self, faces):
-        """Save detected faces to the database."""
-        import json
+    def _near_duplicate_note(self, perceptual_hash):
+        """
+        Review note for a photo that looks like one already stored.
 
-        with get_db() as conn:
-            for face in faces:
-                # Serialize candidates as JSON
-                candidates_json = json.dumps(face.get('candidates', []))
-
-                conn.execute('''
-                    INSERT INTO photo_faces (
-                        photo_id, box_top, box_right, box_bottom, box_left,
-                        embedding, matched_member_id, match_confidence, match_rank,
-                        candidates_json
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    self.photo_id,
-                    face['box_top'],
-                    face['box_right'],
-                    face['box_bottom'],
-                    face['box_left'],
-                    pickle.dumps(face['embedding']),
-                    face.get('matched_member_id'),
-                    face.get('match_confidence'),
-                    face.get('match_rank'),
-                    candidates_json
-                ))
-
-    def _write_exif_tags(self, image_data, exif_data, faces, tags, event_match):
+        Returns:
+            Note text, or None if there's no close match or flagging is off
+        """
+        known_hashes = self.caches.get('perceptual_hashes')
+        if perceptual_hash is None or known_hashes is None:
+            return None
+
+        match = find_near_duplicate(perceptual_hash, known_hashes, NEAR_DUPLICATE_MAX_DISTANCE)
+        if not match:
+            return None
+
+        photo_id, filename, distance = match
+        logger.info(f"Possible near-duplicate: {self.photo_path} looks like photo {photo_id} ({distance} bits apart)")
+        return f"Possible duplicate of {filename or 'unknown'} (photo {photo_id})"
+
+    def _save_photo_record(self, conn, exif_data, image_data, event_match,
+                           content_hash, perceptual_hash, review_notes=None):
+        """Insert the photo record."""
+        conn.execute('''
+            INSERT INTO photos (
+                id, original_filename, submitter_member_id, submitter_email,
+                submitted_at, submitted_via,
+                taken_at, gps_lat, gps_lon, camera_make, camera_model,
+                event_id, event_match_confidence, event_match_method,
+                processed_at, status,
+                original_path, display_path, thumb_path,
+                width, height, file_size,
+                content_hash, perceptual_hash, review_notes
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            self.photo_id,
+            self.queue_item.get('original_filename'),
+            self.submitter_member_id,
+            self.submitter_email,
+            self.queue_item.get('submitted_at'),
+            self.queue_item.get('source', 'upload'),
+            exif_data.get('taken_at'),
+            exif_data.get('gps_lat'),
+            exif_data.get('gps_lon'),
+            exif_data.get('camera_make'),
+            exif_data.get('camera_model'),
+            event_match.get('event_id'),
+            event_match.get('confidence'),
+            event_match.get('match_method'),
+            _utcnow(),
+            PhotoStatus.AWAITING_APPROVAL,
+            image_data.get('original_path'),
+            image_data.get('display_path'),
+            image_data.get('thumb_path'),
+            image_data.get('width'),
+            image_data.get('height'),
+            image_data.get('file_size'),
+            content_hash,
+            perceptual_hash,
+            review_notes
+        ))
+
+        return self.photo_id
+
+    def _write_exif_tags(self, image_data, exif_data, faces, tags, event):
         """Write tags to the original photo's EXIF/XMP metadata."""
         try:
             # Get the original file path
             original_path = PHOTO_STORAGE_ROOT / image_data.get('original_path')
 
-            # Get event details if matched
-            event = None
-            if event_match.get('event_id'):
-                with get_db() as conn:
-                    event_row = conn.execute(
-                        'SELECT * FROM events WHERE id = ?',
-                        (event_match['event_id'],)
-                    ).fetchone()
-                    if event_row:
-                        event = dict(event_row)
-
             # Prepare photo data for EXIF writer
             photo_data = {
                 'width': image_data.get('width'),
@@ -244,60 +327,266 @@ class PhotoProcessor:
             }
 
             # Write metadata to original
-            write_photo_metadata(original_path, photo_data, faces, tags, event)
-            logger.debug(f"Wrote EXIF tags to {original_path}")
+            write_photo_metadata(original_path, photo_data, faces, tags, event,
+                                 batch=self.exif_batch)
 
         except Exception as e:
             # Don't fail the whole process if EXIF writing fails
             logger.warning(f"Failed to write EXIF tags: {e}")
 
 
-def process_queue(batch_size=50):
+def _insert_faces(conn, photo_id, faces):
+    """Insert detected faces for a photo with a single executemany."""
+    conn.executemany('''
+        INSERT INTO photo_faces (
+            photo_id, box_top, box_right, box_bottom, box_left,
+            embedding, matched_member_id, match_confidence, match_rank,
+            candidates_json
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [
+        (
+            photo_id,
+            face['box_top'],
+            face['box_right'],
+            face['box_bottom'],
+            face['box_left'],
+            embedding_to_bytes(face['embedding']),
+            face.get('matched_member_id'),
+            face.get('match_confidence'),
+            face.get('match_rank'),
+            # Serialize candidates as JSON
+            _dumps_json(face.get('candidates', []))
+        )
+        for face in faces
+    ])
+
+
+def _prefetch_caches():
+    """
+    Load lookups shared by every photo in a queue run.
+
+    Returns:
+        dict with 'members' ({member_id: display_name}), an empty 'events'
+        dict that PhotoProcessor fills as events are matched, and
+        'perceptual_hashes' (stored photos' hashes for near-duplicate
+        flagging, or None when NEAR_DUPLICATE_MAX_DISTANCE disables it)
+    """
+    with get_db() as conn:
+        rows = conn.execute('SELECT id, display_name FROM members').fetchall()
+    return {
+        'members': {row['id']: row['display_name'] for row in rows},
+        'events': {},
+        'perceptual_hashes': load_perceptual_hashes() if NEAR_DUPLICATE_MAX_DISTANCE >= 0 else None
+    }
+
+
+# Lookups for the photos handled by one queue worker process
+_worker_caches = None
+
+# Queue workers start while the queue-io threads are running, and a fork()
+# then could copy a lock one of them holds. forkserver children are forked
+# from a clean single-threaded server instead, which imports this module
+# once up front so each worker starts with it loaded.
+if 'forkserver' in multiprocessing.get_all_start_methods():
+    _queue_mp_context = multiprocessing.get_context('forkserver')
+    _queue_mp_context.set_forkserver_preload([__name__])
+else:
+    _queue_mp_context = multiprocessing.get_context()
+
+
+def _init_queue_worker():
+    """Process pool initializer: load the shared lookups once per worker."""
+    global _worker_caches
+    _worker_caches = _prefetch_caches()
+
+
+def _hash_source(item):
+    """I/O stage: read and hash a queued file ahead of the CPU-bound stages."""
+    return dict(item, content_hash=compute_file_hash(item['photo_path']))
+
+
+def _process_one(item):
+    """Run one queue item in a worker process; returns the process() result."""
+    return PhotoProcessor(item, caches=_worker_caches).process()
+
+
+class _QueueUpdates:
+    """
+    Collect queue status updates and commit them commit_every at a time.
+
+    Marking each item completed or failed in its own transaction costs one
+    commit per photo; grouping them costs one per commit_every photos.
+    Source files are removed only once their completion (or rejection as a
+    duplicate) is committed.
+    """
+
+    def __init__(self, queue, stats, commit_every):
+        self.queue = queue
+        self.stats = stats
+        self.commit_every = max(1, commit_every)
+        self.completed = []
+        self.failures = []
+        self.duplicates = []
+        self.source_paths = []
+
+    def record(self, item, result):
+        """Record a finished item from its process() result."""
+        if result['success']:
+            self.completed.append(item['id'])
+            self.source_paths.append(item['photo_path'])
+            self.stats['processed'] += 1
+        elif result.get('duplicate'):
+            self.duplicates.append((item['id'], result['error']))
+            self.source_paths.append(item['photo_path'])
+            self.stats['duplicates'] += 1
+        else:
+            self.fail(item['id'], result.get('error', 'Unknown error'))
+            return
+        self._maybe_flush()
+
+    def fail(self, queue_id, error_message):
+        """Record a failed item."""
+        self.failures.append((queue_id, error_message))
+        self.stats['failed'] += 1
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if len(self.completed) + len(self.failures) + len(self.duplicates) >= self.commit_every:
+            self.flush()
+
+    def flush(self):
+        """Commit the collected updates and clean up finished source files."""
+        if not self.completed and not self.failures and not self.duplicates:
+            return
+        self.queue.mark_finished_many(self.completed, self.failures, self.duplicates)
+        for photo_path in self.source_paths:
+            Path(photo_path).unlink(missing_ok=True)
+        self.completed, self.failures, self.duplicates, self.source_paths = [], [], [], []
+
+
+# Queue status updates committed per transaction by default
+QUEUE_COMMIT_EVERY = 10
+
+# Items 'processing' this long were left behind by a run that died
+STALE_PROCESSING_MINUTES = 60
+
+
+def process_queue(batch_size=50, max_workers=None, commit_every=None, io_workers=None):
     """
     Process pending items from the queue.
 
+    Work runs in two stages. A thread pool reads and hashes the queued
+    files (I/O-bound, and hashlib releases the GIL), handing each item on
+    as soon as it's ready. EXIF extraction, thumbnailing and face
+    detection are CPU-bound, so those run on a process pool. Queue status
+    updates and source file cleanup stay in this process.
+
     Args:
         batch_size: Maximum number of items to process
+        max_workers: Worker processes (defaults to QUEUE_WORKERS; 1 runs
+                     everything in this process)
+        commit_every: Queue status updates per transaction (defaults to
+                      QUEUE_COMMIT_EVERY), so a crash loses at most that
+                      many finished items' status
+        io_workers: Threads for the read/hash stage (defaults to
+                    QUEUE_IO_WORKERS)
 
     Returns:
         dict with processing statistics
     """
+    # Uploads whose background check died with its process would never
+    # reach 'pending'; check them here so they join this run
+    recover_stale_uploads()
+
     queue = QueueManager()
+    # Items claimed by a run that crashed before committing their status
+    released = queue.recover_stale_processing(STALE_PROCESSING_MINUTES)
+    if released:
+        logger.warning(f"Released {released} queue items left processing by an earlier run")
     pending_items = queue.get_pending_items(limit=batch_size)
 
     stats = {
         'total': len(pending_items),
         'processed': 0,
-        'failed': 0
+        'failed': 0,
+        'duplicates': 0
     }
 
-    for item in pending_items:
-        queue_id = item['id']
-        queue.mark_processing(queue_id)
+    if pending_items:
+        queue.mark_processing_many([item['id'] for item in pending_items])
+
+    updates = _QueueUpdates(queue, stats, commit_every or QUEUE_COMMIT_EVERY)
+    workers = min(max_workers or QUEUE_WORKERS, len(pending_items))
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, io_workers or QUEUE_IO_WORKERS),
+                                thread_name_prefix='queue-io') as io_pool:
+            hashed = {io_pool.submit(_hash_source, item): item for item in pending_items}
+            if workers > 1:
+                _process_queue_parallel(updates, hashed, workers)
+            elif pending_items:
+                _process_queue_serial(updates, hashed)
+    finally:
+        updates.flush()
 
-        try:
-            processor = PhotoProcessor(item)
-            result = processor.process()
+    logger.info(f"Queue processing complete: {stats}")
+    return stats
 
-            if result['success']:
-                queue.mark_completed(queue_id, result.get('photo_id'))
-                stats['processed'] += 1
 
-                # Clean up the source file
-                source_path = Path(item['photo_path'])
-                if source_path.exists():
-                    source_path.unlink()
-            else:
-                queue.mark_failed(queue_id, result.get('error', 'Unknown error'))
-                stats['failed'] += 1
+def _ready_item(hash_future, item):
+    """Return the item from the I/O stage, or the bare item if hashing failed."""
+    try:
+        return hash_future.result()
+    except Exception as e:
+        logger.warning(f"Could not prefetch queue item {item['id']}: {e}")
+        return item
 
-        except Exception as e:
-            queue.mark_failed(queue_id, str(e))
-            stats['failed'] += 1
-            logger.error(f"Queue item {queue_id} failed: {e}")
 
-    logger.info(f"Queue processing complete: {stats}")
-    return stats
+def _process_queue_serial(updates, hashed):
+    """
+    Process items one after another in this process.
+
+    The I/O stage keeps hashing upcoming files while each one is processed.
+    """
+    caches = _prefetch_caches()
+
+    # Metadata for the whole batch is written by one exiftool run at the end
+    with ExifBatch() as exif_batch:
+        for hash_future, item in hashed.items():
+            queue_id = item['id']
+
+            try:
+                item = _ready_item(hash_future, item)
+                processor = PhotoProcessor(item, exif_batch=exif_batch, caches=caches)
+                updates.record(item, processor.process())
+
+            except Exception as e:
+                updates.fail(queue_id, str(e))
+                logger.error(f"Queue item {queue_id} failed: {e}")
+
+
+def _process_queue_parallel(updates, hashed, workers):
+    """
+    Process items on a pool of worker processes.
+
+    Each item is submitted as soon as the I/O stage has hashed it, so the
+    workers start on the first photos while later ones are still being read.
+    """
+    # Workers write metadata through their own exiftool daemons
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_queue_mp_context,
+                             initializer=_init_queue_worker) as executor:
+        futures = {}
+        for hash_future in as_completed(hashed):
+            item = hashed[hash_future]
+            futures[executor.submit(_process_one, _ready_item(hash_future, item))] = item
+
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                updates.record(item, future.result())
+
+            except Exception as e:
+                updates.fail(item['id'], str(e))
+                logger.error(f"Queue item {item['id']} failed: {e}")
 
 
 def reprocess_photo(photo_id):
@@ -339,36 +628,13 @@ def reprocess_photo(photo_id):
         is_public_event=is_public_event
     )
 
-    # Clear existing unconfirmed faces
+    # Replace existing unconfirmed faces with the new ones in one transaction
     with get_db() as conn:
         conn.execute('''
             DELETE FROM photo_faces
             WHERE photo_id = ? AND confirmed = FALSE
         ''', (photo_id,))
-
-    # Save new faces
-    import json
-    with get_db() as conn:
-        for face in faces:
-            candidates_json = json.dumps(face.get('candidates', []))
-            conn.execute('''
-                INSERT INTO photo_faces (
-                    photo_id, box_top, box_right, box_bottom, box_left,
-                    embedding, matched_member_id, match_confidence, match_rank,
-                    candidates_json
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                photo_id,
-                face['box_top'],
-                face['box_right'],
-                face['box_bottom'],
-                face['box_left'],
-                pickle.dumps(face['embedding']),
-                face.get('matched_member_id'),
-                face.get('match_confidence'),
-                face.get('match_rank'),
-                candidates_json
-            ))
+        _insert_faces(conn, photo_id, faces)
 
     return {'success': True, 'faces_detected': len(faces)}
 
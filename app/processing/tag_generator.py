@@ -3,19 +3,37 @@ SBNC Photo Gallery System - Tag Generation
 Generate searchable tags for photos based on metadata.
 """
 
-import re
 from datetime import datetime
+from functools import lru_cache
 import logging
 
-from app.database import get_db
+from app.database import get_db, get_member_display_names
 
 logger = logging.getLogger(__name__)
 
+# Word separators for CamelCase tags (besides whitespace)
+_TAG_SEPARATORS = frozenset('-_,./')
+
+# Longest tag kept
+MAX_TAG_LENGTH = 30
+
+
+@lru_cache(maxsize=128)
+def _month_year_tag(year, month):
+    """Month-Year tag such as "Nov2024"; photos in a batch share a few months."""
+    return datetime(year, month, 1).strftime('%b%Y')
+
+
+@lru_cache(maxsize=1024)
+def _parse_iso_datetime(value):
+    """datetime.fromisoformat, cached for timestamps repeated across a batch."""
+    return datetime.fromisoformat(value)
+
 
 class TagGenerator:
     """Generate tags for photos."""
 
-    def __init__(self, photo_data):
+    def __init__(self, photo_data, member_names=None):
         """
         Initialize with photo data.
 
@@ -23,38 +41,78 @@ class TagGenerator:
             photo_data: dict with photo metadata including:
                 - taken_at: datetime
                 - event_id: event ID if matched
+                - event: optional events row (dict) for event_id, if already fetched
                 - submitter_member_id: who submitted
                 - faces: list of detected/identified faces
+            member_names: Optional prefetched {member_id: display_name};
+                          members missing from it are looked up in the database
         """
         self.photo_data = photo_data
+        self.member_names = member_names or {}
         self.tags = []
 
     def generate_all_tags(self):
         """Generate all tags for the photo."""
         self.tags = []
+        event, member_names = self._load_lookups()
 
         # Date-based tags
         if self.photo_data.get('taken_at'):
             self._add_date_tags(self.photo_data['taken_at'])
 
         # Event-based tags
-        if self.photo_data.get('event_id'):
-            self._add_event_tags(self.photo_data['event_id'])
+        if event:
+            self._add_event_tags(event)
 
         # Person tags from faces
         if self.photo_data.get('faces'):
-            self._add_person_tags(self.photo_data['faces'])
+            self._add_person_tags(self.photo_data['faces'], member_names)
 
         # Submitter tag
         if self.photo_data.get('submitter_member_id'):
-            self._add_submitter_tag(self.photo_data['submitter_member_id'])
+            self._add_submitter_tag(self.photo_data['submitter_member_id'], member_names)
 
         return self.tags
 
+    def _load_lookups(self):
+        """
+        Fetch the event and every member name the tags need up front.
+
+        Returns:
+            (event row or None, {member_id: display_name})
+        """
+        member_ids = {
+            self._face_member_id(face) for face in self.photo_data.get('faces') or []
+        }
+        member_ids.add(self.photo_data.get('submitter_member_id'))
+        member_ids.discard(None)
+
+        event = self.photo_data.get('event')
+        if event is None and self.photo_data.get('event_id'):
+            with get_db() as conn:
+                event = conn.execute('''
+                    SELECT name, activity_group, location_name
+                    FROM events WHERE id = ?
+                ''', (self.photo_data['event_id'],)).fetchone()
+
+        names = {m: self.member_names[m] for m in member_ids if m in self.member_names}
+        missing = member_ids - names.keys()
+        if missing:
+            names.update(get_member_display_names(missing))
+
+        return event, names
+
+    @staticmethod
+    def _face_member_id(face):
+        """Member a face is tagged as, or None for guests and unknown faces."""
+        if face.get('is_guest'):
+            return None
+        return face.get('confirmed_member_id') or face.get('matched_member_id')
+
     def _add_date_tags(self, taken_at):
         """Add date-based tags."""
         if isinstance(taken_at, str):
-            taken_at = datetime.fromisoformat(taken_at)
+            taken_at = _parse_iso_datetime(taken_at)
 
         # Year tag
         self.tags.append({
@@ -63,23 +121,13 @@ class TagGenerator:
         })
 
         # Month-Year tag (e.g., "Nov2024")
-        month_year = taken_at.strftime('%b%Y')
         self.tags.append({
-            'tag': month_year,
+            'tag': _month_year_tag(taken_at.year, taken_at.month),
             'tag_type': 'date'
         })
 
-    def _add_event_tags(self, event_id):
+    def _add_event_tags(self, event):
         """Add event and activity tags."""
-        with get_db() as conn:
-            event = conn.execute('''
-                SELECT name, activity_group, location_name
-                FROM events WHERE id = ?
-            ''', (event_id,)).fetchone()
-
-        if not event:
-            return
-
         # Event name tag (sanitized)
         event_tag = self._sanitize_tag(event['name'])
         if event_tag:
@@ -106,35 +154,22 @@ class TagGenerator:
                     'tag_type': 'location'
                 })
 
-    def _add_person_tags(self, faces):
+    def _add_person_tags(self, faces, member_names):
         """Add tags for identified people."""
         for face in faces:
-            member_id = face.get('confirmed_member_id') or face.get('matched_member_id')
-            if member_id and not face.get('is_guest'):
-                with get_db() as conn:
-                    member = conn.execute(
-                        'SELECT display_name FROM members WHERE id = ?',
-                        (member_id,)
-                    ).fetchone()
-
-                if member:
-                    person_tag = self._sanitize_tag(member['display_name'])
-                    if person_tag:
-                        self.tags.append({
-                            'tag': person_tag,
-                            'tag_type': 'person'
-                        })
-
-    def _add_submitter_tag(self, member_id):
+            member_id = self._face_member_id(face)
+            if member_id in member_names:
+                person_tag = self._sanitize_tag(member_names[member_id])
+                if person_tag:
+                    self.tags.append({
+                        'tag': person_tag,
+                        'tag_type': 'person'
+                    })
+
+    def _add_submitter_tag(self, member_id, member_names):
         """Add tag for who submitted the photo."""
-        with get_db() as conn:
-            member = conn.execute(
-                'SELECT display_name FROM members WHERE id = ?',
-                (member_id,)
-            ).fetchone()
-
-        if member:
-            submitter_tag = f"SubmittedBy{self._sanitize_tag(member['display_name'])}"
+        if member_id in member_names:
+            submitter_tag = f"SubmittedBy{self._sanitize_tag(member_names[member_id])}"
             self.tags.append({
                 'tag': submitter_tag,
                 'tag_type': 'submitter'
@@ -148,27 +183,54 @@ class TagGenerator:
         if not text:
             return None
 
-        # Split on spaces and special characters
-        words = re.split(r'[\s\-_,./]+', text)
-
-        # Capitalize each word and join
-        camel = ''.join(word.capitalize() for word in words if word)
-
-        # Remove any remaining non-alphanumeric characters
-        camel = re.sub(r'[^a-zA-Z0-9]', '', camel)
-
-        # Limit length
-        return camel[:30] if camel else None
-
-
-def save_photo_tags(photo_id, tags, auto_generated=True):
-    """Save tags for a photo to the database."""
-    with get_db() as conn:
-        for tag in tags:
-            conn.execute('''
-                INSERT OR IGNORE INTO photo_tags (photo_id, tag, tag_type, auto_generated)
-                VALUES (?, ?, ?, ?)
-            ''', (photo_id, tag['tag'], tag['tag_type'], auto_generated))
+        # One pass: separators start a new word, whose first character is
+        # upper-cased and the rest lower-cased; anything that isn't an ASCII
+        # letter or digit is dropped
+        out = []
+        word_start = True
+        for c in text:
+            if c.isspace() or c in _TAG_SEPARATORS:
+                word_start = True
+                continue
+            c = c.upper() if word_start else c.lower()
+            word_start = False
+            if c.isascii() and c.isalnum():
+                out.append(c)
+                if len(out) == MAX_TAG_LENGTH:
+                    break
+
+        return ''.join(out) or None
+
+
+def save_photo_tags(photo_id, tags, auto_generated=True, conn=None):
+    """
+    Save tags for a photo to the database.
+
+    Args:
+        photo_id: Photo ID
+        tags: List of tag dicts from TagGenerator
+        auto_generated: Whether the tags were generated automatically
+        conn: Open connection to write on, as part of the caller's
+              transaction (a new transaction is used if not given)
+    """
+    if conn is None:
+        with get_db() as conn:
+            save_photo_tags(photo_id, tags, auto_generated, conn)
+        return
+
+    # A person in several faces yields repeated tags; keep the first of each,
+    # as INSERT OR IGNORE would
+    tag_types = {}
+    for tag in tags:
+        tag_types.setdefault(tag['tag'], tag['tag_type'])
+
+    conn.executemany('''
+        INSERT OR IGNORE INTO photo_tags (photo_id, tag, tag_type, auto_generated)
+        VALUES (?, ?, ?, ?)
+    ''', [
+        (photo_id, tag, tag_type, auto_generated)
+        for tag, tag_type in tag_types.items()
+    ])
 
 
 def get_photo_tags(photo_id):
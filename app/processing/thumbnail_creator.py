@@ -9,19 +9,25 @@ Supports:
                Olympus (ORF), Panasonic (RW2), Pentax (PEF), Adobe DNG
 """
 
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
 from pathlib import Path
 from datetime import datetime
+import hashlib
+import os
+import shutil
 import uuid
 import logging
 
-from PIL import Image
+import PIL
+from PIL import Image, features
 import pillow_heif
 
 from app.config import (
     ORIGINALS_DIR, DISPLAY_DIR, THUMBS_DIR,
     THUMBNAIL_SIZE, DISPLAY_SIZE,
     JPEG_QUALITY_THUMB, JPEG_QUALITY_DISPLAY,
-    RAW_EXTENSIONS
+    RAW_EXTENSIONS, IMAGE_BACKEND
 )
 
 # Register HEIF opener for Apple formats
@@ -35,14 +41,183 @@ try:
 except ImportError:
     RAW_SUPPORT = False
 
+# Try to import pyvips for faster, lower-memory resizing
+try:
+    import pyvips
+    VIPS_SUPPORT = True
+except (ImportError, OSError):
+    # pyvips not installed or libvips missing - use Pillow throughout
+    VIPS_SUPPORT = False
+
 logger = logging.getLogger(__name__)
 
+# JPEG encoder settings per version. Originals keep full chroma resolution;
+# display images are progressive with optimized Huffman tables (smaller files
+# for the version served most); thumbnails stay baseline, where progressive
+# scans cost more to decode than they save.
+_ORIGINAL_JPEG_OPTIONS = {'quality': 95, 'subsampling': 0}
+_DISPLAY_JPEG_OPTIONS = {'quality': JPEG_QUALITY_DISPLAY, 'progressive': True, 'optimize': True}
+_THUMB_JPEG_OPTIONS = {'quality': JPEG_QUALITY_THUMB}
+
+# The same settings in libvips' jpegsave terms
+_VIPS_ORIGINAL_OPTIONS = {'Q': 95, 'optimize_coding': True, 'subsample_mode': 'off'}
+_VIPS_DISPLAY_OPTIONS = {'Q': JPEG_QUALITY_DISPLAY, 'interlace': True, 'optimize_coding': True}
+_VIPS_THUMB_OPTIONS = {'Q': JPEG_QUALITY_THUMB}
+
+# Pillow-SIMD releases carry a .postN suffix
+PILLOW_SIMD = '.post' in PIL.__version__
+
+
+def _cpu_simd_level():
+    """Best SIMD extension this CPU reports, from /proc/cpuinfo (Linux only)."""
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith(('flags', 'Features')):
+                    flags = set(line.split(':', 1)[1].split())
+                    break
+            else:
+                return 'unknown'
+    except OSError:
+        return 'unknown'
+
+    for flag in ('avx512f', 'avx2', 'sse4_1', 'asimd', 'neon'):
+        if flag in flags:
+            return flag
+    return 'none'
+
+
+def _select_backend():
+    """Pick the resize backend: 'vips', 'pillow-simd' or 'pillow'."""
+    if VIPS_SUPPORT and IMAGE_BACKEND != 'pillow':
+        return 'vips'
+    return 'pillow-simd' if PILLOW_SIMD else 'pillow'
+
+
+RESIZE_BACKEND = _select_backend()
+
+# Log the choice and what it rests on, so differences between hosts are visible
+logger.info(
+    f"Resize backend: {RESIZE_BACKEND} (CPU SIMD: {_cpu_simd_level()}, "
+    f"Pillow {PIL.__version__}, libjpeg-turbo: {features.check_feature('libjpeg_turbo')}, "
+    f"libvips: {VIPS_SUPPORT})"
+)
+
+
+# Image formats that can embed EXIF data
+_EXIF_FORMATS = frozenset({'JPEG', 'MPO', 'TIFF', 'WEBP', 'PNG', 'HEIF'})
+
+_ORIENTATION_TAG = 0x0112
+
+# EXIF orientation -> the single lossless transpose that uprights the image
+_ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+# Encodes JPEGs alongside the resize work; Pillow's encoder releases the GIL
+_save_executor = None
+_save_executor_pid = None
+
+
+def _save_pool():
+    """Get this process's JPEG save pool (a pool inherited across fork() has no threads)."""
+    global _save_executor, _save_executor_pid
+    if _save_executor is None or _save_executor_pid != os.getpid():
+        _save_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix='jpeg-save')
+        _save_executor_pid = os.getpid()
+    return _save_executor
+
+
+def storage_bucket(photo_id):
+    """
+    Two-hex-character bucket directory for a photo.
+
+    Spreads each month's files over 256 subdirectories so no single
+    directory grows large enough to slow down lookups and listings.
+    """
+    return hashlib.blake2b(str(photo_id).encode(), digest_size=1).hexdigest()
+
+
+def _vips_rgb(image):
+    """Convert a libvips image to 8-bit sRGB without alpha, like PIL's convert('RGB')."""
+    if image.hasalpha():
+        image = image.flatten()
+    if image.interpretation != 'srgb':
+        image = image.colourspace('srgb')
+    if image.format != 'uchar':
+        image = image.cast('uchar')
+    return image
+
+
+# JPEG markers that stand alone, with no length field after them
+_JPEG_STANDALONE_MARKERS = frozenset({0x01, *range(0xD0, 0xD9)})
+# APP1 holds the EXIF (with any GPS position) and XMP blocks
+_JPEG_APP1 = 0xE1
+_JPEG_SOS = 0xDA
+
+
+def _copy_jpeg_without_metadata(source_path, dest_path):
+    """
+    Copy a JPEG byte for byte, minus its EXIF and XMP segments.
+
+    Only the header segments are walked; the entropy-coded image data after
+    the start-of-scan marker is copied unchanged, so nothing is re-encoded.
+    Stored originals must not carry the camera's GPS position, which the
+    re-encoding paths never write.
+    """
+    with open(source_path, 'rb') as src, open(dest_path, 'wb') as dst:
+        if src.read(2) != b'\xff\xd8':
+            raise ValueError(f"Not a JPEG file: {source_path}")
+        dst.write(b'\xff\xd8')
+
+        while True:
+            byte = src.read(1)
+            if byte != b'\xff':
+                raise ValueError(f"Corrupt JPEG header: {source_path}")
+            marker = src.read(1)
+            while marker == b'\xff':  # fill bytes
+                marker = src.read(1)
+            if not marker:
+                raise ValueError(f"Truncated JPEG header: {source_path}")
+
+            code = marker[0]
+            if code in _JPEG_STANDALONE_MARKERS:
+                dst.write(b'\xff' + marker)
+                continue
+
+            length_bytes = src.read(2)
+            length = int.from_bytes(length_bytes, 'big')
+            if len(length_bytes) < 2 or length < 2:
+                raise ValueError(f"Truncated JPEG header: {source_path}")
+            payload = src.read(length - 2)
+
+            if code != _JPEG_APP1:
+                dst.write(b'\xff' + marker + length_bytes + payload)
+            if code == _JPEG_SOS:
+                break
+
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
 
 class ThumbnailCreator:
     """Create thumbnail and display versions of photos."""
 
-    def __init__(self, source_path):
+    def __init__(self, source_path, date_subdir=None):
+        """
+        Args:
+            source_path: Image to process
+            date_subdir: 'YYYY/MM' storage subdirectory. Batch callers can
+                compute it once and pass it in; defaults to the current month.
+        """
         self.source_path = Path(source_path)
+        self.date_subdir = date_subdir
         self.photo_id = None
 
     def _is_raw_file(self):
@@ -81,10 +256,11 @@ class ThumbnailCreator:
         Returns:
             dict with paths to all versions
         """
-        self.photo_id = photo_id or str(uuid.uuid4())
+        self.photo_id = photo_id or uuid.uuid4().hex
 
-        # Determine date-based subdirectory
-        date_subdir = datetime.now().strftime('%Y/%m')
+        # Determine date-based subdirectory, plus a hashed bucket within it
+        month_subdir = self.date_subdir or datetime.now().strftime('%Y/%m')
+        date_subdir = Path(month_subdir) / storage_bucket(self.photo_id)
 
         # Create output paths
         original_dir = ORIGINALS_DIR / date_subdir
@@ -94,14 +270,85 @@ class ThumbnailCreator:
         for d in [original_dir, display_dir, thumb_dir]:
             d.mkdir(parents=True, exist_ok=True)
 
+        original_path = original_dir / f"{self.photo_id}.jpg"
+        display_path = display_dir / f"{self.photo_id}.jpg"
+        thumb_path = thumb_dir / f"{self.photo_id}.jpg"
+
         try:
+            original_size = None
+            if RESIZE_BACKEND == 'vips' and not self._is_raw_file():
+                try:
+                    original_size = self._process_with_vips(original_path, display_path, thumb_path)
+                except pyvips.Error as e:
+                    # e.g. libvips built without HEIF support - fall back to Pillow
+                    logger.debug(f"libvips could not process {self.source_path.name}: {e}")
+
+            if original_size is None:
+                original_size = self._process_with_pil(original_path, display_path, thumb_path)
+
+            # Return relative paths (from PHOTO_STORAGE_ROOT)
+            return {
+                'photo_id': self.photo_id,
+                'original_path': str(Path('originals') / date_subdir / f"{self.photo_id}.jpg"),
+                'display_path': str(Path('display') / date_subdir / f"{self.photo_id}.jpg"),
+                'thumb_path': str(Path('thumbs') / date_subdir / f"{self.photo_id}.jpg"),
+                'width': original_size[0],
+                'height': original_size[1],
+                'file_size': original_path.stat().st_size
+            }
+
+        except Exception as e:
+            logger.error(f"Failed to process image {self.source_path}: {e}")
+            raise
+
+    def _process_with_vips(self, original_path, display_path, thumb_path):
+        """
+        Write all versions with libvips.
+
+        The display and thumbnail versions use shrink-on-load, so the
+        source is never decoded at full size for them.
+
+        Returns:
+            (width, height) of the original after orientation
+        """
+        source = str(self.source_path)
+
+        # Applies EXIF orientation and resets the tag
+        img = _vips_rgb(pyvips.Image.new_from_file(source, access='sequential').autorot())
+        original_size = (img.width, img.height)
+        img.jpegsave(str(original_path), strip=True, **_VIPS_ORIGINAL_OPTIONS)
+
+        for path, size, options in (
+            (display_path, DISPLAY_SIZE, _VIPS_DISPLAY_OPTIONS),
+            (thumb_path, THUMBNAIL_SIZE, _VIPS_THUMB_OPTIONS),
+        ):
+            resized = pyvips.Image.thumbnail(source, size[0], height=size[1], size='down')
+            _vips_rgb(resized).jpegsave(str(path), strip=True, **options)
+
+        return original_size
+
+    def _process_with_pil(self, original_path, display_path, thumb_path):
+        """
+        Write all versions with Pillow (RAW files, or when libvips is unavailable).
+
+        Returns:
+            (width, height) of the original after orientation
+        """
+        if not self._is_raw_file():
+            original_size = self._process_upright_jpeg(original_path, display_path, thumb_path)
+            if original_size:
+                return original_size
+
+        # Each full-size image is dropped as soon as the next stage no longer
+        # needs it, so peak memory is one decoded original rather than several
+        with ExitStack() as stack:
             # Open image - handle RAW files specially
             if self._is_raw_file():
                 logger.info(f"Processing RAW file: {self.source_path.name}")
                 img = self._open_raw_file()
                 # RAW files are already RGB from rawpy
             else:
-                img = Image.open(self.source_path)
+                img = stack.enter_context(Image.open(self.source_path))
                 # Apply EXIF orientation for standard formats
                 img = self._apply_exif_orientation(img)
 
@@ -111,118 +358,224 @@ class ThumbnailCreator:
 
             original_size = (img.width, img.height)
 
-            # Save original (as JPG)
-            original_path = original_dir / f"{self.photo_id}.jpg"
-            img.save(original_path, 'JPEG', quality=95)
+            # Decode before sharing: an image that is still lazily loaded
+            # would be read from its file by both threads at once
+            img.load()
 
-            # Create display version
-            display_path = display_dir / f"{self.photo_id}.jpg"
-            display_img = self._resize_image(img, DISPLAY_SIZE)
-            display_img.save(display_path, 'JPEG', quality=JPEG_QUALITY_DISPLAY)
+            # Save original (as JPG) while the display version is made
+            original_saved = _save_pool().submit(
+                img.save, original_path, 'JPEG', **_ORIGINAL_JPEG_OPTIONS
+            )
 
-            # Create thumbnail
-            thumb_path = thumb_dir / f"{self.photo_id}.jpg"
-            thumb_img = self._resize_image(img, THUMBNAIL_SIZE)
-            thumb_img.save(thumb_path, 'JPEG', quality=JPEG_QUALITY_THUMB)
+            if RESIZE_BACKEND == 'vips' and img.mode == 'RGB':
+                # Hand the decoded pixels to libvips for its threaded resize
+                vips_img = pyvips.Image.new_from_memory(img.tobytes(), img.width, img.height, 3, 'uchar')
+                display_img = None
+            else:
+                vips_img = None
+                display_img = self._resize_image(img, DISPLAY_SIZE)
+                if display_img is img:
+                    # Already display-sized - keep pixels that outlive the file
+                    display_img = img.copy()
+            original_saved.result()
+            del img
+
+        if vips_img is not None:
+            for path, size, options in (
+                (display_path, DISPLAY_SIZE, _VIPS_DISPLAY_OPTIONS),
+                (thumb_path, THUMBNAIL_SIZE, _VIPS_THUMB_OPTIONS),
+            ):
+                vips_img.thumbnail_image(size[0], height=size[1], size='down').jpegsave(
+                    str(path), **options
+                )
+            return original_size
+
+        # Encode the display version while the thumbnail is made and saved
+        display_saved = _save_pool().submit(
+            display_img.save, display_path, 'JPEG', **_DISPLAY_JPEG_OPTIONS
+        )
+        # Create thumbnail from the display version - far fewer pixels to filter
+        thumb_img = self._resize_image(display_img, THUMBNAIL_SIZE)
+        thumb_img.save(thumb_path, 'JPEG', **_THUMB_JPEG_OPTIONS)
+        display_saved.result()
+
+        return original_size
+
+    def _process_upright_jpeg(self, original_path, display_path, thumb_path):
+        """
+        Fast path for JPEGs that need no rotation.
 
-            # Return relative paths (from PHOTO_STORAGE_ROOT)
-            return {
-                'photo_id': self.photo_id,
-                'original_path': str(Path('originals') / date_subdir / f"{self.photo_id}.jpg"),
-                'display_path': str(Path('display') / date_subdir / f"{self.photo_id}.jpg"),
-                'thumb_path': str(Path('thumbs') / date_subdir / f"{self.photo_id}.jpg"),
-                'width': original_size[0],
-                'height': original_size[1],
-                'file_size': original_path.stat().st_size
-            }
+        The original is copied instead of re-encoded, minus its EXIF and
+        XMP segments, and the display version is decoded with libjpeg's DCT
+        scaling (draft mode) at the smallest scale that still covers the
+        display size. The thumbnail is then cut down from the display version.
 
-        except Exception as e:
-            logger.error(f"Failed to process image {self.source_path}: {e}")
-            raise
+        Returns:
+            (width, height) of the original, or None if the source is not an
+            upright JPEG and the general path must be used
+        """
+        with Image.open(self.source_path) as img:
+            if img.format != 'JPEG' or img.getexif().get(_ORIENTATION_TAG, 1) != 1:
+                return None
+            original_size = img.size
 
-    def _resize_image(self, img, max_size):
-        """Resize image to fit within max_size while maintaining aspect ratio."""
-        img.thumbnail(max_size, Image.Resampling.LANCZOS)
-        return img
+        _copy_jpeg_without_metadata(self.source_path, original_path)
 
-    def _apply_exif_orientation(self, img):
-        """Apply EXIF orientation to the image."""
-        try:
-            exif = img._getexif()
-            if exif is None:
-                return img
+        with Image.open(self.source_path) as img:
+            img.draft('RGB', DISPLAY_SIZE)
+            display_img = self._resize_image(img, DISPLAY_SIZE)
+            if display_img is img:
+                display_img = img.copy()
+        display_img.save(display_path, 'JPEG', **_DISPLAY_JPEG_OPTIONS)
 
-            orientation_key = 274  # EXIF orientation tag
-            if orientation_key not in exif:
-                return img
+        thumb_img = self._resize_image(display_img, THUMBNAIL_SIZE)
+        thumb_img.save(thumb_path, 'JPEG', **_THUMB_JPEG_OPTIONS)
 
-            orientation = exif[orientation_key]
+        return original_size
 
-            rotations = {
-                3: 180,
-                6: 270,
-                8: 90
-            }
+    @staticmethod
+    def _resize_image(img, max_size):
+        """
+        Resize image to fit within max_size while maintaining aspect ratio.
 
-            if orientation in rotations:
-                return img.rotate(rotations[orientation], expand=True)
+        Returns a new image and leaves img untouched; images already within
+        max_size are returned as is. reducing_gap lets Pillow box-shrink
+        large sources before the Lanczos pass.
+        """
+        scale = min(max_size[0] / img.width, max_size[1] / img.height)
+        if scale >= 1:
+            return img
+        new_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        return img.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
 
-            # Handle flip cases
-            if orientation == 2:
-                return img.transpose(Image.FLIP_LEFT_RIGHT)
-            if orientation == 4:
-                return img.transpose(Image.FLIP_TOP_BOTTOM)
-            if orientation == 5:
-                return img.rotate(270, expand=True).transpose(Image.FLIP_LEFT_RIGHT)
-            if orientation == 7:
-                return img.rotate(90, expand=True).transpose(Image.FLIP_LEFT_RIGHT)
+    def _apply_exif_orientation(self, img):
+        """Apply EXIF orientation to the image."""
+        # Formats that can't carry EXIF (BMP, GIF, ...) skip the lookup
+        if img.format not in _EXIF_FORMATS:
+            return img
 
+        try:
+            # Reads just the orientation tag rather than decoding every EXIF value
+            orientation = img.getexif().get(_ORIENTATION_TAG, 1)
         except Exception as e:
             logger.warning(f"Could not apply EXIF orientation: {e}")
+            return img
 
-        return img
+        op = _ORIENTATION_TRANSPOSE.get(orientation)
+        return img.transpose(op) if op is not None else img
 
 
-def create_thumbnails(source_path, photo_id=None):
+def create_thumbnails(source_path, photo_id=None, date_subdir=None):
     """Convenience function to create thumbnails."""
-    creator = ThumbnailCreator(source_path)
+    creator = ThumbnailCreator(source_path, date_subdir)
     return creator.process(photo_id)
 
 
-def regenerate_thumbnails(photo_id):
+def _init_thumbnail_worker():
+    """Make sure HEIF decoding is available in each worker process."""
+    pillow_heif.register_heif_opener()
+
+
+def create_thumbnails_batch(source_paths, photo_ids=None, workers=None):
     """
-    Regenerate thumbnails for an existing photo.
-    Useful if thumbnail settings change.
+    Create thumbnails for many photos in parallel.
+
+    Each photo is handled in a separate worker process, so a large import
+    uses every CPU core. Work is handed out a few files at a time, so only
+    about that many decoded images per worker are in memory at once.
+
+    Args:
+        source_paths: Iterable of image paths
+        photo_ids: Optional list of photo IDs, parallel to source_paths
+            (generated if not given)
+        workers: Number of worker processes (defaults to CPU count)
+
+    Returns:
+        List of create_thumbnails results, in the same order as source_paths
+    """
+    source_paths = [str(p) for p in source_paths]
+    if photo_ids is None:
+        photo_ids = [None] * len(source_paths)
+    # The whole batch goes in one month's directory
+    date_subdirs = [datetime.now().strftime('%Y/%m')] * len(source_paths)
+
+    if len(source_paths) < 2:
+        return [create_thumbnails(*args) for args in zip(source_paths, photo_ids, date_subdirs)]
+
+    with ProcessPoolExecutor(
+        max_workers=workers or os.cpu_count(),
+        initializer=_init_thumbnail_worker
+    ) as executor:
+        return list(executor.map(
+            create_thumbnails, source_paths, photo_ids, date_subdirs, chunksize=4
+        ))
+
+
+def _scan_for_file(root, filename):
+    """Walk root with os.scandir and return the first file named filename, or None."""
+    pending = [root]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(entry.path)
+                elif entry.name == filename:
+                    return Path(entry.path)
+    return None
+
+
+def _find_original(photo_id):
+    """
+    Locate a photo's original file.
+
+    Uses the path stored on the photo's row; the originals tree is only
+    walked if the row or its file is missing.
     """
     from app.config import PHOTO_STORAGE_ROOT
+    from app.database import get_db
 
-    # Find the original
-    for subdir in ORIGINALS_DIR.rglob(f"{photo_id}.jpg"):
-        original_path = subdir
+    with get_db() as conn:
+        row = conn.execute(
+            'SELECT original_path FROM photos WHERE id = ?',
+            (photo_id,)
+        ).fetchone()
 
-        # Determine date subdirectory from the path
-        date_subdir = str(subdir.parent.relative_to(ORIGINALS_DIR))
+    if row and row['original_path']:
+        original_path = PHOTO_STORAGE_ROOT / row['original_path']
+        if original_path.exists():
+            return original_path
+
+    return _scan_for_file(ORIGINALS_DIR, f"{photo_id}.jpg")
 
-        with Image.open(original_path) as img:
-            if img.mode in ('RGBA', 'LA', 'P'):
-                img = img.convert('RGB')
 
-            # Recreate display
-            display_path = DISPLAY_DIR / date_subdir / f"{photo_id}.jpg"
-            display_path.parent.mkdir(parents=True, exist_ok=True)
-            display_img = img.copy()
-            display_img.thumbnail(DISPLAY_SIZE, Image.Resampling.LANCZOS)
-            display_img.save(display_path, 'JPEG', quality=JPEG_QUALITY_DISPLAY)
-
-            # Recreate thumb
-            thumb_path = THUMBS_DIR / date_subdir / f"{photo_id}.jpg"
-            thumb_path.parent.mkdir(parents=True, exist_ok=True)
-            thumb_img = img.copy()
-            thumb_img.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
-            thumb_img.save(thumb_path, 'JPEG', quality=JPEG_QUALITY_THUMB)
-
-        logger.info(f"Regenerated thumbnails for {photo_id}")
-        return True
-
-    logger.warning(f"Original not found for {photo_id}")
-    return False
+def regenerate_thumbnails(photo_id):
+    """
+    Regenerate thumbnails for an existing photo.
+    Useful if thumbnail settings change.
+    """
+    original_path = _find_original(photo_id)
+    if original_path is None:
+        logger.warning(f"Original not found for {photo_id}")
+        return False
+
+    # Determine date subdirectory from the path
+    date_subdir = original_path.parent.relative_to(ORIGINALS_DIR)
+
+    with Image.open(original_path) as img:
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGB')
+
+        # Recreate display
+        display_path = DISPLAY_DIR / date_subdir / f"{photo_id}.jpg"
+        display_path.parent.mkdir(parents=True, exist_ok=True)
+        display_img = ThumbnailCreator._resize_image(img, DISPLAY_SIZE)
+        display_img.save(display_path, 'JPEG', **_DISPLAY_JPEG_OPTIONS)
+
+        # Recreate thumb, cascaded from the display version
+        thumb_path = THUMBS_DIR / date_subdir / f"{photo_id}.jpg"
+        thumb_path.parent.mkdir(parents=True, exist_ok=True)
+        thumb_img = ThumbnailCreator._resize_image(display_img, THUMBNAIL_SIZE)
+        thumb_img.save(thumb_path, 'JPEG', **_THUMB_JPEG_OPTIONS)
+
+    logger.info(f"Regenerated thumbnails for {photo_id}")
+    return True
@@ -4,15 +4,75 @@ Synchronize members, events, and registrations from Wild Apricot.
 """
 
 from datetime import datetime, timedelta
+from itertools import repeat
+from operator import itemgetter
 import logging
+import re
 import requests
 from io import BytesIO
 
 from app.database import get_db
-from app.sync.wa_api import get_wa_api
+from app.sync.wa_api import get_wa_api, HTTPX_SUPPORT
 
 logger = logging.getLogger(__name__)
 
+# Member rows written per executemany during a streamed sync
+MEMBER_SYNC_BATCH_SIZE = 500
+
+_MEMBER_ID = itemgetter('Id')
+
+# Keywords that map event names/tags to activity groups, in priority order
+_ACTIVITY_KEYWORDS = {
+    'hik': 'Happy Hikers',
+    'golf': 'Golf',
+    'wine': 'Wine Club',
+    'cycl': 'Cycling',
+    'bike': 'Cycling',
+    'book': 'Book Club',
+    'din': 'Dining Out',
+    'lunch': 'Dining Out',
+    'social': 'Social Events',
+    'party': 'Social Events',
+    'picnic': 'Social Events',
+    'gala': 'Social Events',
+}
+_KEYWORD_PRIORITY = {keyword: i for i, keyword in enumerate(_ACTIVITY_KEYWORDS)}
+
+# Zero-width lookahead reports every keyword occurrence, overlapping or not,
+# in one scan of the text
+_ACTIVITY_RE = re.compile(f"(?=({'|'.join(map(re.escape, _ACTIVITY_KEYWORDS))}))")
+
+_UPSERT_MEMBER_SQL = '''
+    INSERT INTO members (id, email, first_name, last_name, display_name,
+                        profile_photo_url, directory_headshot_url, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        email = excluded.email,
+        first_name = excluded.first_name,
+        last_name = excluded.last_name,
+        display_name = excluded.display_name,
+        profile_photo_url = excluded.profile_photo_url,
+        directory_headshot_url = COALESCE(excluded.directory_headshot_url, directory_headshot_url),
+        updated_at = excluded.updated_at
+'''
+
+_UPSERT_EVENT_SQL = '''
+    INSERT INTO events (id, name, description, start_date, end_date,
+                       location_name, location_address, activity_group,
+                       is_public, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        name = excluded.name,
+        description = excluded.description,
+        start_date = excluded.start_date,
+        end_date = excluded.end_date,
+        location_name = excluded.location_name,
+        location_address = excluded.location_address,
+        activity_group = excluded.activity_group,
+        is_public = excluded.is_public,
+        updated_at = excluded.updated_at
+'''
+
 
 class MemberSync:
     """Sync members from Wild Apricot to local database."""
@@ -26,15 +86,22 @@ class MemberSync:
         start_time = datetime.utcnow()
 
         try:
-            members = self.api.get_all_active_members()
-            logger.info(f"Retrieved {len(members)} members from WA")
-
+            # Members are upserted as pages arrive, so memory use stays flat
+            # however many there are. Each batch gets its own short
+            # transaction, opened only once its members are in hand, so the
+            # database is never locked while a page is fetched. The upserts
+            # are idempotent, so a sync that fails partway is simply rerun.
             synced = 0
-            with get_db() as conn:
-                for member in members:
-                    self._upsert_member(conn, member)
-                    synced += 1
+            batch = []
+            for member in self.api.iter_all_active_members():
+                batch.append(member)
+                if len(batch) >= MEMBER_SYNC_BATCH_SIZE:
+                    synced += self._upsert_members(batch, start_time)
+                    batch.clear()
+            if batch:
+                synced += self._upsert_members(batch, start_time)
 
+            with get_db() as conn:
                 # Update sync status
                 conn.execute('''
                     UPDATE sync_status
@@ -56,8 +123,34 @@ class MemberSync:
                 ''', (datetime.utcnow(), str(e)))
             raise
 
-    def _upsert_member(self, conn, member):
-        """Insert or update a member record."""
+    def _upsert_members(self, members, now):
+        """Upsert a batch of WA contacts in one transaction; returns the count."""
+        with get_db() as conn:
+            conn.executemany(_UPSERT_MEMBER_SQL, self._member_rows(members, now))
+        return len(members)
+
+    def _member_rows(self, members, now):
+        """
+        Build members table rows for a batch of WA contacts, stamped with now.
+
+        Each column is extracted in its own pass over the batch and the
+        columns are zipped into rows, rather than building each row with a
+        series of per-member lookups.
+        """
+        ids = map(str, map(_MEMBER_ID, members))
+        emails = [m.get('Email', '') for m in members]
+        first_names = [m.get('FirstName', '') for m in members]
+        last_names = [m.get('LastName', '') for m in members]
+        display_names = [
+            m['DisplayName'] if 'DisplayName' in m else f"{first} {last}".strip()
+            for m, first, last in zip(members, first_names, last_names)
+        ]
+        photo_urls, headshot_urls = zip(*map(self._photo_urls, members))
+        return zip(ids, emails, first_names, last_names, display_names,
+                   photo_urls, headshot_urls, repeat(now))
+
+    def _photo_urls(self, member):
+        """Return (profile_photo_url, directory_headshot_url) for a WA contact."""
         # Extract profile photo URL
         profile_photo_url = None
         directory_headshot_url = None
@@ -74,28 +167,7 @@ class MemberSync:
                 if isinstance(value, dict):
                     directory_headshot_url = value.get('Url')
 
-        conn.execute('''
-            INSERT INTO members (id, email, first_name, last_name, display_name,
-                                profile_photo_url, directory_headshot_url, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(id) DO UPDATE SET
-                email = excluded.email,
-                first_name = excluded.first_name,
-                last_name = excluded.last_name,
-                display_name = excluded.display_name,
-                profile_photo_url = excluded.profile_photo_url,
-                directory_headshot_url = COALESCE(excluded.directory_headshot_url, directory_headshot_url),
-                updated_at = excluded.updated_at
-        ''', (
-            str(member['Id']),
-            member.get('Email', ''),
-            member.get('FirstName', ''),
-            member.get('LastName', ''),
-            member.get('DisplayName', f"{member.get('FirstName', '')} {member.get('LastName', '')}".strip()),
-            profile_photo_url,
-            directory_headshot_url,
-            datetime.utcnow()
-        ))
+        return profile_photo_url, directory_headshot_url
 
 
 class EventSync:
@@ -114,11 +186,10 @@ class EventSync:
             events = self.api.get_events(start_date=start_date)
             logger.info(f"Retrieved {len(events)} events from WA")
 
-            synced = 0
+            rows = [self._event_row(event, start_time) for event in events]
+            synced = len(rows)
             with get_db() as conn:
-                for event in events:
-                    self._upsert_event(conn, event)
-                    synced += 1
+                conn.executemany(_UPSERT_EVENT_SQL, rows)
 
                 conn.execute('''
                     UPDATE sync_status
@@ -140,8 +211,8 @@ class EventSync:
                 ''', (datetime.utcnow(), str(e)))
             raise
 
-    def _upsert_event(self, conn, event):
-        """Insert or update an event record."""
+    def _event_row(self, event, now):
+        """Build the events table row for a WA event, stamped with now."""
         # Extract location info
         location = event.get('Location', {})
         location_name = location.get('Name', '')
@@ -154,22 +225,7 @@ class EventSync:
         access_level = event.get('AccessLevel', '')
         is_public = access_level == 'Public'
 
-        conn.execute('''
-            INSERT INTO events (id, name, description, start_date, end_date,
-                               location_name, location_address, activity_group,
-                               is_public, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(id) DO UPDATE SET
-                name = excluded.name,
-                description = excluded.description,
-                start_date = excluded.start_date,
-                end_date = excluded.end_date,
-                location_name = excluded.location_name,
-                location_address = excluded.location_address,
-                activity_group = excluded.activity_group,
-                is_public = excluded.is_public,
-                updated_at = excluded.updated_at
-        ''', (
+        return (
             str(event['Id']),
             event.get('Name', ''),
             event.get('Details', {}).get('DescriptionHtml', ''),
@@ -179,61 +235,50 @@ class EventSync:
             location_address,
             activity_group,
             is_public,
-            datetime.utcnow()
-        ))
+            now
+        )
 
     def _determine_activity_group(self, event):
         """Determine the activity group for an event."""
-        name = event.get('Name', '').lower()
-        tags = [t.lower() for t in event.get('Tags', [])]
-
-        # Map keywords to activity groups
-        activity_map = {
-            'hik': 'Happy Hikers',
-            'golf': 'Golf',
-            'wine': 'Wine Club',
-            'cycl': 'Cycling',
-            'bike': 'Cycling',
-            'book': 'Book Club',
-            'din': 'Dining Out',
-            'lunch': 'Dining Out',
-            'social': 'Social Events',
-            'party': 'Social Events',
-            'picnic': 'Social Events',
-            'gala': 'Social Events',
-        }
-
-        for keyword, group in activity_map.items():
-            if keyword in name or any(keyword in tag for tag in tags):
-                return group
-
-        return 'General'
+        # Name and tags joined by a separator no keyword contains
+        haystack = '\x00'.join([event.get('Name', ''), *event.get('Tags', [])]).lower()
+
+        found = set(_ACTIVITY_RE.findall(haystack))
+        if not found:
+            return 'General'
+
+        # The highest-priority keyword wins, wherever it appears
+        return _ACTIVITY_KEYWORDS[min(found, key=_KEYWORD_PRIORITY.__getitem__)]
 
     def sync_registrations(self, event_id):
         """Sync registrations for a specific event."""
         try:
             registrations = self.api.get_event_registrations(event_id)
-
-            with get_db() as conn:
-                # Clear existing registrations for this event
-                conn.execute('DELETE FROM event_registrations WHERE event_id = ?', (event_id,))
-
-                # Insert new registrations
-                for reg in registrations:
-                    contact = reg.get('Contact', {})
-                    member_id = str(contact.get('Id', ''))
-                    if member_id:
-                        conn.execute('''
-                            INSERT OR IGNORE INTO event_registrations (event_id, member_id, registration_type)
-                            VALUES (?, ?, ?)
-                        ''', (event_id, member_id, reg.get('RegistrationType', {}).get('Name', 'attending')))
-
+            self._store_registrations(event_id, registrations)
             return len(registrations)
 
         except Exception as e:
             logger.error(f"Failed to sync registrations for event {event_id}: {e}")
             return 0
 
+    def _store_registrations(self, event_id, registrations):
+        """Replace an event's stored registrations with those fetched from WA."""
+        with get_db() as conn:
+            # Clear existing registrations for this event
+            conn.execute('DELETE FROM event_registrations WHERE event_id = ?', (event_id,))
+
+            # Insert new registrations
+            rows = []
+            for reg in registrations:
+                contact = reg.get('Contact', {})
+                member_id = str(contact.get('Id', ''))
+                if member_id:
+                    rows.append((event_id, member_id, reg.get('RegistrationType', {}).get('Name', 'attending')))
+            conn.executemany('''
+                INSERT OR IGNORE INTO event_registrations (event_id, member_id, registration_type)
+                VALUES (?, ?, ?)
+            ''', rows)
+
     def sync_all_recent_registrations(self, days=30):
         """Sync registrations for all recent events."""
         with get_db() as conn:
@@ -244,9 +289,19 @@ class EventSync:
             ''', (f'-{days}',)).fetchall()
 
         total = 0
-        for event in events:
-            count = self.sync_registrations(event['id'])
-            total += count
+        if HTTPX_SUPPORT and len(events) > 1:
+            # Fetch every event's registrations concurrently, then store them
+            fetched = self.api.get_event_registrations_many([event['id'] for event in events])
+            for event_id, registrations in fetched.items():
+                if isinstance(registrations, Exception):
+                    logger.error(f"Failed to sync registrations for event {event_id}: {registrations}")
+                    continue
+                self._store_registrations(event_id, registrations)
+                total += len(registrations)
+        else:
+            for event in events:
+                count = self.sync_registrations(event['id'])
+                total += count
 
         logger.info(f"Synced registrations for {len(events)} events, {total} total registrations")
         return total
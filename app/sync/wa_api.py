@@ -4,16 +4,41 @@ Handle authentication and API calls to Wild Apricot.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
+import asyncio
 import base64
 import logging
 from functools import wraps
-import time
+
+try:
+    import httpx
+    HTTPX_SUPPORT = True
+except ImportError:
+    # httpx not installed - registrations are fetched one event at a time
+    HTTPX_SUPPORT = False
 
 from app.config import WA_API_KEY, WA_ACCOUNT_ID, WA_API_BASE_URL, WA_AUTH_URL
 
 logger = logging.getLogger(__name__)
 
+# Contacts fetched per request when paging through large member lists
+CONTACTS_PAGE_SIZE = 500
+
+# Requests in flight at once when fetching many events' registrations
+CONCURRENT_REQUESTS = 8
+
+# Retries for dropped connections, rate limiting and transient server errors.
+# 429 responses are retried after the server's Retry-After delay.
+_RETRY = Retry(
+    total=3,
+    backoff_factor=1,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=None,       # Token requests are POSTs and safe to repeat
+    raise_on_status=False       # Hand the last response to raise_for_status()
+)
+
 
 class WildApricotAPI:
     """Client for the Wild Apricot API v2.2"""
@@ -26,6 +51,12 @@ class WildApricotAPI:
         self.access_token = None
         self.token_expires_at = None
         self.session = requests.Session()
+        # One kept-alive connection pool for token and API calls alike
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=_RETRY)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # Member lists are large JSON documents; requests decompresses them
+        self.session.headers['Accept-Encoding'] = 'gzip'
 
     def _get_access_token(self):
         """Get or refresh the OAuth2 access token."""
@@ -48,7 +79,7 @@ class WildApricotAPI:
         }
 
         try:
-            response = requests.post(self.auth_url, headers=headers, data=data)
+            response = self.session.post(self.auth_url, headers=headers, data=data, timeout=30)
             response.raise_for_status()
             token_data = response.json()
 
@@ -63,8 +94,13 @@ class WildApricotAPI:
             logger.error(f"Failed to get WA access token: {e}")
             raise
 
-    def _make_request(self, method, endpoint, params=None, json_data=None, retry_count=3):
-        """Make an authenticated API request."""
+    def _make_request(self, method, endpoint, params=None, json_data=None):
+        """
+        Make an authenticated API request.
+
+        Retries (including waiting out rate limits) are handled by the
+        session's adapter.
+        """
         token = self._get_access_token()
 
         headers = {
@@ -75,31 +111,21 @@ class WildApricotAPI:
 
         url = f"{self.base_url}/accounts/{self.account_id}/{endpoint}"
 
-        for attempt in range(retry_count):
-            try:
-                response = self.session.request(
-                    method,
-                    url,
-                    headers=headers,
-                    params=params,
-                    json=json_data,
-                    timeout=30
-                )
-
-                if response.status_code == 429:  # Rate limited
-                    wait_time = int(response.headers.get('Retry-After', 60))
-                    logger.warning(f"Rate limited, waiting {wait_time}s")
-                    time.sleep(wait_time)
-                    continue
-
-                response.raise_for_status()
-                return response.json() if response.text else None
-
-            except requests.RequestException as e:
-                if attempt == retry_count - 1:
-                    logger.error(f"API request failed after {retry_count} attempts: {e}")
-                    raise
-                time.sleep(2 ** attempt)  # Exponential backoff
+        try:
+            response = self.session.request(
+                method,
+                url,
+                headers=headers,
+                params=params,
+                json=json_data,
+                timeout=30
+            )
+            response.raise_for_status()
+            return response.json() if response.text else None
+
+        except requests.RequestException as e:
+            logger.error(f"API request failed after {_RETRY.total} retries: {e}")
+            raise
 
     def get_members(self, filter_string=None, select_fields=None):
         """
@@ -127,6 +153,38 @@ class WildApricotAPI:
             return result['Contacts']
         return result or []
 
+    def iter_members(self, filter_string=None, select_fields=None, page_size=CONTACTS_PAGE_SIZE):
+        """
+        Yield members from Wild Apricot one page at a time.
+
+        Pages through the contact list with $top/$skip, so only one page of
+        JSON is held in memory however large the membership is.
+
+        Args:
+            filter_string: OData filter (e.g., "Status eq 'Active'")
+            select_fields: List of fields to return
+            page_size: Contacts per request
+
+        Yields:
+            Member dictionaries
+        """
+        params = {'$async': 'false', '$top': page_size}
+        if filter_string:
+            params['$filter'] = filter_string
+        if select_fields:
+            params['$select'] = ','.join(select_fields)
+
+        skip = 0
+        while True:
+            params['$skip'] = skip
+            result = self._make_request('GET', 'contacts', params=params)
+            page = result.get('Contacts', []) if isinstance(result, dict) else (result or [])
+            yield from page
+
+            if len(page) < page_size:
+                break
+            skip += page_size
+
     def get_member(self, member_id):
         """Get a single member by ID."""
         return self._make_request('GET', f'contacts/{member_id}')
@@ -169,6 +227,60 @@ class WildApricotAPI:
         })
         return result or []
 
+    def get_event_registrations_many(self, event_ids, concurrency=CONCURRENT_REQUESTS):
+        """
+        Get registrations for many events concurrently (requires httpx).
+
+        Args:
+            event_ids: Event IDs to fetch
+            concurrency: Maximum requests in flight
+
+        Returns:
+            Dict mapping event_id -> list of registrations, or the exception
+            if that event's request failed
+        """
+        return asyncio.run(self._fetch_registrations(list(event_ids), concurrency))
+
+    async def _fetch_registrations(self, event_ids, concurrency):
+        """Fetch each event's registrations over one async client."""
+        headers = {
+            'Authorization': f'Bearer {self._get_access_token()}',
+            'Accept': 'application/json'
+        }
+        url = f"{self.base_url}/accounts/{self.account_id}/eventregistrations"
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async with httpx.AsyncClient(headers=headers, timeout=30) as client:
+            async def fetch(event_id):
+                async with semaphore:
+                    return await self._get_with_retry(client, url, {'eventId': event_id})
+
+            results = await asyncio.gather(
+                *(fetch(event_id) for event_id in event_ids), return_exceptions=True
+            )
+        return dict(zip(event_ids, results))
+
+    async def _get_with_retry(self, client, url, params):
+        """GET with the same retry policy as the sync session's adapter."""
+        for attempt in range(_RETRY.total + 1):
+            delay = _RETRY.backoff_factor * 2 ** attempt
+            try:
+                response = await client.get(url, params=params)
+            except httpx.TransportError:
+                if attempt == _RETRY.total:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status_code not in _RETRY.status_forcelist or attempt == _RETRY.total:
+                break
+            # Wait out rate limits as instructed, else back off exponentially
+            retry_after = response.headers.get('Retry-After', '')
+            await asyncio.sleep(int(retry_after) if retry_after.isdigit() else delay)
+
+        response.raise_for_status()
+        return response.json() if response.text else []
+
     def get_member_profile_photo_url(self, member_id):
         """Get the profile photo URL for a member."""
         member = self.get_member(member_id)
@@ -180,7 +292,11 @@ class WildApricotAPI:
 
     def get_all_active_members(self):
         """Get all active members with relevant fields."""
-        return self.get_members(
+        return list(self.iter_all_active_members())
+
+    def iter_all_active_members(self):
+        """Yield all active members with relevant fields, a page at a time."""
+        return self.iter_members(
             filter_string="Status eq 'Active' OR Status eq 'PendingRenewal'",
             select_fields=[
                 'Id', 'Email', 'FirstName', 'LastName', 'DisplayName',
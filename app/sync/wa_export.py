@@ -16,24 +16,54 @@ Terms:
 Target: Playground site (sbnc-website-redesign-playground.wildapricot.org)
 """
 
+import os
 import re
+import asyncio
+import hashlib
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
 from typing import Optional, Dict, List, Tuple
+from urllib.parse import quote
 
 from webdav3.client import Client
+from webdav3.exceptions import MethodNotSupported, ResponseErrorCode
+from webdav3.urn import Urn
+
+try:
+    import httpx
+    HTTPX_SUPPORT = True
+except ImportError:
+    # httpx not installed - uploads run on a thread pool
+    HTTPX_SUPPORT = False
 
 from app.config import (
-    WA_WEBDAV_URL, WA_WEBDAV_USER, WA_WEBDAV_PASSWORD,
+    WA_WEBDAV_URL, WA_WEBDAV_USER, WA_WEBDAV_PASSWORD, WA_EXPORT_WORKERS,
     PHOTO_STORAGE_ROOT
 )
+from app.sync.wa_webdav import create_client, list_recursive
 
 logger = logging.getLogger(__name__)
 
 # Base folder for photo exports in WA
 WA_PICTURES_ROOT = 'Pictures'
 
+# Folder-name cleanup: separators become underscores, unsafe characters are
+# dropped (separators win for characters in both sets). Whitespace is handled
+# separately with str.split() so Unicode spaces are covered too.
+_FOLDER_NAME_TRANS = str.maketrans(
+    dict.fromkeys('<>"?*\'!@#$%^(){}[]') | dict.fromkeys('-:;,/\\|&~', '_')
+)
+_MULTI_UND_RE = re.compile(r'_+')
+
+
+def export_key(remote_path: str) -> int:
+    """Signed 64-bit key for a remote path, as stored in wa_exports_index."""
+    return int.from_bytes(hashlib.md5(remote_path.encode()).digest()[:8], 'big', signed=True)
+
 
 def get_term_from_date(event_date) -> str:
     """
@@ -54,31 +84,37 @@ def get_term_from_date(event_date) -> str:
         event_date = datetime.now()
 
     if isinstance(event_date, str):
-        try:
-            event_date = datetime.fromisoformat(event_date[:10])
-        except ValueError:
-            event_date = datetime.now()
+        event_date = _parse_event_date(event_date[:10]) or datetime.now()
+
+    return _term_name(event_date.year, event_date.month)
 
-    year = event_date.year
-    month = event_date.month
 
+@lru_cache(maxsize=256)
+def _term_name(year: int, month: int) -> str:
+    """Term string for a year and month; an export only spans a few terms."""
     # Fall: July-December, Spring: January-June
-    if month >= 7:
-        term = "Fall"
-        # Fall 2025 = Fall_25
-        year_suffix = str(year)[-2:]
-    else:
-        term = "Spring"
-        # Spring 2026 = Spring_26
-        year_suffix = str(year)[-2:]
+    # Fall 2025 = Fall_25, Spring 2026 = Spring_26
+    term = "Fall" if month >= 7 else "Spring"
+    return f"{term}_{str(year)[-2:]}"
 
-    return f"{term}_{year_suffix}"
 
+@lru_cache(maxsize=1024)
+def _parse_event_date(date_string: str) -> Optional[datetime]:
+    """Parse a YYYY-MM-DD event date, or None if malformed; every photo of an event repeats it."""
+    try:
+        return datetime.fromisoformat(date_string)
+    except ValueError:
+        return None
 
+
+@lru_cache(maxsize=4096)
 def sanitize_folder_name(name: str, max_length: int = 80) -> str:
     """
     Sanitize a string for use as a folder name.
 
+    Cached - an export sanitizes the same committee and event names for
+    every photo.
+
     - Replace spaces and special chars with underscores
     - Remove characters not safe for file systems
     - Collapse multiple underscores
@@ -94,14 +130,11 @@ def sanitize_folder_name(name: str, max_length: int = 80) -> str:
     if not name:
         return "Unknown"
 
-    # Replace common separators and special chars with underscores
-    sanitized = re.sub(r'[\s\-:;,/\\|&~]+', '_', name)
-
-    # Remove characters not safe for folder names
-    sanitized = re.sub(r'[<>:"/\\|?*\'"!@#$%^(){}[\]]+', '', sanitized)
+    # Replace separators with underscores and drop unsafe characters
+    sanitized = '_'.join(name.split()).translate(_FOLDER_NAME_TRANS)
 
     # Collapse multiple underscores
-    sanitized = re.sub(r'_+', '_', sanitized)
+    sanitized = _MULTI_UND_RE.sub('_', sanitized)
 
     # Remove leading/trailing underscores
     sanitized = sanitized.strip('_')
@@ -136,9 +169,12 @@ def get_committee_folder_name(event: Dict) -> str:
         'General'
     )
 
-    # Clean up common patterns
-    committee = str(committee)
+    return _committee_folder_name(str(committee))
+
 
+@lru_cache(maxsize=256)
+def _committee_folder_name(committee: str) -> str:
+    """Folder name for a committee; there are only a handful of them."""
     # Add "Committee" suffix if not present (for consistency)
     if not committee.lower().endswith('committee') and committee != 'General':
         # Check if it's an activity group name like "Arts" or "Travel"
@@ -186,13 +222,22 @@ def build_export_path(event: Dict, base_path: str = WA_PICTURES_ROOT) -> str:
     # Get event folder
     event_folder = get_event_folder_name(event)
 
-    # Build path
-    path = f"{base_path}/{term}/{committee}/{event_folder}"
+    # Sanitized names never contain slashes, so only the base can add extras
+    return f"{base_path.rstrip('/')}/{term}/{committee}/{event_folder}"
 
-    # Clean up any double slashes
-    path = re.sub(r'/+', '/', path)
 
-    return path
+def _read_file(path: str) -> bytes:
+    """Read a whole file (run off the event loop by the async uploader)."""
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _photo_fields(photo) -> Tuple[str, Optional[Dict], Optional[Dict]]:
+    """Split an export_photos_for_event item into (path, photo_data, submitter_data)."""
+    # Support both dict and string (path) inputs
+    if isinstance(photo, str):
+        return photo, None, None
+    return photo.get('path'), photo.get('photo_data'), photo.get('submitter_data')
 
 
 class WAPhotoExporter:
@@ -204,6 +249,72 @@ class WAPhotoExporter:
         self.password = WA_WEBDAV_PASSWORD
         self.client = None
         self._created_folders = set()  # Cache to avoid redundant mkdir calls
+        self._local = threading.local()  # Per-thread clients for parallel uploads
+        self._known_folders = self._load_known_folders()
+        self._created_folders.update(self._known_folders)
+        self._exported_keys = self._load_exported_keys()
+
+    @staticmethod
+    def _load_known_folders() -> set:
+        """Load the folders recorded as existing by earlier exports."""
+        from app.database import get_db
+
+        try:
+            with get_db() as conn:
+                return {row['path'] for row in conn.execute('SELECT path FROM wa_known_folders')}
+        except Exception as e:
+            logger.warning(f"Could not load known WA folders: {e}")
+            return set()
+
+    @staticmethod
+    def _load_exported_keys() -> set:
+        """Load the keys of files uploaded by earlier exports."""
+        from app.database import get_db
+
+        try:
+            with get_db() as conn:
+                return {row[0] for row in conn.execute('SELECT key FROM wa_exports_index')}
+        except Exception as e:
+            logger.warning(f"Could not load WA export index: {e}")
+            return set()
+
+    def _save_exported_paths(self, remote_paths: List[str]):
+        """Add uploaded files to the export index."""
+        from app.database import get_db
+
+        rows = [(export_key(path), path) for path in remote_paths]
+        rows = [row for row in rows if row[0] not in self._exported_keys]
+        if not rows:
+            return
+
+        with get_db() as conn:
+            conn.executemany(
+                'INSERT OR IGNORE INTO wa_exports_index (key, remote_path) VALUES (?, ?)',
+                rows
+            )
+        self._exported_keys.update(key for key, _ in rows)
+
+    def _save_known_folders(self):
+        """Record folders found or created during this run for the next one."""
+        from app.database import get_db
+
+        new_folders = self._created_folders - self._known_folders
+        if not new_folders:
+            return
+
+        with get_db() as conn:
+            conn.executemany(
+                'INSERT OR IGNORE INTO wa_known_folders (path) VALUES (?)',
+                ((path,) for path in new_folders)
+            )
+        self._known_folders |= new_folders
+
+    def _upload_client(self) -> Client:
+        """Get this thread's WebDAV client (the shared one on the main thread)."""
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = create_client(self.webdav_url, self.username, self.password)
+        return client
 
     def connect(self) -> bool:
         """Connect to the WebDAV server."""
@@ -211,21 +322,79 @@ class WAPhotoExporter:
             logger.warning("WebDAV URL not configured")
             return False
 
-        options = {
-            'webdav_hostname': self.webdav_url,
-            'webdav_login': self.username,
-            'webdav_password': self.password,
-        }
-
         try:
-            self.client = Client(options)
+            self.client = create_client(self.webdav_url, self.username, self.password)
             self.client.list('/')
+            self._local.client = self.client
             logger.info(f"Connected to WebDAV at {self.webdav_url}")
             return True
         except Exception as e:
             logger.error(f"Failed to connect to WebDAV: {e}")
             return False
 
+    def _prime_folder_cache(self, root: str = WA_PICTURES_ROOT) -> int:
+        """
+        Load every existing folder under root into the folder cache.
+
+        Issues one PROPFIND with Depth: infinity so ensure_folder_exists can
+        skip the per-segment existence checks. Servers that refuse infinite
+        depth just leave the cache as is.
+
+        Args:
+            root: Folder to list recursively
+
+        Returns:
+            Number of folders found
+        """
+        try:
+            entries = list_recursive(self.client, self.webdav_url, root)
+        except Exception as e:
+            logger.warning(f"Could not list folders under {root}: {e}")
+            return 0
+
+        count = 0
+        for path, is_collection, _, _ in entries:
+            if is_collection and path:
+                self._created_folders.add(path)
+                count += 1
+
+        logger.info(f"Found {count} existing folders under {root}")
+        return count
+
+    def _create_missing_folders(self, folder_paths) -> int:
+        """
+        Create every folder a set of exports needs, before any uploads.
+
+        The leaf folders are expanded to all their ancestors, folders already
+        known to exist are dropped, and the rest get one MKCOL each, parents
+        first. Failures are left for ensure_folder_exists to retry.
+
+        Args:
+            folder_paths: Leaf folder paths like "Pictures/Fall_25/Arts_Committee"
+
+        Returns:
+            Number of folders created
+        """
+        needed = set()
+        for folder_path in folder_paths:
+            parts = folder_path.strip('/').split('/')
+            needed.update('/'.join(parts[:depth]) for depth in range(1, len(parts) + 1))
+
+        created = 0
+        for path in sorted(needed - self._created_folders, key=lambda p: p.count('/')):
+            try:
+                logger.info(f"Creating folder: {path}")
+                self.client.execute_request('mkdir', Urn(path, directory=True).quote())
+                created += 1
+            except MethodNotSupported:
+                pass  # Some servers answer 405 when the folder already exists
+            except Exception as e:
+                logger.warning(f"Could not create folder {path}: {e}")
+                continue
+            self._created_folders.add(path)
+
+        return created
+
     def ensure_folder_exists(self, folder_path: str) -> bool:
         """
         Ensure a folder path exists, creating parent folders as needed.
@@ -280,7 +449,8 @@ class WAPhotoExporter:
     def export_photo(self, local_path: str, event: Dict,
                      overwrite: bool = False,
                      photo_data: Dict = None,
-                     submitter_data: Dict = None) -> Tuple[bool, str]:
+                     submitter_data: Dict = None,
+                     folder_path: str = None) -> Tuple[bool, str]:
         """
         Export a single photo to WA with proper folder structure.
 
@@ -290,48 +460,121 @@ class WAPhotoExporter:
             overwrite: Whether to overwrite existing files
             photo_data: Photo record for filename generation
             submitter_data: Submitter info for filename generation
+            folder_path: Event's export folder if already built, to save
+                rebuilding it for every photo of the event
 
         Returns:
             Tuple of (success: bool, remote_path: str)
         """
-        local_path = Path(local_path)
-        if not local_path.exists():
-            logger.error(f"Photo not found: {local_path}")
+        folder_path = folder_path or build_export_path(event)
+        remote_path = self._prepare_export(local_path, folder_path, photo_data, submitter_data)
+        if not remote_path:
+            return False, ""
+
+        if not overwrite and self._already_exported(remote_path):
+            return True, remote_path
+
+        client = self._upload_client()
+
+        # Upload
+        try:
+            logger.info(f"Uploading: {os.path.basename(local_path)} -> {remote_path}")
+            if overwrite:
+                client.upload_sync(local_path, remote_path)
+            else:
+                # Conditional PUT: the server refuses with 412 if the file
+                # exists, saving a separate existence check per photo
+                with open(local_path, 'rb') as f:
+                    client.execute_request('upload', Urn(remote_path).quote(), data=f,
+                                           headers_ext=['If-None-Match: *'])
+            return True, remote_path
+        except ResponseErrorCode as e:
+            if e.code == 412:
+                logger.info(f"Skipping (exists): {remote_path}")
+                return True, remote_path  # Success but didn't upload
+            logger.error(f"Failed to upload {local_path}: {e}")
             return False, ""
+        except Exception as e:
+            logger.error(f"Failed to upload {local_path}: {e}")
+            return False, ""
+
+    def _prepare_export(self, local_path: str, folder_path: str,
+                        photo_data: Dict = None,
+                        submitter_data: Dict = None) -> Optional[str]:
+        """
+        Work out a photo's remote path and make sure its folder exists.
 
-        # Build destination path
-        folder_path = build_export_path(event)
+        Returns:
+            Remote path, or None if the photo can't be exported
+        """
+        if not os.path.exists(local_path):
+            logger.error(f"Photo not found: {local_path}")
+            return None
 
         # Generate meaningful filename if we have photo data
         if photo_data:
             from app.processing.photo_naming import generate_export_filename_from_photo
             filename = generate_export_filename_from_photo(photo_data, submitter_data)
         else:
-            filename = local_path.name
-
-        remote_path = f"{folder_path}/{filename}"
+            filename = os.path.basename(local_path)
 
         # Ensure folder exists
         if not self.ensure_folder_exists(folder_path):
-            return False, ""
+            return None
 
-        # Check if file already exists
-        if not overwrite:
-            try:
-                if self.client.check(remote_path):
+        return f"{folder_path}/{filename}"
+
+    def _already_exported(self, remote_path: str) -> bool:
+        """Check the export index for a file uploaded by an earlier run."""
+        if export_key(remote_path) in self._exported_keys:
+            # Uploaded by an earlier run that didn't get to mark the photo
+            logger.info(f"Skipping (already exported): {remote_path}")
+            return True
+        return False
+
+    async def _export_async(self, photos: List, folder_path: str, concurrency: int) -> List:
+        """
+        Upload photos with conditional PUTs over one async HTTP client.
+
+        Returns:
+            List of (photo_path, (success, remote_path)) in input order
+        """
+        base_url = self.webdav_url.rstrip('/')
+        semaphore = asyncio.Semaphore(concurrency)
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+        async with httpx.AsyncClient(auth=(self.username, self.password),
+                                     limits=limits, timeout=120) as client:
+            async def upload(photo):
+                photo_path, photo_data, submitter_data = _photo_fields(photo)
+                local_path = photo_path
+                remote_path = self._prepare_export(local_path, folder_path, photo_data, submitter_data)
+                if not remote_path:
+                    return photo_path, (False, "")
+                if self._already_exported(remote_path):
+                    return photo_path, (True, remote_path)
+
+                async with semaphore:
+                    logger.info(f"Uploading: {os.path.basename(local_path)} -> {remote_path}")
+                    try:
+                        content = await asyncio.to_thread(_read_file, local_path)
+                        response = await client.put(
+                            f"{base_url}/{quote(remote_path)}",
+                            content=content,
+                            headers={'If-None-Match': '*'}
+                        )
+                    except (OSError, httpx.HTTPError) as e:
+                        logger.error(f"Failed to upload {local_path}: {e}")
+                        return photo_path, (False, "")
+
+                if response.status_code == 412:
                     logger.info(f"Skipping (exists): {remote_path}")
-                    return True, remote_path  # Success but didn't upload
-            except:
-                pass
+                elif not response.is_success:
+                    logger.error(f"Failed to upload {local_path}: HTTP {response.status_code}")
+                    return photo_path, (False, "")
+                return photo_path, (True, remote_path)
 
-        # Upload
-        try:
-            logger.info(f"Uploading: {local_path.name} -> {remote_path}")
-            self.client.upload_sync(str(local_path), remote_path)
-            return True, remote_path
-        except Exception as e:
-            logger.error(f"Failed to upload {local_path}: {e}")
-            return False, ""
+            return await asyncio.gather(*(upload(photo) for photo in photos))
 
     def export_photos_for_event(self, photos: List[Dict], event: Dict,
                                 overwrite: bool = False) -> Dict:
@@ -363,20 +606,29 @@ class WAPhotoExporter:
                 stats['errors'] = stats['total']
                 return stats
 
-        for photo in photos:
-            # Support both dict and string (path) inputs
-            if isinstance(photo, str):
-                photo_path = photo
-                photo_data = None
-                submitter_data = None
-            else:
-                photo_path = photo.get('path')
-                photo_data = photo.get('photo_data')
-                submitter_data = photo.get('submitter_data')
+        # Create the folder once up front so upload threads only hit the cache
+        if not self.ensure_folder_exists(stats['folder_path']):
+            stats['errors'] = stats['total']
+            stats['error_files'] = [p if isinstance(p, str) else p.get('path') for p in photos]
+            return stats
 
-            success, remote_path = self.export_photo(
-                photo_path, event, overwrite, photo_data, submitter_data
+        def upload(photo):
+            photo_path, photo_data, submitter_data = _photo_fields(photo)
+            return photo_path, self.export_photo(
+                photo_path, event, overwrite, photo_data, submitter_data,
+                folder_path=stats['folder_path']
             )
+
+        workers = min(WA_EXPORT_WORKERS, len(photos))
+        if HTTPX_SUPPORT and workers > 1 and not overwrite:
+            results = asyncio.run(self._export_async(photos, stats['folder_path'], workers))
+        elif workers > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='wa-export') as executor:
+                results = list(executor.map(upload, photos))
+        else:
+            results = map(upload, photos)
+
+        for photo_path, (success, remote_path) in results:
             if success:
                 if remote_path:
                     stats['uploaded'] += 1
@@ -388,6 +640,8 @@ class WAPhotoExporter:
                 stats['errors'] += 1
                 stats['error_files'].append(photo_path)
 
+        self._save_exported_paths(stats['uploaded_files'])
+
         return stats
 
     def export_approved_photos(self, overwrite: bool = False) -> Dict:
@@ -411,9 +665,11 @@ class WAPhotoExporter:
             if not self.connect():
                 return stats
 
+        # Group by event as rows arrive, keeping full photo data
+        events = {}
         with get_db() as conn:
             # Get approved photos with full details for renaming
-            photos = conn.execute('''
+            rows = conn.execute('''
                 SELECT p.id, p.file_path, p.original_filename, p.taken_at,
                        p.event_id, p.submitter_member_id, p.submitter_email,
                        e.name as event_name, e.start_date, e.activity_group,
@@ -424,39 +680,41 @@ class WAPhotoExporter:
                 WHERE p.status = 'approved'
                   AND (p.exported_to_wa IS NULL OR p.exported_to_wa = 0)
                 ORDER BY e.start_date, e.name
-            ''').fetchall()
+            ''')
+            for photo in rows:
+                event_id = photo['event_id'] or 'no_event'
+                if event_id not in events:
+                    events[event_id] = {
+                        'event': {
+                            'id': photo['event_id'],
+                            'name': photo['event_name'] or 'Miscellaneous',
+                            'start_date': photo['start_date'],
+                            'activity_group': photo['activity_group'] or 'General'
+                        },
+                        'photos': []
+                    }
+                events[event_id]['photos'].append({
+                    'id': photo['id'],
+                    'path': photo['file_path'],
+                    'photo_data': {
+                        'id': photo['id'],
+                        'original_filename': photo['original_filename'],
+                        'taken_at': photo['taken_at'],
+                        'event_date': photo['start_date']
+                    },
+                    'submitter_data': {
+                        'display_name': photo['submitter_name']
+                    } if photo['submitter_name'] else None
+                })
 
-        if not photos:
+        if not events:
             logger.info("No photos to export")
             return stats
 
-        # Group by event, keeping full photo data
-        events = {}
-        for photo in photos:
-            event_id = photo['event_id'] or 'no_event'
-            if event_id not in events:
-                events[event_id] = {
-                    'event': {
-                        'id': photo['event_id'],
-                        'name': photo['event_name'] or 'Miscellaneous',
-                        'start_date': photo['start_date'],
-                        'activity_group': photo['activity_group'] or 'General'
-                    },
-                    'photos': []
-                }
-            events[event_id]['photos'].append({
-                'id': photo['id'],
-                'path': photo['file_path'],
-                'photo_data': {
-                    'id': photo['id'],
-                    'original_filename': photo['original_filename'],
-                    'taken_at': photo['taken_at'],
-                    'event_date': photo['start_date']
-                },
-                'submitter_data': {
-                    'display_name': photo['submitter_name']
-                } if photo['submitter_name'] else None
-            })
+        self._prime_folder_cache()
+        self._create_missing_folders(
+            build_export_path(data['event']) for data in events.values()
+        )
 
         # Export each event's photos
         for event_id, data in events.items():
@@ -476,20 +734,24 @@ class WAPhotoExporter:
             })
 
             # Mark successfully uploaded photos with their new filenames
-            if event_stats['uploaded'] > 0:
+            exported_at = datetime.utcnow()
+            error_files = set(event_stats['error_files'])
+            updates = []
+            for photo in photos_to_export:
+                if photo['path'] not in error_files:
+                    # Get the actual exported path (with renamed filename)
+                    remote_path = event_stats['exported_filenames'].get(photo['path'])
+                    if remote_path:
+                        updates.append((exported_at, remote_path, photo['id']))
+            if updates:
                 with get_db() as conn:
-                    for photo in photos_to_export:
-                        photo_path = photo['path']
-                        photo_id = photo['id']
-                        if photo_path not in event_stats.get('error_files', []):
-                            # Get the actual exported path (with renamed filename)
-                            remote_path = event_stats['exported_filenames'].get(photo_path)
-                            if remote_path:
-                                conn.execute('''
-                                    UPDATE photos
-                                    SET exported_to_wa = 1, exported_at = ?, wa_export_path = ?
-                                    WHERE id = ?
-                                ''', (datetime.utcnow(), remote_path, photo_id))
+                    conn.executemany('''
+                        UPDATE photos
+                        SET exported_to_wa = 1, exported_at = ?, wa_export_path = ?
+                        WHERE id = ?
+                    ''', updates)
+
+        self._save_known_folders()
 
         return stats
 
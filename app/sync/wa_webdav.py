@@ -4,19 +4,147 @@ Sync photos from Wild Apricot's file storage via WebDAV.
 """
 
 import os
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
+from email.utils import parsedate_to_datetime
+from urllib.parse import unquote, urlparse
 import logging
 
+from requests.adapters import HTTPAdapter
 from webdav3.client import Client
+from webdav3.urn import Urn
 
 from app.config import (
-    WA_WEBDAV_URL, WA_WEBDAV_USER, WA_WEBDAV_PASSWORD,
+    WA_WEBDAV_URL, WA_WEBDAV_USER, WA_WEBDAV_PASSWORD, WA_SYNC_WORKERS,
     PHOTO_STORAGE_ROOT
 )
 
 logger = logging.getLogger(__name__)
 
+# Keep-alive pool for each client's HTTP session, so consecutive requests
+# reuse one TLS connection instead of handshaking again
+POOL_CONNECTIONS = 16
+POOL_MAXSIZE = 32
+
+# File types returned by list_remote_photos
+PHOTO_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.heic'}
+
+
+def create_client(hostname, login, password):
+    """
+    Create a webdav3 client whose HTTP session pools connections.
+
+    Args:
+        hostname: WebDAV server URL
+        login: WebDAV user
+        password: WebDAV password
+
+    Returns:
+        webdav3 Client
+    """
+    client = Client({
+        'webdav_hostname': hostname,
+        'webdav_login': login,
+        'webdav_password': password,
+    })
+
+    # Older webdavclient3 releases have no session and connect per request
+    session = getattr(client, 'session', None)
+    if session is not None:
+        adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+    return client
+
+
+def list_recursive(client, base_url, root):
+    """
+    List everything under a folder with one Depth: infinity PROPFIND.
+
+    Args:
+        client: webdav3 Client
+        base_url: WebDAV server URL the client was created with
+        root: Folder to list
+
+    Returns:
+        List of (path, is_collection, modified, size) tuples, with paths
+        relative to the WebDAV root. The root folder itself is included.
+
+    Raises:
+        Exception: if the request fails, e.g. the server refuses infinite depth
+    """
+    urn = Urn(root, directory=True)
+    response = client.execute_request('list', urn.quote(), headers_ext=['Depth: infinity'])
+    tree = ET.fromstring(response.content)
+
+    # hrefs are server paths; strip the WebDAV mount point
+    base = urlparse(base_url).path.rstrip('/')
+    entries = []
+    for item in tree.iter('{DAV:}response'):
+        path = unquote(urlparse(item.findtext('{DAV:}href', '')).path)
+        if base and path.startswith(base):
+            path = path[len(base):]
+        size = item.findtext('.//{DAV:}getcontentlength')
+        entries.append((
+            path.strip('/'),
+            item.find('.//{DAV:}collection') is not None,
+            item.findtext('.//{DAV:}getlastmodified'),
+            int(size) if size and size.isdigit() else None,
+        ))
+    return entries
+
+
+def _remote_timestamp(modified):
+    """
+    Convert a WebDAV getlastmodified value to a POSIX timestamp.
+
+    Args:
+        modified: RFC 1123 date ("Wed, 01 Jan 2025 00:00:00 GMT"); ISO 8601 is
+            accepted too
+
+    Returns:
+        Timestamp as a float, or None if missing or unparseable
+    """
+    if not modified:
+        return None
+    try:
+        return parsedate_to_datetime(modified).timestamp()
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(modified.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def _scan_mtimes(root):
+    """
+    Walk a local directory tree once with os.scandir.
+
+    Args:
+        root: Directory to walk
+
+    Returns:
+        dict mapping file path strings to modification times
+    """
+    mtimes = {}
+    stack = [str(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        mtimes[entry.path] = entry.stat().st_mtime
+        except OSError:
+            continue
+    return mtimes
+
 
 class WebDAVSync:
     """Sync files from Wild Apricot via WebDAV."""
@@ -27,6 +155,9 @@ class WebDAVSync:
         self.password = WA_WEBDAV_PASSWORD
         self.local_backup_dir = PHOTO_STORAGE_ROOT / 'wa-backup'
         self.client = None
+        self._local_mtimes = {}  # Local backup file path -> mtime, from _scan_mtimes
+        self._local = threading.local()  # Per-thread clients for parallel downloads
+        self._stats_lock = threading.Lock()
 
     def connect(self):
         """Connect to the WebDAV server."""
@@ -34,16 +165,11 @@ class WebDAVSync:
             logger.warning("WebDAV URL not configured")
             return False
 
-        options = {
-            'webdav_hostname': self.webdav_url,
-            'webdav_login': self.username,
-            'webdav_password': self.password,
-        }
-
         try:
-            self.client = Client(options)
+            self.client = create_client(self.webdav_url, self.username, self.password)
             # Test connection
             self.client.list('/')
+            self._local.client = self.client
             logger.info(f"Connected to WebDAV at {self.webdav_url}")
             return True
         except Exception as e:
@@ -73,7 +199,12 @@ class WebDAVSync:
         }
 
         try:
-            self._sync_directory(remote_path, self.local_backup_dir, stats)
+            self._local_mtimes = _scan_mtimes(self.local_backup_dir)
+            entries = self._list_tree(remote_path)
+            if entries is None:
+                self._sync_directory(remote_path, self.local_backup_dir, stats)
+            else:
+                self._sync_entries(remote_path, entries, stats)
 
             # Update sync status in database
             from app.database import get_db
@@ -92,8 +223,45 @@ class WebDAVSync:
 
         return stats
 
+    def _thread_client(self):
+        """Get this thread's WebDAV client (the shared one on the main thread)."""
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = create_client(self.webdav_url, self.username, self.password)
+        return client
+
+    def _list_tree(self, remote_path):
+        """Deep-list a folder, or return None if the server won't allow it."""
+        try:
+            return list_recursive(self.client, self.webdav_url, remote_path)
+        except Exception as e:
+            logger.info(f"Deep listing of {remote_path} unavailable, listing folder by folder: {e}")
+            return None
+
+    def _sync_entries(self, remote_path, entries, stats):
+        """Sync the files from a deep listing of remote_path."""
+        prefix = remote_path.strip('/') + '/'
+        files = [
+            (path, self.local_backup_dir / path[len(prefix):], modified)
+            for path, is_collection, modified, _ in entries
+            if not is_collection and path.startswith(prefix)
+        ]
+        stats['files_checked'] += len(files)
+
+        def sync(item):
+            path, local_path, modified = item
+            self._sync_file(path, local_path, stats, remote_modified=modified)
+
+        workers = min(WA_SYNC_WORKERS, len(files))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='wa-sync') as executor:
+                list(executor.map(sync, files))
+        else:
+            for item in files:
+                sync(item)
+
     def _sync_directory(self, remote_path, local_path, stats):
-        """Recursively sync a directory."""
+        """Recursively sync a directory, one listing per folder."""
         local_path = Path(local_path)
         local_path.mkdir(parents=True, exist_ok=True)
 
@@ -119,29 +287,36 @@ class WebDAVSync:
                 stats['files_checked'] += 1
                 self._sync_file(remote_item_path, local_item_path, stats)
 
-    def _sync_file(self, remote_path, local_path, stats):
+    def _sync_file(self, remote_path, local_path, stats, remote_modified=None):
         """Sync a single file if it's newer or doesn't exist locally."""
+        client = self._thread_client()
         try:
-            # Get remote file info
-            remote_info = self.client.info(remote_path)
-            remote_modified = remote_info.get('modified')
+            # Get remote file info, unless the listing already had it
+            if remote_modified is None:
+                remote_info = client.info(remote_path)
+                remote_modified = remote_info.get('modified')
 
             # Check if local file exists and is up to date
-            if local_path.exists():
-                local_modified = datetime.fromtimestamp(local_path.stat().st_mtime)
-                if remote_modified and local_modified >= datetime.fromisoformat(remote_modified.replace('Z', '+00:00').replace('+00:00', '')):
-                    stats['files_skipped'] += 1
+            local_file = str(local_path)
+            local_mtime = self._local_mtimes.get(local_file)
+            if local_mtime is not None:
+                remote_mtime = _remote_timestamp(remote_modified)
+                if remote_mtime is not None and local_mtime >= remote_mtime:
+                    with self._stats_lock:
+                        stats['files_skipped'] += 1
                     return
 
             # Download the file
             local_path.parent.mkdir(parents=True, exist_ok=True)
-            self.client.download_sync(remote_path, str(local_path))
-            stats['files_downloaded'] += 1
+            client.download_sync(remote_path, local_file)
+            with self._stats_lock:
+                stats['files_downloaded'] += 1
             logger.debug(f"Downloaded: {remote_path}")
 
         except Exception as e:
             logger.error(f"Failed to sync {remote_path}: {e}")
-            stats['errors'].append(f"Failed to sync {remote_path}")
+            with self._stats_lock:
+                stats['errors'].append(f"Failed to sync {remote_path}")
 
     def list_remote_photos(self, remote_path='Resources/Pictures'):
         """List all photos in the remote Pictures folder."""
@@ -149,12 +324,19 @@ class WebDAVSync:
             if not self.connect():
                 return []
 
+        entries = self._list_tree(remote_path)
+        if entries is not None:
+            return [
+                path for path, is_collection, _, _ in entries
+                if not is_collection and Path(path).suffix.lower() in PHOTO_EXTENSIONS
+            ]
+
         photos = []
         self._collect_photos(remote_path, photos)
         return photos
 
-    def _collect_photos(self, remote_path, photos, extensions={'.jpg', '.jpeg', '.png', '.heic'}):
-        """Recursively collect photo file paths."""
+    def _collect_photos(self, remote_path, photos, extensions=PHOTO_EXTENSIONS):
+        """Recursively collect photo file paths, one listing per folder."""
         try:
             items = self.client.list(remote_path)
             for item in items:
@@ -15,15 +15,16 @@ from pathlib import Path
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.sync.wa_webdav import run_webdav_sync
-from app.database import init_db
-
 
 def main():
     parser = argparse.ArgumentParser(description='Backup files from Wild Apricot WebDAV')
     parser.add_argument('--verbose', '-v', action='store_true', help='Verbose logging')
     args = parser.parse_args()
 
+    # Deferred until the arguments parse, so --help doesn't load the app
+    from app.sync.wa_webdav import run_webdav_sync
+    from app.database import init_db
+
     # Setup logging
     log_level = logging.DEBUG if args.verbose else logging.INFO
     logging.basicConfig(
@@ -15,9 +15,6 @@ from pathlib import Path
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.processing.face_detector import build_face_database_from_profiles
-from app.database import init_db
-
 
 def main():
     parser = argparse.ArgumentParser(description='Build face recognition database')
@@ -26,6 +23,10 @@ def main():
     parser.add_argument('--verbose', '-v', action='store_true', help='Verbose logging')
     args = parser.parse_args()
 
+    # Deferred until the arguments parse, so --help doesn't load the app
+    from app.processing.face_detector import build_face_database_from_profiles
+    from app.database import init_db
+
     # Setup logging
     log_level = logging.DEBUG if args.verbose else logging.INFO
     logging.basicConfig(
@@ -4,30 +4,35 @@ SBNC Photo Gallery System - Email Check Script
 Check the photos@sbnewcomers.org inbox for new submissions.
 
 Usage:
-    python scripts/check_email.py [--once] [--interval SECONDS]
+    python scripts/check_email.py [--once] [--interval SECONDS] [--batch-size N]
 """
 
 import sys
 import argparse
 import logging
-import time
 from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.ingest.email_monitor import run_email_check
-from app.database import init_db
-
 
 def main():
     parser = argparse.ArgumentParser(description='Check email for photo submissions')
     parser.add_argument('--once', action='store_true', help='Run once and exit')
     parser.add_argument('--interval', type=int, default=300,
-                        help='Check interval in seconds (default: 300)')
+                        help='Longest wait between checks in seconds; new mail is '
+                             'picked up immediately via IMAP IDLE (default: 300)')
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help='Emails fetched per IMAP request (default: IMAP_FETCH_BATCH_SIZE)')
     parser.add_argument('--verbose', '-v', action='store_true', help='Verbose logging')
     args = parser.parse_args()
 
+    # Deferred until the arguments parse, so --help doesn't load the app
+    from app.ingest.email_monitor import EmailMonitor, run_email_check
+    from app.config import IMAP_FETCH_BATCH_SIZE
+    from app.database import init_db
+    batch_size = args.batch_size or IMAP_FETCH_BATCH_SIZE
+
     # Setup logging
     log_level = logging.DEBUG if args.verbose else logging.INFO
     logging.basicConfig(
@@ -42,21 +47,28 @@ def main():
     try:
         if args.once:
             logger.info("Checking email inbox...")
-            results = run_email_check()
+            results = run_email_check(batch_size)
             photos = sum(len(r['photos']) for r in results)
             logger.info(f"Processed {len(results)} emails, queued {photos} photos")
         else:
             logger.info(f"Starting email monitor (interval: {args.interval}s)")
-            while True:
-                try:
-                    results = run_email_check()
-                    photos = sum(len(r['photos']) for r in results)
-                    if photos:
-                        logger.info(f"Queued {photos} photos from {len(results)} emails")
-                except Exception as e:
-                    logger.error(f"Email check failed: {e}")
+            # One IMAP login for the whole run; reconnects only when dropped
+            monitor = EmailMonitor()
+            try:
+                while True:
+                    try:
+                        results = monitor.check_once(batch_size)
+                        photos = sum(len(r['photos']) for r in results)
+                        if photos:
+                            logger.info(f"Queued {photos} photos from {len(results)} emails")
+                    except Exception as e:
+                        logger.error(f"Email check failed: {e}")
+                        monitor.disconnect()
 
-                time.sleep(args.interval)
+                    # Sleep until the server pushes new mail (or the interval passes)
+                    monitor.idle_wait(args.interval)
+            finally:
+                monitor.disconnect()
 
     except KeyboardInterrupt:
         logger.info("Shutting down...")
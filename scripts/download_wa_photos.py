@@ -9,60 +9,461 @@ Usage:
     # Download ALL photos recursively:
     python download_wa_photos.py --folder "Pictures" --output ./all_photos --recursive
 
+    # List the whole tree first, then download in path order (resumable):
+    python download_wa_photos.py --folder "Pictures" --output ./all_photos --plan
+
+    # Just write the plan and report what would be downloaded:
+    python download_wa_photos.py --folder "Pictures" --output ./all_photos --dry-run
+
     # List what's available:
     python download_wa_photos.py --list --folder "Pictures"
 
 Requirements:
-    pip install webdavclient3
+    pip install requests
 """
 
 import argparse
 import os
 import json
+import queue
+import shutil
+import threading
+from collections import deque
+import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 from getpass import getpass
 from datetime import datetime
+from urllib.parse import quote, unquote, urlparse
 
 try:
-    from webdav3.client import Client
+    import requests
+    from requests.adapters import HTTPAdapter
 except ImportError:
-    print("Please install webdavclient3: pip install webdavclient3")
+    print("Please install requests: pip install requests")
     exit(1)
 
 
+# Image types worth downloading
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.heic', '.heif', '.webp', '.bmp'}
+
+# Threads listing folders / downloading files during a recursive download
+LIST_WORKERS = 8
+DOWNLOAD_WORKERS = 32
+
+# Connections opened up front, before a recursive download starts
+PRECONNECT = 8
+
+# Read/write size when streaming a download to disk
+DOWNLOAD_BUFFER_SIZE = 1 << 20
+
+# Ask PROPFIND for just the properties we use
+PROPFIND_BODY = (
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b'<D:propfind xmlns:D="DAV:"><D:prop>'
+    b'<D:resourcetype/><D:getcontentlength/><D:getetag/><D:getlastmodified/>'
+    b'</D:prop></D:propfind>'
+)
+
 # Track statistics
 stats = {
     'folders_scanned': 0,
     'files_found': 0,
     'files_downloaded': 0,
     'files_skipped': 0,
+    'files_linked': 0,
     'errors': 0,
     'total_size': 0
 }
+stats_lock = threading.Lock()
+
+# remote path -> {'etag': ..., 'size': ...} for every file downloaded so far,
+# loaded from and saved to the download manifest (guarded by stats_lock)
+file_records = {}
+
+# Append-only JSON Lines log of this run's file_records updates, folded into
+# the manifest when the run finishes (guarded by stats_lock)
+record_log = None
+
+
+def record_file(remote_path, etag, size):
+    """Remember a file now on disk. The caller must hold stats_lock."""
+    file_records[remote_path] = {'etag': etag, 'size': size}
+    if record_log is not None:
+        record_log.write(json.dumps({'path': remote_path, 'etag': etag, 'size': size}) + '\n')
 
 
-def download_wa_folder_recursive(client, remote_folder, local_folder, depth=0):
+def open_record_log(records_path):
     """
-    Recursively download all files from a folder and its subfolders.
+    Replay a record log left by an interrupted run, then append to it.
+
+    Each finished file costs one appended line instead of a rewrite of
+    the whole manifest, and a crash loses at most the unflushed buffer.
     """
-    global stats
-    indent = "  " * depth
+    global record_log
 
-    # Ensure local folder exists
-    local_path = Path(local_folder)
-    local_path.mkdir(parents=True, exist_ok=True)
+    line = '\n'
+    try:
+        with open(records_path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn final line from a crash
+                file_records[record['path']] = {'etag': record['etag'], 'size': record['size']}
+    except OSError:
+        pass
+
+    records_path.parent.mkdir(parents=True, exist_ok=True)
+    record_log = open(records_path, 'a', buffering=1 << 16)
+    if not line.endswith('\n'):
+        record_log.write('\n')  # Don't append to a torn line
+
+
+def close_record_log():
+    """Flush and close the record log, if open."""
+    global record_log
+
+    with stats_lock:
+        if record_log is not None:
+            record_log.close()
+            record_log = None
+
+
+def count(key, amount=1):
+    """Add to a stats counter from any thread."""
+    with stats_lock:
+        stats[key] += amount
+
+
+def make_session(username, password):
+    """
+    Create one HTTP session shared by every listing and download thread.
+
+    Its connection pool is big enough for all threads, so each request
+    reuses a kept-alive TLS connection instead of opening a new one.
+    """
+    session = requests.Session()
+    session.auth = (username, password)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=LIST_WORKERS + DOWNLOAD_WORKERS)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def warm_connections(session, base_url, connections=PRECONNECT):
+    """
+    Open several pooled connections at once before the real work starts.
+
+    Each thread holds its HEAD response until all of them have one, so the
+    TCP+TLS handshakes happen in parallel and every connection is left in
+    the pool, instead of the first downloads queueing behind cold
+    handshakes.
+    """
+    barrier = threading.Barrier(connections)
+
+    def hold_connection(_):
+        try:
+            response = session.head(f"{base_url}/", stream=True, timeout=30)
+        except requests.RequestException:
+            barrier.abort()
+            return
+        try:
+            barrier.wait(timeout=30)
+        except threading.BrokenBarrierError:
+            pass
+        finally:
+            response.content  # Read the (empty) body so the connection goes back to the pool
+            response.close()
+
+    with ThreadPoolExecutor(max_workers=connections) as pool:
+        list(pool.map(hold_connection, range(connections)))
+
+
+def resource_url(base_url, path, folder=False):
+    """Build the URL of a file or folder under /resources."""
+    url = f"{base_url}/{quote(path.strip('/'))}"
+    return url.rstrip('/') + '/' if folder else url
+
+
+def propfind(session, url, depth):
+    """
+    PROPFIND a resource.
 
+    Returns:
+        List of (server_path, is_folder, size, etag) for the resource itself
+        and, with depth 1, its children
+    """
+    response = session.request(
+        'PROPFIND', url, data=PROPFIND_BODY,
+        headers={'Depth': str(depth), 'Content-Type': 'application/xml'},
+        timeout=60
+    )
+    response.raise_for_status()
+
+    entries = []
+    for item in ET.fromstring(response.content).iter('{DAV:}response'):
+        size = item.findtext('.//{DAV:}getcontentlength')
+        entries.append((
+            unquote(urlparse(item.findtext('{DAV:}href', '')).path),
+            item.find('.//{DAV:}collection') is not None,
+            int(size) if size and size.isdigit() else None,
+            item.findtext('.//{DAV:}getetag'),
+        ))
+    return entries
+
+
+def folder_exists(session, base_url, folder_path):
+    """Check whether a folder exists."""
+    try:
+        propfind(session, resource_url(base_url, folder_path, folder=True), 0)
+        return True
+    except requests.HTTPError as e:
+        if e.response.status_code == 404:
+            return False
+        raise
+
+
+def list_items(session, base_url, folder_path):
+    """
+    List a folder's contents.
+
+    Returns:
+        Item names, with a trailing '/' on subfolders
+    """
+    url = resource_url(base_url, folder_path, folder=True)
+    own_path = unquote(urlparse(url).path).rstrip('/')
+
+    items = []
+    for path, is_folder, _, _ in propfind(session, url, 1):
+        path = path.rstrip('/')
+        if path == own_path:
+            continue  # The folder itself
+        name = path.rsplit('/', 1)[-1]
+        items.append(f"{name}/" if is_folder else name)
+    return items
+
+
+def propfind_tree(session, base_url, root):
+    """
+    List everything under a folder with one Depth: infinity PROPFIND.
+
+    The multistatus response is parsed as it streams in, and each entry is
+    discarded once read, so memory stays flat however big the tree is.
+
+    Yields:
+        (path, is_folder, size, etag) with paths relative to /resources
+    """
+    base_path = urlparse(base_url).path.rstrip('/') + '/'
+    with session.request(
+        'PROPFIND', resource_url(base_url, root, folder=True), data=PROPFIND_BODY,
+        headers={'Depth': 'infinity', 'Content-Type': 'application/xml'},
+        stream=True, timeout=300
+    ) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+
+        for _, item in ET.iterparse(response.raw, events=('end',)):
+            if item.tag != '{DAV:}response':
+                continue
+            path = unquote(urlparse(item.findtext('{DAV:}href', '')).path)
+            if path.startswith(base_path):
+                path = path[len(base_path):]
+            size = item.findtext('.//{DAV:}getcontentlength')
+            yield (
+                path.strip('/'),
+                item.find('.//{DAV:}collection') is not None,
+                int(size) if size and size.isdigit() else None,
+                item.findtext('.//{DAV:}getetag'),
+            )
+            item.clear()
+
+
+class ListingCache:
+    """
+    Folder listings from earlier runs, kept next to the download manifest.
+
+    Each entry is stored with the folder's ETag; a listing is reused only
+    while a cheap Depth: 0 PROPFIND still returns the same ETag.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def get(self, folder_path, etag):
+        with self.lock:
+            entry = self.entries.get(folder_path)
+        if entry and entry['etag'] == etag:
+            return entry['items']
+        return None
+
+    def put(self, folder_path, etag, items):
+        with self.lock:
+            self.entries[folder_path] = {'etag': etag, 'items': items}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock, open(self.path, 'w') as f:
+            json.dump(self.entries, f)
+
+
+def folder_version(session, base_url, folder_path):
+    """
+    Get a value that changes whenever a folder's contents do.
+
+    Uses the folder's ETag, or its Last-Modified date on servers that don't
+    give collections an ETag.
+
+    Returns:
+        Version string, or None if the server reports neither
+    """
+    response = session.request(
+        'PROPFIND', resource_url(base_url, folder_path, folder=True), data=PROPFIND_BODY,
+        headers={'Depth': '0', 'Content-Type': 'application/xml'},
+        timeout=60
+    )
+    response.raise_for_status()
+
+    item = ET.fromstring(response.content).find('{DAV:}response')
+    if item is None:
+        return None
+    etag = item.findtext('.//{DAV:}getetag')
+    if etag:
+        return etag
+    modified = item.findtext('.//{DAV:}getlastmodified')
+    return f"modified:{modified}" if modified else None
+
+
+def cached_list(session, base_url, folder_path, cache=None):
+    """
+    List a folder, reusing the cached listing if the folder hasn't changed.
+
+    Returns:
+        (items, unchanged) - unchanged is True when the cached listing was used
+    """
+    if cache is None:
+        return list_items(session, base_url, folder_path), False
+
+    version = folder_version(session, base_url, folder_path)
+    if version:
+        items = cache.get(folder_path, version)
+        if items is not None:
+            return items, True
+
+    items = list_items(session, base_url, folder_path)
+    if version:
+        cache.put(folder_path, version, items)
+    return items, False
+
+
+def stream_to_file(response, local_item_path):
+    """
+    Copy a streamed response body to disk in 1MB blocks.
+
+    The body is written to a .part file that replaces local_item_path only
+    once complete, so a failed transfer never leaves a truncated file (or
+    clobbers a good copy). Once written, the file's pages are released from the page cache (on
+    Linux, best effort) so a bulk download doesn't push everything else out
+    of memory. Pages not yet written back stay cached until they are; the
+    file isn't synced, as a flush per photo would serialize the download.
+    """
+    response.raw.decode_content = True
+    part_path = local_item_path.with_name(local_item_path.name + '.part')
+    try:
+        with open(part_path, 'wb', buffering=DOWNLOAD_BUFFER_SIZE) as f:
+            shutil.copyfileobj(response.raw, f, length=DOWNLOAD_BUFFER_SIZE)
+            if hasattr(os, 'posix_fadvise'):
+                f.flush()
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+        os.replace(part_path, local_item_path)
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+
+
+def download_file(session, base_url, remote_path, local_item_path, etag=None):
+    """
+    Download one file to disk, streaming it in chunks.
+
+    A local copy with a recorded ETag is revalidated with If-None-Match, so
+    an unchanged file costs one header round trip instead of a transfer.
+    etag is the listing's ETag, recorded if the GET response has none.
+
+    Returns:
+        True if the local copy is now complete and current
+    """
+    headers = {}
+    with stats_lock:
+        record = file_records.get(remote_path)
     try:
-        items = client.list(remote_folder)
-        stats['folders_scanned'] += 1
+        local_size = local_item_path.stat().st_size
+    except OSError:
+        local_size = None
+    # A 304 only vouches for the local copy if it is the one recorded
+    if record and record.get('etag') and local_size == record['size']:
+        headers['If-None-Match'] = record['etag']
+
+    try:
+        with session.get(resource_url(base_url, remote_path), headers=headers,
+                         stream=True, timeout=60) as response:
+            if response.status_code == 304:
+                print(f"  ⏭️  {remote_path} (unchanged)")
+                count('files_skipped')
+                return True
+            response.raise_for_status()
+            stream_to_file(response, local_item_path)
+            etag = response.headers.get('ETag') or etag
+        size = local_item_path.stat().st_size
+        with stats_lock:
+            stats['files_downloaded'] += 1
+            stats['total_size'] += size
+            record_file(remote_path, etag, size)
+        print(f"  ⬇️  {remote_path} OK ({size // 1024} KB)")
+        return True
     except Exception as e:
-        print(f"{indent}[ERROR] Cannot list {remote_folder}: {e}")
-        stats['errors'] += 1
-        return
+        print(f"  ⬇️  {remote_path} ERROR: {e}")
+        count('errors')
+        return False
 
-    # Filter out the current directory marker
-    items = [i for i in items if i and i != remote_folder.split('/')[-1] + '/']
 
+def list_folder(session, base_url, remote_folder, local_path, folders, cache=None):
+    """
+    List one folder, queueing its subfolders and returning the images to fetch.
+
+    Returns:
+        List of (remote_path, local_path) for images not downloaded yet
+    """
+    local_path.mkdir(parents=True, exist_ok=True)
+
+    try:
+        items, unchanged = cached_list(session, base_url, remote_folder, cache)
+        count('folders_scanned')
+    except Exception as e:
+        print(f"[ERROR] Cannot list {remote_folder}: {e}")
+        count('errors')
+        return []
+
+    if unchanged:
+        # Nothing added, removed or replaced here since the last run: if every
+        # image is still on disk, only the subfolders need looking at
+        subfolders = [item.rstrip('/') for item in items if item.endswith('/')]
+        files = [item for item in items if not item.endswith('/')]
+        images = [item for item in files if Path(item).suffix.lower() in IMAGE_EXTENSIONS]
+        if set(images) <= set(os.listdir(local_path)):
+            print(f"⏭️  {remote_folder}/ (folder unchanged)")
+            for name in subfolders:
+                folders.put((f"{remote_folder}/{name}".replace('//', '/'), local_path / name))
+            count('files_found', len(files))
+            count('files_skipped', len(images))
+            return []
+
+    to_download = []
     for item in items:
         # Build paths
         item_name = item.rstrip('/')
@@ -70,51 +471,365 @@ def download_wa_folder_recursive(client, remote_folder, local_folder, depth=0):
         local_item_path = local_path / item_name
 
         if item.endswith('/'):
-            # It's a directory - recurse
-            print(f"{indent}📁 {item_name}/")
-            download_wa_folder_recursive(client, remote_path, str(local_item_path), depth + 1)
-        else:
-            # It's a file
-            stats['files_found'] += 1
-
-            # Check if it's an image
-            ext = Path(item_name).suffix.lower()
-            if ext not in ['.jpg', '.jpeg', '.png', '.gif', '.heic', '.heif', '.webp', '.bmp']:
-                continue  # Skip non-image files
-
-            # Skip if already exists
-            if local_item_path.exists():
-                print(f"{indent}  ⏭️  {item_name} (exists)")
-                stats['files_skipped'] += 1
+            # It's a directory - list it on another thread
+            print(f"📁 {remote_path}/")
+            folders.put((remote_path, local_item_path))
+            continue
+
+        if wants_file(remote_path, local_item_path):
+            to_download.append((remote_path, local_item_path))
+
+    return to_download
+
+
+def wants_file(remote_path, local_item_path, etag=None, size=None):
+    """Count a remote file and decide whether it still needs downloading."""
+    count('files_found')
+
+    # Check if it's an image
+    if Path(remote_path).suffix.lower() not in IMAGE_EXTENSIONS:
+        return False  # Skip non-image files
+
+    if is_current(remote_path, local_item_path, etag, size):
+        print(f"  ⏭️  {remote_path} (exists)")
+        count('files_skipped')
+        return False
+
+    return True
+
+
+def is_current(remote_path, local_item_path, etag=None, size=None):
+    """
+    Check whether the local copy can be kept without asking the server.
+
+    Args:
+        remote_path: File path under /resources
+        local_item_path: Local copy
+        etag: The file's current ETag, if the listing included it
+        size: The file's current size, if the listing included it
+
+    Returns:
+        False if the file must be fetched (or revalidated by download_file)
+    """
+    try:
+        local_size = local_item_path.stat().st_size
+    except OSError:
+        return False
+
+    if size is not None and local_size != size:
+        return False  # Truncated, or the server's file has changed
+
+    with stats_lock:
+        record = file_records.get(remote_path)
+    if record is None:
+        # Downloaded before files were tracked: kept only if nothing says
+        # it is incomplete
+        return True
+    if record['size'] != local_size:
+        return False  # Local copy is truncated or was replaced
+    # Without a listed ETag, download_file revalidates with If-None-Match
+    return etag is not None and etag == record.get('etag')
+
+
+def download_wa_folder_recursive(session, base_url, remote_folder, local_folder, cache=None,
+                                 download_workers=DOWNLOAD_WORKERS):
+    """
+    Recursively download all files from a folder and its subfolders.
+
+    The whole tree is listed with a single deep PROPFIND and every image is
+    handed to a download pool as its entry arrives. Servers that refuse
+    infinite depth are walked folder by folder instead.
+    """
+    prefix = remote_folder.strip('/') + '/'
+    local_folder = Path(local_folder)
+    futures = []
+
+    try:
+        with ThreadPoolExecutor(max_workers=download_workers) as downloads:
+            for path, is_folder, size, etag in propfind_tree(session, base_url, remote_folder):
+                if not path.startswith(prefix):
+                    count('folders_scanned')  # The root folder itself
+                    continue
+                local_item_path = local_folder / path[len(prefix):]
+                if is_folder:
+                    print(f"📁 {path}/")
+                    local_item_path.mkdir(parents=True, exist_ok=True)
+                    count('folders_scanned')
+                elif wants_file(path, local_item_path, etag, size):
+                    local_item_path.parent.mkdir(parents=True, exist_ok=True)
+                    futures.append(downloads.submit(
+                        download_file, session, base_url, path, local_item_path, etag
+                    ))
+        return
+    except (requests.RequestException, ET.ParseError) as e:
+        if futures:
+            raise  # Failed partway; a folder walk would redo the downloads
+        print(f"Deep listing unavailable ({e}), listing folder by folder")
+
+    download_folder_by_folder(session, base_url, remote_folder, local_folder, cache,
+                              download_workers=download_workers)
+
+
+def list_tree_entries(session, base_url, root, list_workers=LIST_WORKERS):
+    """
+    List everything under a folder, deep PROPFIND first.
+
+    Servers that refuse infinite depth are walked breadth-first, one folder
+    per request: folders wait in a deque and up to list_workers listings
+    run at once, each queueing the subfolders it finds.
+
+    Returns:
+        List of (path, is_folder, size, etag) with paths relative to /resources
+    """
+    try:
+        return list(propfind_tree(session, base_url, root))
+    except (requests.RequestException, ET.ParseError) as e:
+        print(f"Deep listing unavailable ({e}), listing folder by folder")
+
+    base_path = urlparse(base_url).path.rstrip('/') + '/'
+    root = root.strip('/')
+
+    def list_children(folder):
+        children = []
+        for path, is_folder, size, etag in propfind(session, resource_url(base_url, folder, folder=True), 1):
+            if path.startswith(base_path):
+                path = path[len(base_path):]
+            path = path.strip('/')
+            if path != folder or folder == root:  # Each folder lists itself too
+                children.append((path, is_folder, size, etag))
+        return folder, children
+
+    entries = []
+    folders = deque([root])
+    running = set()
+    with ThreadPoolExecutor(max_workers=list_workers) as pool:
+        while folders or running:
+            while folders and len(running) < list_workers:
+                running.add(pool.submit(list_children, folders.popleft()))
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                folder, children = future.result()
+                for entry in children:
+                    entries.append(entry)
+                    if entry[1] and entry[0] != folder:
+                        folders.append(entry[0])
+    return entries
+
+
+def build_plan(session, base_url, remote_folder, local_folder):
+    """
+    List the whole tree and plan every image download up front.
+
+    Entries are sorted by remote path so files from the same server-side
+    folder are fetched together.
+
+    Returns:
+        List of {'remote', 'local', 'size', 'etag'} dicts
+    """
+    prefix = remote_folder.strip('/') + '/'
+    local_folder = Path(local_folder)
+
+    plan = []
+    for path, is_folder, size, etag in list_tree_entries(session, base_url, remote_folder):
+        if is_folder:
+            count('folders_scanned')
+            continue
+        if not path.startswith(prefix) or Path(path).suffix.lower() not in IMAGE_EXTENSIONS:
+            continue
+        plan.append({
+            'remote': path,
+            'local': str(local_folder / path[len(prefix):]),
+            'size': size,
+            'etag': etag,
+        })
+
+    plan.sort(key=lambda entry: entry['remote'])
+    return plan
+
+
+def plan_entry_done(entry):
+    """Check whether a planned file is already on disk, complete and current."""
+    return is_current(entry['remote'], Path(entry['local']), entry['etag'], entry['size'])
+
+
+def link_copy(source, target):
+    """
+    Hard-link target to source, copying where links aren't supported.
+
+    The link (or copy) is made under a temporary name and moved over target
+    with os.replace, so target is never missing or half-written, and a file
+    target used to share a link with is left alone.
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    part_path = target.with_name(target.name + '.part')
+    part_path.unlink(missing_ok=True)
+    try:
+        try:
+            os.link(source, part_path)
+        except OSError:
+            shutil.copy2(source, part_path)
+        os.replace(part_path, target)
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+
+
+def download_duplicates(session, base_url, entries, source=None):
+    """
+    Fetch one copy of a file that appears at several paths, then link the rest.
+
+    Args:
+        entries: Planned entries with the same size and ETag
+        source: An entry already on disk to link from, if any
+    """
+    if source is None:
+        source, entries = entries[0], entries[1:]
+        local_item_path = Path(source['local'])
+        local_item_path.parent.mkdir(parents=True, exist_ok=True)
+        if not download_file(session, base_url, source['remote'], local_item_path, source['etag']):
+            return  # Download failed (already counted); the copies wait for the next run
+
+    for entry in entries:
+        try:
+            link_copy(Path(source['local']), Path(entry['local']))
+        except OSError as e:
+            print(f"  🔗 {entry['remote']} ERROR: {e}")
+            count('errors')
+            continue
+        with stats_lock:
+            stats['files_linked'] += 1
+            record_file(entry['remote'], entry['etag'], entry['size'])
+        print(f"  🔗 {entry['remote']} (same as {source['remote']})")
+
+
+def bulk_download(session, base_url, plan, workers=DOWNLOAD_WORKERS, dedupe=False):
+    """
+    Download the planned files that aren't already current, in plan order.
+
+    With dedupe, files sharing a size and ETag are treated as copies of one
+    image: it is downloaded once (or taken from a copy already on disk) and
+    the other paths are hard-linked to it. Only use this when the server's
+    ETags are derived from file content.
+    """
+    copies = {}     # (size, etag) -> entries still to fetch
+    on_disk = {}    # (size, etag) -> an entry already downloaded
+
+    with ThreadPoolExecutor(max_workers=workers) as downloads:
+        for entry in plan:
+            count('files_found')
+            key = (entry['size'], entry['etag']) if dedupe and entry['size'] and entry['etag'] else None
+            if plan_entry_done(entry):
+                print(f"  ⏭️  {entry['remote']} (exists)")
+                count('files_skipped')
+                if key:
+                    on_disk.setdefault(key, entry)
                 continue
+            if key:
+                copies.setdefault(key, []).append(entry)
+                continue
+            local_item_path = Path(entry['local'])
+            local_item_path.parent.mkdir(parents=True, exist_ok=True)
+            downloads.submit(download_file, session, base_url, entry['remote'],
+                             local_item_path, entry['etag'])
+
+        for key, entries in copies.items():
+            downloads.submit(download_duplicates, session, base_url, entries, on_disk.get(key))
+
+
+def load_or_build_plan(session, base_url, folder_path, output_dir, plan_path):
+    """
+    Reuse the plan saved by an interrupted run, or build and save a new one.
+    """
+    try:
+        with open(plan_path) as f:
+            saved = json.load(f)
+        if saved.get('folder') == folder_path:
+            print(f"📋 Resuming saved plan from {saved.get('created_at')}")
+            return saved['entries']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    plan = build_plan(session, base_url, folder_path, output_dir)
+    plan_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(plan_path, 'w') as f:
+        json.dump({
+            'folder': folder_path,
+            'created_at': datetime.now().isoformat(),
+            'entries': plan
+        }, f)
+    print(f"📋 Planned {len(plan)} images, saved to {plan_path}")
+    return plan
+
+
+def download_folder_by_folder(session, base_url, remote_folder, local_folder, cache=None,
+                              list_workers=LIST_WORKERS, download_workers=DOWNLOAD_WORKERS):
+    """
+    Recursively download a folder, listing one folder per request.
+
+    Listing threads take folders from a queue and queue any subfolders they
+    find; every image found is handed to a download pool, so many requests
+    are in flight at once instead of one after another.
+    """
+    folders = queue.Queue()
+    folders.put((remote_folder, Path(local_folder)))
+    futures = []
+
+    with ThreadPoolExecutor(max_workers=download_workers) as downloads:
+        def lister():
+            while True:
+                folder = folders.get()
+                try:
+                    if folder is None:
+                        return
+                    for remote_path, local_item_path in list_folder(session, base_url, *folder, folders, cache):
+                        futures.append(downloads.submit(
+                            download_file, session, base_url, remote_path, local_item_path
+                        ))
+                except Exception as e:
+                    print(f"[ERROR] Cannot scan {folder[0]}: {e}")
+                    count('errors')
+                finally:
+                    folders.task_done()
+
+        threads = [threading.Thread(target=lister, daemon=True) for _ in range(list_workers)]
+        for thread in threads:
+            thread.start()
 
-            # Download
-            print(f"{indent}  ⬇️  {item_name}...", end=' ', flush=True)
-            try:
-                client.download_sync(remote_path, str(local_item_path))
-                size = local_item_path.stat().st_size if local_item_path.exists() else 0
-                stats['files_downloaded'] += 1
-                stats['total_size'] += size
-                print(f"OK ({size // 1024} KB)")
-            except Exception as e:
-                print(f"ERROR: {e}")
-                stats['errors'] += 1
+        # Every folder has been listed once the queue drains
+        folders.join()
+        for _ in threads:
+            folders.put(None)
+        for thread in threads:
+            thread.join()
 
+        wait(futures)
 
-def download_wa_folder(site_url, folder_path, output_dir, username, password, recursive=False):
+
+def download_wa_folder(site_url, folder_path, output_dir, username, password, recursive=False,
+                       plan=False, dry_run=False, dedupe=False):
     """
     Download all files from a Wild Apricot folder via WebDAV.
+
+    With plan, the whole tree is listed and saved as a download plan before
+    anything is fetched, so an interrupted run resumes from the same plan.
+    dry_run stops after writing the plan. dedupe (plan mode only) downloads
+    files with the same size and ETag once and hard-links the other copies.
     """
     global stats
 
-    # Configure WebDAV client
-    options = {
-        'webdav_hostname': f"https://{site_url}/resources",
-        'webdav_login': username,
-        'webdav_password': password,
-    }
+    base_url = f"https://{site_url}/resources"
+    session = make_session(username, password)
+    cache = ListingCache(Path(output_dir) / '_listing_cache.json')
 
-    client = Client(options)
+    # Pick up the files recorded by earlier runs
+    manifest_path = Path(output_dir) / '_download_manifest.json'
+    try:
+        with open(manifest_path) as f:
+            file_records.update(json.load(f).get('files', {}))
+    except (OSError, ValueError):
+        pass
+    records_path = Path(output_dir) / '_download_records.jsonl'
+    open_record_log(records_path)
 
     print(f"🔗 Connecting to {site_url}...")
     print(f"📂 Target folder: {folder_path}")
@@ -124,19 +839,34 @@ def download_wa_folder(site_url, folder_path, output_dir, username, password, re
 
     try:
         # Check if folder exists
-        if not client.check(folder_path):
+        if not folder_exists(session, base_url, folder_path):
             print(f"❌ Folder '{folder_path}' not found!")
             print("\nAvailable folders:")
-            for item in client.list('/'):
+            for item in list_items(session, base_url, '/'):
                 print(f"  - {item}")
             return
 
-        if recursive:
+        if recursive or plan or dry_run or dedupe:
+            warm_connections(session, base_url)
+
+        if plan or dry_run or dedupe:
+            plan_path = Path(output_dir) / '_download_plan.json'
+            entries = load_or_build_plan(session, base_url, folder_path, output_dir, plan_path)
+            if dry_run:
+                pending = [entry for entry in entries if not plan_entry_done(entry)]
+                pending_size = sum(entry['size'] or 0 for entry in pending)
+                print(f"🧪 Dry run: {len(pending)} of {len(entries)} images to download "
+                      f"({pending_size // (1024*1024)} MB)")
+                return
+            bulk_download(session, base_url, entries, dedupe=dedupe)
+            if not stats['errors']:
+                plan_path.unlink(missing_ok=True)  # Finished; next run plans afresh
+        elif recursive:
             # Recursive download
-            download_wa_folder_recursive(client, folder_path, output_dir)
+            download_wa_folder_recursive(session, base_url, folder_path, output_dir, cache)
         else:
             # Single folder download
-            items = client.list(folder_path)
+            items, _ = cached_list(session, base_url, folder_path, cache)
             output_path = Path(output_dir)
             output_path.mkdir(parents=True, exist_ok=True)
 
@@ -147,26 +877,19 @@ def download_wa_folder(site_url, folder_path, output_dir, username, password, re
 
                 item_name = item.rstrip('/')
                 ext = Path(item_name).suffix.lower()
-                if ext not in ['.jpg', '.jpeg', '.png', '.gif', '.heic', '.heif', '.webp', '.bmp']:
+                if ext not in IMAGE_EXTENSIONS:
                     continue
 
                 stats['files_found'] += 1
                 remote_path = f"{folder_path}/{item_name}"
                 local_path = output_path / item_name
 
-                if local_path.exists():
+                if is_current(remote_path, local_path):
                     print(f"  ⏭️  {item_name} (exists)")
                     stats['files_skipped'] += 1
                     continue
 
-                print(f"  ⬇️  {item_name}...", end=' ', flush=True)
-                try:
-                    client.download_sync(remote_path, str(local_path))
-                    stats['files_downloaded'] += 1
-                    print("OK")
-                except Exception as e:
-                    print(f"ERROR: {e}")
-                    stats['errors'] += 1
+                download_file(session, base_url, remote_path, local_path)
 
         # Print summary
         print("-" * 50)
@@ -175,18 +898,26 @@ def download_wa_folder(site_url, folder_path, output_dir, username, password, re
         print(f"   Images found: {stats['files_found']}")
         print(f"   Downloaded: {stats['files_downloaded']}")
         print(f"   Skipped (existing): {stats['files_skipped']}")
+        if stats['files_linked']:
+            print(f"   Linked (duplicates): {stats['files_linked']}")
         print(f"   Errors: {stats['errors']}")
         print(f"   Total size: {stats['total_size'] // (1024*1024)} MB")
 
-        # Save manifest
-        manifest_path = Path(output_dir) / '_download_manifest.json'
+        cache.save()
+
+        # Fold this run's record log into the manifest
+        close_record_log()
         manifest = {
             'source': f"https://{site_url}/resources/{folder_path}",
             'downloaded_at': datetime.now().isoformat(),
-            'stats': stats
+            'stats': stats,
+            'files': file_records
         }
-        with open(manifest_path, 'w') as f:
-            json.dump(manifest, f, indent=2)
+        tmp_path = manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, separators=(',', ':'))
+        os.replace(tmp_path, manifest_path)
+        records_path.unlink(missing_ok=True)
         print(f"\n📄 Manifest saved to: {manifest_path}")
 
     except Exception as e:
@@ -195,21 +926,17 @@ def download_wa_folder(site_url, folder_path, output_dir, username, password, re
         print("1. Verify you're using a full site administrator account")
         print("2. Check your site URL is correct")
         print("3. Try accessing via Finder first to verify credentials")
+    finally:
+        close_record_log()
 
 
 def list_wa_folders(site_url, username, password, path='/'):
     """List folders at a given path."""
-    options = {
-        'webdav_hostname': f"https://{site_url}/resources",
-        'webdav_login': username,
-        'webdav_password': password,
-    }
-
-    client = Client(options)
+    session = make_session(username, password)
 
     print(f"Contents of '{path}':")
     try:
-        for item in client.list(path):
+        for item in list_items(session, f"https://{site_url}/resources", path):
             print(f"  {item}")
     except Exception as e:
         print(f"Error: {e}")
@@ -223,6 +950,15 @@ def main():
                         help='Folder path within /resources (e.g., "Pictures/Fall 2025")')
     parser.add_argument('--output', default='./wa_photos',
                         help='Local directory to save files')
+    parser.add_argument('--recursive', action='store_true',
+                        help='Also download all subfolders')
+    parser.add_argument('--plan', action='store_true',
+                        help='List the whole tree first, then download in path order (implies --recursive)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Write the download plan and report what would be fetched')
+    parser.add_argument('--dedupe', action='store_true',
+                        help='Download files with the same size and ETag once and hard-link the copies '
+                             '(implies --plan; only safe if the server\'s ETags are content hashes)')
     parser.add_argument('--list', action='store_true',
                         help='Just list folder contents, don\'t download')
     parser.add_argument('--username', help='WA admin email (will prompt if not provided)')
@@ -237,7 +973,8 @@ def main():
     if args.list:
         list_wa_folders(args.site, username, password, args.folder)
     else:
-        download_wa_folder(args.site, args.folder, args.output, username, password)
+        download_wa_folder(args.site, args.folder, args.output, username, password,
+                           recursive=args.recursive, plan=args.plan, dry_run=args.dry_run, dedupe=args.dedupe)
 
 
 if __name__ == '__main__':
@@ -9,10 +9,12 @@ Cron entry:
 */5 * * * * /opt/sbnc-photos/scripts/face_recognition_health_check.py
 """
 
+import os
 import sys
 import json
 import smtplib
 import requests
+from requests.adapters import HTTPAdapter
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
@@ -22,6 +24,7 @@ from pathlib import Path
 HEALTH_CHECK_URL = "http://127.0.0.1:5199/api/health"
 ALERT_RECIPIENTS = ["technology@sbnewcomers.org", "sbnctech@gmail.com"]
 FROM_EMAIL = "noreply@sbnewcomers.org"
+ALERT_TO_HEADER = ', '.join(ALERT_RECIPIENTS)
 STATE_FILE = "/opt/sbnc-photos/data/health_check_state.json"
 TIMEOUT_SECONDS = 10
 
@@ -31,6 +34,10 @@ FAILURE_THRESHOLD = 2
 # How long (minutes) between repeat alerts for ongoing issues
 REPEAT_ALERT_INTERVAL = 60
 
+# One pooled connection to the local service, reused across probes
+SESSION = requests.Session()
+SESSION.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
 
 def load_state():
     """Load previous state from file."""
@@ -49,12 +56,22 @@ def load_state():
     }
 
 
-def save_state(state):
-    """Save state to file."""
+def save_state(state, original=None):
+    """
+    Save state to file.
+
+    Skips the write when the state matches original (the JSON it was loaded
+    from), so a steadily healthy service costs no disk write per run. The
+    file is replaced atomically so a crash can't leave it half-written.
+    """
+    if original is not None and json.dumps(state, sort_keys=True) == original:
+        return
+
     state_path = Path(STATE_FILE)
     state_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(state_path, 'w') as f:
-        json.dump(state, f, indent=2)
+    tmp_path = state_path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(state, indent=2))
+    os.replace(tmp_path, state_path)
 
 
 def check_service():
@@ -63,7 +80,7 @@ def check_service():
     Returns (is_healthy, error_message)
     """
     try:
-        response = requests.get(HEALTH_CHECK_URL, timeout=TIMEOUT_SECONDS)
+        response = SESSION.get(HEALTH_CHECK_URL, timeout=TIMEOUT_SECONDS)
         if response.status_code == 200:
             data = response.json()
             if data.get('face_recognition', {}).get('available'):
@@ -80,19 +97,46 @@ def check_service():
         return False, f"Unexpected error: {str(e)}"
 
 
-def send_alert(subject, body):
-    """Send email alert to configured recipients."""
+class AlertMailer:
+    """Send alerts over one SMTP connection, opened on first use."""
+
+    def __init__(self):
+        self.server = None
+
+    def sendmail(self, message):
+        if self.server is None:
+            # Use local sendmail (server has postfix configured)
+            self.server = smtplib.SMTP('localhost')
+        self.server.sendmail(FROM_EMAIL, ALERT_RECIPIENTS, message)
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                pass
+            self.server = None
+
+
+def send_alert(subject, body, mailer=None):
+    """
+    Send email alert to configured recipients.
+
+    Pass a mailer to send several alerts over one SMTP connection;
+    otherwise a connection is opened just for this message.
+    """
     try:
-        # Use local sendmail (server has postfix configured)
         msg = MIMEMultipart()
         msg['From'] = FROM_EMAIL
-        msg['To'] = ', '.join(ALERT_RECIPIENTS)
+        msg['To'] = ALERT_TO_HEADER
         msg['Subject'] = subject
         msg.attach(MIMEText(body, 'plain'))
 
-        # Connect to local SMTP server
-        with smtplib.SMTP('localhost') as server:
-            server.sendmail(FROM_EMAIL, ALERT_RECIPIENTS, msg.as_string())
+        if mailer is not None:
+            mailer.sendmail(msg.as_string())
+        else:
+            with smtplib.SMTP('localhost') as server:
+                server.sendmail(FROM_EMAIL, ALERT_RECIPIENTS, msg.as_string())
 
         print(f"Alert sent: {subject}")
         return True
@@ -101,7 +145,7 @@ def send_alert(subject, body):
         return False
 
 
-def send_down_alert(error_message, consecutive_failures):
+def send_down_alert(error_message, consecutive_failures, mailer=None):
     """Send alert that service is down."""
     subject = "[ALERT] SBNC Face Recognition Service DOWN"
     body = f"""SBNC Photo Gallery Alert
@@ -125,10 +169,10 @@ and recognition features will be unavailable until the service is restored.
 
 This is an automated message from the SBNC Photo Gallery System.
 """
-    return send_alert(subject, body)
+    return send_alert(subject, body, mailer)
 
 
-def send_recovery_alert():
+def send_recovery_alert(mailer=None):
     """Send alert that service has recovered."""
     subject = "[RESOLVED] SBNC Face Recognition Service RECOVERED"
     body = f"""SBNC Photo Gallery Alert
@@ -143,11 +187,21 @@ No action required. Face recognition features are now available.
 
 This is an automated message from the SBNC Photo Gallery System.
 """
-    return send_alert(subject, body)
+    return send_alert(subject, body, mailer)
 
 
 def main():
+    mailer = AlertMailer()
+    try:
+        check_and_alert(mailer)
+    finally:
+        mailer.close()
+
+
+def check_and_alert(mailer):
+    """Probe the service, send any alerts due, and record the new state."""
     state = load_state()
+    original = json.dumps(state, sort_keys=True)
     is_healthy, error_message = check_service()
 
     now = datetime.now().isoformat()
@@ -156,7 +210,7 @@ def main():
         # Service is up
         if state["last_status"] == "down" and state["consecutive_failures"] >= FAILURE_THRESHOLD:
             # Was down, now recovered - send recovery alert
-            send_recovery_alert()
+            send_recovery_alert(mailer)
 
         state["consecutive_failures"] = 0
         state["last_status"] = "up"
@@ -184,12 +238,12 @@ def main():
                     should_alert = True
 
         if should_alert:
-            if send_down_alert(error_message, state["consecutive_failures"]):
+            if send_down_alert(error_message, state["consecutive_failures"], mailer):
                 state["last_alert_time"] = now
 
         state["last_status"] = "down"
 
-    save_state(state)
+    save_state(state, original)
 
 
 if __name__ == '__main__':
@@ -4,7 +4,7 @@ SBNC Photo Gallery System - Queue Processing Script
 Run via cron to process pending photo uploads.
 
 Usage:
-    python scripts/process_queue.py [--batch-size N]
+    python scripts/process_queue.py [--batch-size N] [--workers N] [--io-workers N] [--commit-every N]
 """
 
 import sys
@@ -15,18 +15,25 @@ from pathlib import Path
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.processing.pipeline import process_queue
-from app.database import init_db
-
 
 def main():
     parser = argparse.ArgumentParser(description='Process photo queue')
     parser.add_argument('--batch-size', type=int, default=50,
                         help='Maximum photos to process per run')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes for the CPU-bound stages (default: QUEUE_WORKERS)')
+    parser.add_argument('--io-workers', type=int, default=None,
+                        help='Threads reading and hashing files (default: QUEUE_IO_WORKERS)')
+    parser.add_argument('--commit-every', type=int, default=None,
+                        help='Queue status updates per commit (default: 10)')
     parser.add_argument('--verbose', '-v', action='store_true',
                         help='Enable verbose logging')
     args = parser.parse_args()
 
+    # Deferred until the arguments parse, so --help doesn't load the app
+    from app.processing.pipeline import process_queue
+    from app.database import init_db
+
     # Setup logging
     log_level = logging.DEBUG if args.verbose else logging.INFO
     logging.basicConfig(
@@ -42,7 +49,8 @@ def main():
         init_db()
 
         # Process the queue
-        result = process_queue(batch_size=args.batch_size)
+        result = process_queue(batch_size=args.batch_size, max_workers=args.workers,
+                               commit_every=args.commit_every, io_workers=args.io_workers)
 
         logger.info(f"Processing complete: {result['processed']} processed, "
                     f"{result['failed']} failed, {result['total']} total")
@@ -20,123 +20,522 @@ Usage:
 
 Requirements:
     pip install webdavclient3
+    pip install httpx  # Optional: runs all transfers concurrently on one thread
 """
 
 import argparse
+import asyncio
 import os
 import json
+import queue
+import shutil
+import sys
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from getpass import getpass
 from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import quote, unquote, urlparse
 
 try:
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
     from webdav3.client import Client
+    from webdav3.exceptions import MethodNotSupported, RemoteResourceNotFound, ResponseErrorCode
+    from webdav3.urn import Urn
 except ImportError:
     print("Please install webdavclient3: pip install webdavclient3")
     exit(1)
 
+try:
+    import httpx
+    HTTPX_SUPPORT = True
+except ImportError:
+    # httpx not installed - transfers run on threads with webdavclient3
+    HTTPX_SUPPORT = False
+
 
 # Supported image extensions
-IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.heic', '.heif', '.webp', '.bmp']
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.heic', '.heif', '.webp', '.bmp'})
+
+# Parallel uploads when uploading a folder
+DEFAULT_WORKERS = 5
+
+# Parallel downloads, and folder listings, for recursive downloads
+DOWNLOAD_WORKERS = 8
+LISTER_WORKERS = 3
+
+# Progress output, written by one background thread (see log())
+_log_queue = queue.Queue()
+_log_lock = threading.Lock()
+_log_thread = None
+
+# Requests safe to retry on a gateway error - uploads send a file stream
+# that a retry can't rewind
+RETRY_METHODS = frozenset(['GET', 'HEAD', 'PROPFIND'])
+
+# Remote folder listings, so uploads don't check each file separately
+_folder_listing_cache = {}
+_folder_listing_lock = threading.Lock()
+
+# Read/write size when streaming a transfer to or from disk
+DOWNLOAD_BUFFER_SIZE = 1 << 20
+
+# Ask PROPFIND for just the properties we use
+PROPFIND_BODY = (
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b'<D:propfind xmlns:D="DAV:"><D:prop><D:resourcetype/><D:getetag/></D:prop></D:propfind>'
+)
+
+
+class KeepAliveClient(Client):
+    """
+    webdavclient3 Client that hands its connections back to the pool.
+
+    Client.check never reads its streamed response, which strands the
+    connection it used - and download_sync alone checks twice per file.
+    Error responses are drained too, before Client raises on them.
+    """
+
+    def __init__(self, options):
+        super().__init__(options)
+        self.session.hooks['response'].append(self._drain_error)
+
+    @staticmethod
+    def _drain_error(response, **kwargs):
+        if response.status_code >= 400:
+            response.content
+
+    def check(self, remote_path=Client.root):
+        try:
+            response = self.execute_request(action='check', path=Urn(remote_path).quote())
+        except RemoteResourceNotFound:
+            return False
+        response.content  # Drain it so the connection can be reused
+        return response.status_code == 200
 
 
-def get_webdav_client(site_url, username, password):
-    """Create and return a WebDAV client."""
+def _log_writer():
+    """Write queued output, everything waiting at once with a single flush."""
+    while True:
+        lines = [_log_queue.get()]
+        while True:
+            try:
+                lines.append(_log_queue.get_nowait())
+            except queue.Empty:
+                break
+        sys.stdout.write(''.join(f"{line}\n" for line in lines))
+        sys.stdout.flush()
+        for _ in lines:
+            _log_queue.task_done()
+
+
+def log(message):
+    """
+    Print a progress line without waiting on the terminal.
+
+    Worker threads and the event loop hand their output to one writer
+    thread, which also keeps lines from interleaving.
+    """
+    global _log_thread
+    with _log_lock:
+        if _log_thread is None:
+            _log_thread = threading.Thread(target=_log_writer, daemon=True)
+            _log_thread.start()
+    _log_queue.put(message)
+
+
+def flush_log():
+    """Wait until all queued output has been written."""
+    _log_queue.join()
+
+
+def get_webdav_client(site_url, username, password, connections=DOWNLOAD_WORKERS + LISTER_WORKERS):
+    """
+    Create and return a WebDAV client.
+
+    Its session keeps enough connections alive for every worker thread, so
+    requests reuse an open TLS connection instead of handshaking again.
+    Reads that hit a transient gateway error are retried.
+    """
     options = {
         'webdav_hostname': f"https://{site_url}/resources",
         'webdav_login': username,
         'webdav_password': password,
     }
-    return Client(options)
+    client = KeepAliveClient(options)
+    retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504],
+                    allowed_methods=RETRY_METHODS, raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=connections, max_retries=retries)
+    client.session.mount('https://', adapter)
+    client.session.mount('http://', adapter)
+    return client
+
+
+def join_remote(*parts):
+    """
+    Join remote path segments with single slashes.
+
+    Leading, trailing and doubled slashes on the parts are dropped, so
+    'Pictures/' + 'a.jpg' and 'Pictures' + '/a.jpg' give the same path
+    (and the same cache keys).
+    """
+    return '/'.join(part.strip('/') for part in parts if part.strip('/'))
+
+
+def clone_client(client):
+    """
+    Create another client with the same connection settings.
+
+    It shares the original's session, so all threads draw on one pool of
+    kept-alive connections.
+    """
+    clone = KeepAliveClient({
+        'webdav_hostname': client.webdav.hostname,
+        'webdav_login': client.webdav.login,
+        'webdav_password': client.webdav.password,
+    })
+    clone.session = client.session
+    return clone
+
+
+def folder_listing(client, remote_folder):
+    """
+    Names of the items in a remote folder.
+
+    The folder is listed once per run; later calls are served from the
+    cache, which uploads and mkdirs keep up to date.
+    """
+    key = remote_folder.strip('/')
+    with _folder_listing_lock:
+        names = _folder_listing_cache.get(key)
+    if names is None:
+        # Leave out the current directory marker
+        marker = key.split('/')[-1] + '/'
+        names = {item.rstrip('/') for item in client.list(remote_folder) if item and item != marker}
+        with _folder_listing_lock:
+            names = _folder_listing_cache.setdefault(key, names)
+    return names
+
+
+def _cache_new_item(remote_folder, name):
+    """Record an item we just created in its folder's cached listing."""
+    with _folder_listing_lock:
+        names = _folder_listing_cache.get(remote_folder.strip('/'))
+        if names is not None:
+            names.add(name)
+
+
+def ensure_remote_folder(client, remote_folder):
+    """
+    Create a remote folder if it doesn't exist yet.
+
+    Sends a bare MKCOL, which the server refuses for an existing folder,
+    instead of checking first. The parent folder must already exist.
+    """
+    try:
+        client.execute_request('mkdir', Urn(remote_folder, directory=True).quote()).content
+    except MethodNotSupported:
+        return  # Already exists
+    except Exception as e:
+        log(f"[ERROR] Cannot create {remote_folder}: {e}")
+        return
+
+    log(f"[CREATE] Remote folder: {remote_folder}")
+    # A new folder is empty - no need to list it
+    parent, _, name = remote_folder.strip('/').rpartition('/')
+    _cache_new_item(parent, name)
+    with _folder_listing_lock:
+        _folder_listing_cache[remote_folder.strip('/')] = set()
 
 
 def upload_file(client, local_path, remote_folder, overwrite=False):
-    """Upload a single file to WA."""
-    local_path = Path(local_path)
-    if not local_path.exists():
-        print(f"  [ERROR] File not found: {local_path}")
-        return False
+    """
+    Upload a single file to WA.
 
+    Returns:
+        (result, size in bytes) - result is 'uploaded', 'skipped' (already
+        on WA) or 'error', and the size is 0 unless uploaded
+    """
+    local_path = Path(local_path)
     filename = local_path.name
-    remote_path = f"{remote_folder}/{filename}".replace('//', '/')
+    remote_path = join_remote(remote_folder, filename)
 
-    # Check if file exists on remote
+    # Check if file exists on remote, from the folder's cached listing
     try:
-        if client.check(remote_path) and not overwrite:
-            print(f"  [SKIP] {filename} (already exists, use --overwrite)")
-            return False
+        if not overwrite and filename in folder_listing(client, remote_folder):
+            log(f"  [SKIP] {filename} (already exists, use --overwrite)")
+            return 'skipped', 0
     except:
-        pass  # File doesn't exist, OK to upload
+        pass  # Can't list the folder, just try the upload
 
-    print(f"  [UPLOAD] {filename}...", end=' ', flush=True)
     try:
-        client.upload_sync(str(local_path), remote_path)
-        size = local_path.stat().st_size
-        print(f"OK ({size // 1024} KB)")
-        return True
+        # A plain PUT: upload_sync checks the path and its parent first and
+        # never reads the response, stranding the connection
+        with open(local_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            client.execute_request('upload', Urn(remote_path).quote(), data=f).content
+    except FileNotFoundError:
+        log(f"  [ERROR] File not found: {local_path}")
+        return 'error', 0
     except Exception as e:
-        print(f"ERROR: {e}")
-        return False
+        log(f"  [UPLOAD] {filename} ERROR: {e}")
+        return 'error', 0
+
+    _cache_new_item(remote_folder, filename)
+    log(f"  [UPLOAD] {filename} OK ({size // 1024} KB)")
+    return 'uploaded', size
+
+
+def download_file(client, remote_path, local_path, conditions=None):
+    """
+    Download one file to disk, streaming it in 1MB blocks.
+
+    A single GET - download_sync checks the path twice first - written to
+    a .part file, so a failed download never leaves a partial file behind.
+    The file's mtime is set from Last-Modified, so later runs can
+    revalidate it with If-Modified-Since.
 
+    Args:
+        conditions: Conditional request headers for a local copy, from
+            needs_download
 
-def upload_folder(client, local_folder, remote_folder, recursive=False, overwrite=False):
-    """Upload all images from a local folder to WA."""
+    Returns:
+        Size of the file in bytes, or None if the local copy is current
+    """
+    local_path = Path(local_path)
+    part_path = local_path.with_name(local_path.name + '.part')
+    headers = [f'{name}: {value}' for name, value in (conditions or {}).items()]
+    try:
+        with client.execute_request('download', Urn(remote_path).quote(), headers_ext=headers) as response:
+            if response.status_code == 304:
+                return None
+            response.raw.decode_content = True
+            with open(part_path, 'wb', buffering=DOWNLOAD_BUFFER_SIZE) as f:
+                shutil.copyfileobj(response.raw, f, length=DOWNLOAD_BUFFER_SIZE)
+            last_modified = response.headers.get('Last-Modified')
+        os.replace(part_path, local_path)
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+    set_mtime(local_path, last_modified)
+    return local_path.stat().st_size
+
+
+def set_mtime(local_path, last_modified):
+    """Give a downloaded file the server's Last-Modified time, if it sent one."""
+    try:
+        mtime = parsedate_to_datetime(last_modified).timestamp()
+    except (TypeError, ValueError):
+        return
+    os.utime(local_path, (mtime, mtime))
+
+
+def list_with_etags(client, remote_folder):
+    """
+    List a folder's contents along with their ETags.
+
+    Returns:
+        List of (item, etag), item names with a trailing '/' on subfolders
+    """
+    # Leave out the current directory marker
+    marker = remote_folder.strip('/').split('/')[-1] + '/'
+    items = []
+    for info in client.list(remote_folder, get_info=True):
+        name = info['path'].rstrip('/').rsplit('/', 1)[-1]
+        item = f"{name}/" if info['isdir'] else name
+        if name and item != marker:
+            items.append((item, info.get('etag')))
+    return items
+
+
+def needs_download(rel_path, local_path, etag, local_names, etags):
+    """
+    Check a listed image against the local copy and the last run's ETags.
+
+    An image on disk whose ETag is unchanged since the last run is
+    skipped. Otherwise it's fetched with a conditional GET - If-None-Match
+    with the old ETag, or If-Modified-Since with the file's mtime when
+    there's no ETag to compare - so the server only sends it if it changed.
+
+    Returns:
+        None to skip the image, or the conditional request headers to
+        download it with ({} if there's no local copy)
+    """
+    if local_path.name not in local_names:
+        return {}
+    known = etags.get(rel_path)
+    if known and etag:
+        if known == etag:
+            return None
+        return {'If-None-Match': known}
+    try:
+        mtime = local_path.stat().st_mtime
+    except OSError:
+        return {}
+    conditions = {'If-Modified-Since': formatdate(mtime, usegmt=True)}
+    if known:
+        conditions['If-None-Match'] = known
+    return conditions
+
+
+def list_tree(client, remote_folder):
+    """
+    List everything under a folder with one Depth: infinity PROPFIND.
+
+    Returns:
+        List of (path relative to remote_folder, is_folder, etag)
+    """
+    own_path = unquote(urlparse(client.get_url(Urn(remote_folder, directory=True).quote())).path)
+    entries = []
+    for info in client.list(remote_folder, get_info=True, recursive=True):
+        path = info['path'].rstrip('/')
+        if not path.startswith(own_path):
+            continue  # The folder itself
+        entries.append((path[len(own_path):], info['isdir'], info.get('etag')))
+    return entries
+
+
+def plan_tree_downloads(entries, remote_folder, root, stats, etags):
+    """
+    Work out which images from a deep listing need downloading.
+
+    Creates the local folders on the way, reading each one once with
+    os.listdir rather than checking every file.
+
+    Returns:
+        List of (remote_path, local_path, rel_path, etag, conditions)
+    """
+    local_names = {}
+
+    def names_in(rel_folder):
+        if rel_folder not in local_names:
+            local_path = root / rel_folder
+            local_path.mkdir(parents=True, exist_ok=True)
+            local_names[rel_folder] = set(os.listdir(local_path))
+            stats['folders_scanned'] += 1
+        return local_names[rel_folder]
+
+    names_in('')
+    downloads = []
+    for rel_path, is_folder, etag in sorted(entries):
+        remote_path = join_remote(remote_folder, rel_path)
+        if is_folder:
+            log(f"[FOLDER] {remote_path}/")
+            names_in(rel_path)
+            continue
+
+        rel_folder, _, name = rel_path.rpartition('/')
+        if Path(name).suffix.lower() not in IMAGE_EXTENSIONS:
+            continue
+
+        stats['files_found'] += 1
+        conditions = needs_download(rel_path, root / rel_path, etag, names_in(rel_folder), etags)
+        if conditions is None:
+            log(f"  [SKIP] {remote_path} (exists)")
+            stats['files_skipped'] += 1
+            continue
+        downloads.append((remote_path, root / rel_path, rel_path, etag, conditions))
+    return downloads
+
+
+def iter_image_files(root, recursive=False):
+    """
+    Yield the image files in a local folder, walking it with os.scandir.
+
+    Directory entries know whether they're files or folders without a
+    stat call per entry, which Path.rglob plus is_file() would need.
+    """
+    stack = [str(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            stack.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS and entry.is_file():
+                        yield Path(entry.path)
+        except OSError:
+            continue
+
+
+def plan_uploads(local_path, remote_folder, recursive=False):
+    """
+    Work out which images to upload and where, in one pass over the files.
+
+    Returns:
+        ((local_file, target_folder) list, remote folders to create with
+        parents first - including ones that only hold subfolders)
+    """
+    remote_folder = join_remote(remote_folder)
+    uploads = []
+    targets = {}  # Local directory -> remote folder, worked out once per directory
+    for local_file in iter_image_files(local_path, recursive):
+        directory = local_file.parent
+        target_folder = targets.get(directory)
+        if target_folder is None:
+            # Preserve subfolder structure if recursive
+            target_folder = join_remote(remote_folder, *directory.relative_to(local_path).parts)
+            targets[directory] = target_folder
+        uploads.append((local_file, target_folder))
+
+    folders = {remote_folder}
+    for target_folder in targets.values():
+        # Every folder between remote_folder and the target, so each MKCOL has its parent
+        while target_folder not in folders and target_folder.startswith(remote_folder):
+            folders.add(target_folder)
+            target_folder = target_folder.rpartition('/')[0]
+    return uploads, sorted(folders, key=lambda f: f.count('/'))
+
+
+def upload_folder(client, local_folder, remote_folder, recursive=False, overwrite=False,
+                  workers=DEFAULT_WORKERS):
+    """
+    Upload all images from a local folder to WA.
+
+    Remote subfolders are created once up front, then the files are
+    uploaded by a pool of worker threads, each with its own client.
+    """
     local_path = Path(local_folder)
     if not local_path.exists():
-        print(f"[ERROR] Folder not found: {local_folder}")
+        log(f"[ERROR] Folder not found: {local_folder}")
         return {'uploaded': 0, 'skipped': 0, 'errors': 0}
 
     stats = {'uploaded': 0, 'skipped': 0, 'errors': 0, 'total_size': 0}
+    uploads, folders = plan_uploads(local_path, remote_folder, recursive)
 
-    # Ensure remote folder exists
-    try:
-        if not client.check(remote_folder):
-            print(f"[CREATE] Remote folder: {remote_folder}")
-            client.mkdir(remote_folder)
-    except:
-        try:
-            client.mkdir(remote_folder)
-        except:
-            pass
-
-    # Get files to upload
-    if recursive:
-        files = list(local_path.rglob('*'))
-    else:
-        files = list(local_path.iterdir())
+    # Create every remote folder once, parents first, and list each one
+    # now so the upload threads only hit the cache
+    for folder in folders:
+        ensure_remote_folder(client, folder)
+        if not overwrite:
+            try:
+                folder_listing(client, folder)
+            except Exception as e:
+                log(f"[ERROR] Cannot list {folder}: {e}")
 
-    # Filter to images only
-    image_files = [f for f in files if f.is_file() and f.suffix.lower() in IMAGE_EXTENSIONS]
+    log(f"Found {len(uploads)} images to upload")
+    log("-" * 50)
 
-    print(f"Found {len(image_files)} images to upload")
-    print("-" * 50)
+    # webdav3 clients aren't documented as thread-safe - one per worker thread
+    local = threading.local()
 
-    for local_file in image_files:
-        # Calculate remote path preserving subfolder structure if recursive
-        if recursive:
-            rel_path = local_file.relative_to(local_path)
-            if len(rel_path.parts) > 1:
-                # Has subfolder - create it
-                subfolder = f"{remote_folder}/{'/'.join(rel_path.parts[:-1])}"
-                try:
-                    if not client.check(subfolder):
-                        client.mkdir(subfolder)
-                except:
-                    try:
-                        client.mkdir(subfolder)
-                    except:
-                        pass
-                target_folder = subfolder
-            else:
-                target_folder = remote_folder
-        else:
-            target_folder = remote_folder
+    def upload(local_file, target_folder):
+        if not hasattr(local, 'client'):
+            local.client = clone_client(client)
+        return upload_file(local.client, local_file, target_folder, overwrite)
 
-        if upload_file(client, local_file, target_folder, overwrite):
-            stats['uploaded'] += 1
-            stats['total_size'] += local_file.stat().st_size
-        else:
-            if client.check(f"{target_folder}/{local_file.name}"):
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(upload, *item) for item in uploads]
+        for future in as_completed(futures):
+            result, size = future.result()
+            if result == 'uploaded':
+                stats['uploaded'] += 1
+                stats['total_size'] += size
+            elif result == 'skipped':
                 stats['skipped'] += 1
             else:
                 stats['errors'] += 1
@@ -144,54 +543,487 @@ def upload_folder(client, local_folder, remote_folder, recursive=False, overwrit
     return stats
 
 
-def download_folder_recursive(client, remote_folder, local_folder, stats, depth=0):
-    """Recursively download all files from a folder and its subfolders."""
-    indent = "  " * depth
+def download_folder_recursive(client, remote_folder, local_folder, stats, workers=DOWNLOAD_WORKERS,
+                              etags=None):
+    """
+    Download all files from a folder and its subfolders.
+
+    The whole tree is listed with one deep PROPFIND, then a pool of
+    downloader threads fetches the images. If the server refuses deep
+    listings, a few lister threads walk the tree folder by folder,
+    queueing images as they find them. Every thread gets its own client,
+    and stats/output share one lock.
+
+    etags maps paths relative to local_folder to the ETags of the last
+    run's files, and is updated with this run's.
+    """
+    root = Path(local_folder)
+    if etags is None:
+        etags = {}
+    folder_queue = queue.Queue()
+    file_queue = queue.Queue()
+    lock = threading.Lock()
+    local = threading.local()
+
+    def thread_client():
+        if not hasattr(local, 'client'):
+            local.client = clone_client(client)
+        return local.client
+
+    def list_folder(folder, local_path):
+        try:
+            local_path.mkdir(parents=True, exist_ok=True)
+            items = list_with_etags(thread_client(), folder)
+            # One directory read instead of a stat per file
+            local_names = set(os.listdir(local_path))
+        except Exception as e:
+            with lock:
+                log(f"[ERROR] Cannot list {folder}: {e}")
+                stats['errors'] += 1
+            return
+
+        with lock:
+            stats['folders_scanned'] += 1
+
+        for item, etag in items:
+            item_name = item.rstrip('/')
+            remote_path = join_remote(folder, item_name)
+            local_item_path = local_path / item_name
+
+            if item.endswith('/'):
+                with lock:
+                    log(f"[FOLDER] {remote_path}/")
+                folder_queue.put((remote_path, local_item_path))
+                continue
+
+            ext = Path(item_name).suffix.lower()
+            if ext not in IMAGE_EXTENSIONS:
+                continue
+
+            rel_path = local_item_path.relative_to(root).as_posix()
+            with lock:
+                stats['files_found'] += 1
+                conditions = needs_download(rel_path, local_item_path, etag, local_names, etags)
+                if conditions is None:
+                    log(f"  [SKIP] {remote_path} (exists)")
+                    stats['files_skipped'] += 1
+                    continue
+
+            file_queue.put((remote_path, local_item_path, rel_path, etag, conditions))
+
+    def lister():
+        while True:
+            task = folder_queue.get()
+            if task is None:
+                break
+            try:
+                list_folder(*task)
+            finally:
+                folder_queue.task_done()
+
+    def downloader():
+        while True:
+            task = file_queue.get()
+            if task is None:
+                break
+            remote_path, local_item_path, rel_path, etag, conditions = task
+            try:
+                size = download_file(thread_client(), remote_path, local_item_path, conditions)
+                with lock:
+                    if size is None:
+                        log(f"  [SKIP] {remote_path} (unchanged)")
+                        stats['files_skipped'] += 1
+                        etags[rel_path] = etag or conditions.get('If-None-Match')
+                        continue
+                    etags[rel_path] = etag
+                    stats['files_downloaded'] += 1
+                    stats['total_size'] += size
+                    log(f"  [DOWNLOAD] {remote_path} OK ({size // 1024} KB)")
+            except Exception as e:
+                with lock:
+                    log(f"  [DOWNLOAD] {remote_path} ERROR: {e}")
+                    stats['errors'] += 1
+
+    def list_deep():
+        """Queue the images from one deep listing; False if the server refuses it."""
+        try:
+            entries = list_tree(client, remote_folder)
+        except (ResponseErrorCode, MethodNotSupported) as e:
+            log(f"[LIST] Deep listing refused ({e}), listing folder by folder")
+            return False
+        except Exception as e:
+            log(f"[ERROR] Cannot list {remote_folder}: {e}")
+            stats['errors'] += 1
+            return True
+
+        try:
+            downloads = plan_tree_downloads(entries, remote_folder, root, stats, etags)
+        except OSError as e:
+            log(f"[ERROR] Cannot create {local_folder}: {e}")
+            stats['errors'] += 1
+            return True
+
+        # The downloaders are idle until now, so stats needed no lock above
+        for task in downloads:
+            file_queue.put(task)
+        return True
+
+    downloaders = [threading.Thread(target=downloader) for _ in range(max(1, workers))]
+    for thread in downloaders:
+        thread.start()
+
+    if not list_deep():
+        listers = [threading.Thread(target=lister) for _ in range(LISTER_WORKERS)]
+        for thread in listers:
+            thread.start()
+
+        folder_queue.put((remote_folder, root))
+
+        # Every folder has been listed (and its subfolders queued) once the
+        # folder queue drains; then the listers can stop
+        folder_queue.join()
+        for _ in listers:
+            folder_queue.put(None)
+        for thread in listers:
+            thread.join()
+
+    for _ in downloaders:
+        file_queue.put(None)
+    for thread in downloaders:
+        thread.join()
+
+
+async def _read_chunks(path):
+    """Read a file in 1MB blocks, off the event loop."""
+    with await asyncio.to_thread(open, path, 'rb') as f:
+        while chunk := await asyncio.to_thread(f.read, DOWNLOAD_BUFFER_SIZE):
+            yield chunk
+
+
+class AsyncWebDAV:
+    """
+    WebDAV requests over one async HTTP client.
+
+    Lets hundreds of listings and transfers share a single thread, so one
+    slow request no longer holds up the rest.
+    """
+
+    def __init__(self, client, connections):
+        self.base_url = client.webdav.hostname.rstrip('/')
+        self.http = httpx.AsyncClient(
+            auth=(client.webdav.login, client.webdav.password),
+            limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections),
+            timeout=120
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.http.aclose()
+
+    def url(self, path, folder=False):
+        url = f"{self.base_url}/{quote(path.strip('/'))}"
+        return url.rstrip('/') + '/' if folder else url
+
+    async def _propfind(self, path, depth):
+        """
+        PROPFIND a folder.
+
+        Returns:
+            List of (path relative to the folder, is_folder, etag) for its
+            contents, down to the given depth
+        """
+        url = self.url(path, folder=True)
+        response = await self.http.request(
+            'PROPFIND', url, content=PROPFIND_BODY,
+            headers={'Depth': depth, 'Content-Type': 'application/xml'}
+        )
+        response.raise_for_status()
+
+        own_path = unquote(urlparse(url).path)
+        entries = []
+        for item in ET.fromstring(response.content).iter('{DAV:}response'):
+            item_path = unquote(urlparse(item.findtext('{DAV:}href', '')).path).rstrip('/')
+            if not item_path.startswith(own_path):
+                continue  # The folder itself
+            entries.append((
+                item_path[len(own_path):],
+                item.find('.//{DAV:}collection') is not None,
+                item.findtext('.//{DAV:}getetag'),
+            ))
+        return entries
+
+    async def propfind(self, path):
+        """
+        List a folder's contents along with their ETags.
+
+        Returns:
+            List of (item, etag), item names with a trailing '/' on subfolders
+        """
+        return [(f"{name}/" if is_folder else name, etag)
+                for name, is_folder, etag in await self._propfind(path, '1')]
+
+    async def propfind_tree(self, path):
+        """
+        List everything under a folder with one Depth: infinity PROPFIND.
+
+        Returns:
+            List of (path relative to the folder, is_folder, etag)
+        """
+        return await self._propfind(path, 'infinity')
+
+    async def get(self, path, local_path, conditions=None):
+        """
+        Download a file, streaming it to a .part file in 1MB blocks.
+
+        Disk writes run off the event loop, and the .part file is removed
+        if the download fails. conditions are the conditional request
+        headers for a local copy, from needs_download.
+
+        Returns:
+            Size of the file in bytes, or None if the local copy is current
+        """
+        part_path = local_path.with_name(local_path.name + '.part')
+        try:
+            async with self.http.stream('GET', self.url(path), headers=conditions) as response:
+                if response.status_code == 304:
+                    return None
+                response.raise_for_status()
+                f = await asyncio.to_thread(open, part_path, 'wb')
+                try:
+                    async for chunk in response.aiter_bytes(DOWNLOAD_BUFFER_SIZE):
+                        await asyncio.to_thread(f.write, chunk)
+                finally:
+                    await asyncio.to_thread(f.close)
+            await asyncio.to_thread(os.replace, part_path, local_path)
+        except BaseException:
+            # Also on cancellation, so no await
+            part_path.unlink(missing_ok=True)
+            raise
+        set_mtime(local_path, response.headers.get('Last-Modified'))
+        return local_path.stat().st_size
+
+    async def put(self, local_path, path, overwrite=False):
+        """
+        Upload a file.
+
+        Without overwrite, the PUT is conditional so the server refuses it
+        if the file exists. Callers still skip files a folder listing shows,
+        as not every server honours the precondition.
+
+        Returns:
+            (result, size in bytes) - result is 'uploaded' or 'skipped'
+        """
+        size = Path(local_path).stat().st_size
+        headers = {'Content-Length': str(size)}
+        if not overwrite:
+            headers['If-None-Match'] = '*'
+        response = await self.http.put(self.url(path), content=_read_chunks(local_path),
+                                       headers=headers)
+        if response.status_code == 412:
+            return 'skipped', 0
+        response.raise_for_status()
+        return 'uploaded', size
+
+    async def mkcol(self, path):
+        """
+        Create a folder; an existing folder is fine.
+
+        Returns:
+            True if the folder was created, False if it already existed
+        """
+        response = await self.http.request('MKCOL', self.url(path, folder=True))
+        if response.status_code == 405:  # Already exists
+            return False
+        response.raise_for_status()
+        return True
+
 
+async def upload_folder_async(client, local_folder, remote_folder, recursive=False,
+                              overwrite=False, workers=DEFAULT_WORKERS):
+    """Upload all images from a local folder to WA, all on the event loop."""
     local_path = Path(local_folder)
-    local_path.mkdir(parents=True, exist_ok=True)
+    if not local_path.exists():
+        log(f"[ERROR] Folder not found: {local_folder}")
+        return {'uploaded': 0, 'skipped': 0, 'errors': 0}
+
+    stats = {'uploaded': 0, 'skipped': 0, 'errors': 0, 'total_size': 0}
+    uploads, folders = plan_uploads(local_path, remote_folder, recursive)
+    semaphore = asyncio.Semaphore(max(1, workers))
+
+    async with AsyncWebDAV(client, max(1, workers)) as dav:
+        # Create every remote folder once, parents first. A new folder is
+        # empty; without overwrite, each existing one is listed once, as
+        # upload_folder does, so skipping doesn't rest on the server
+        # honouring If-None-Match
+        existing = {}
+        for folder in folders:
+            try:
+                if await dav.mkcol(folder):
+                    log(f"[CREATE] Remote folder: {folder}")
+                    existing[folder] = set()
+            except httpx.HTTPError as e:
+                log(f"[ERROR] Cannot create {folder}: {e}")
+
+        if not overwrite:
+            async def list_names(folder):
+                try:
+                    async with semaphore:
+                        items = await dav.propfind(folder)
+                except httpx.HTTPError as e:
+                    log(f"[ERROR] Cannot list {folder}: {e}")
+                    return
+                existing[folder] = {item.rstrip('/') for item, _ in items}
+
+            await asyncio.gather(*(list_names(folder) for folder in folders
+                                   if folder not in existing))
+
+        log(f"Found {len(uploads)} images to upload")
+        log("-" * 50)
+
+        async def upload(local_file, target_folder):
+            if not overwrite and local_file.name in existing.get(target_folder, ()):
+                log(f"  [SKIP] {local_file.name} (already exists, use --overwrite)")
+                stats['skipped'] += 1
+                return
+
+            remote_path = join_remote(target_folder, local_file.name)
+            try:
+                async with semaphore:
+                    result, size = await dav.put(local_file, remote_path, overwrite)
+            except (OSError, httpx.HTTPError) as e:
+                log(f"  [UPLOAD] {local_file.name} ERROR: {e}")
+                stats['errors'] += 1
+                return
+
+            if result == 'skipped':
+                log(f"  [SKIP] {local_file.name} (already exists, use --overwrite)")
+                stats['skipped'] += 1
+            else:
+                log(f"  [UPLOAD] {local_file.name} OK ({size // 1024} KB)")
+                stats['uploaded'] += 1
+                stats['total_size'] += size
+
+        await asyncio.gather(*(upload(*item) for item in uploads))
 
+    return stats
+
+
+async def download_one(dav, semaphore, stats, etags, remote_path, local_item_path, rel_path,
+                       etag, conditions):
+    """Download one image, recording its ETag."""
     try:
-        items = client.list(remote_folder)
-        stats['folders_scanned'] += 1
-    except Exception as e:
-        print(f"{indent}[ERROR] Cannot list {remote_folder}: {e}")
+        async with semaphore:
+            size = await dav.get(remote_path, local_item_path, conditions)
+    except (OSError, httpx.HTTPError) as e:
+        log(f"  [DOWNLOAD] {remote_path} ERROR: {e}")
         stats['errors'] += 1
         return
+    if size is None:
+        log(f"  [SKIP] {remote_path} (unchanged)")
+        stats['files_skipped'] += 1
+        etags[rel_path] = etag or conditions.get('If-None-Match')
+        return
+    etags[rel_path] = etag
+    stats['files_downloaded'] += 1
+    stats['total_size'] += size
+    log(f"  [DOWNLOAD] {remote_path} OK ({size // 1024} KB)")
+
+
+async def download_tree_async(dav, remote_folder, local_path, stats, semaphore, recursive=True,
+                              root=None, etags=None):
+    """
+    List a folder, then download its images and walk its subfolders concurrently.
+
+    etags maps paths relative to root to the ETags of the last run's
+    files, and is updated with this run's.
+    """
+    root = root or local_path
+    etags = {} if etags is None else etags
+    try:
+        await asyncio.to_thread(local_path.mkdir, parents=True, exist_ok=True)
+        async with semaphore:
+            items = await dav.propfind(remote_folder)
+        # One directory read instead of a stat per file
+        local_names = set(await asyncio.to_thread(os.listdir, local_path))
+    except (OSError, httpx.HTTPError) as e:
+        log(f"[ERROR] Cannot list {remote_folder}: {e}")
+        stats['errors'] += 1
+        return
+    stats['folders_scanned'] += 1
 
-    # Filter out the current directory marker
-    items = [i for i in items if i and i != remote_folder.split('/')[-1] + '/']
-
-    for item in items:
+    tasks = []
+    for item, etag in items:
         item_name = item.rstrip('/')
-        remote_path = f"{remote_folder}/{item_name}".replace('//', '/')
+        remote_path = join_remote(remote_folder, item_name)
         local_item_path = local_path / item_name
 
         if item.endswith('/'):
-            print(f"{indent}[FOLDER] {item_name}/")
-            download_folder_recursive(client, remote_path, str(local_item_path), stats, depth + 1)
-        else:
-            ext = Path(item_name).suffix.lower()
-            if ext not in IMAGE_EXTENSIONS:
-                continue
-
-            stats['files_found'] += 1
-
-            if local_item_path.exists():
-                print(f"{indent}  [SKIP] {item_name} (exists)")
-                stats['files_skipped'] += 1
+            if not recursive:
+                log(f"  [FOLDER] {item} (use --recursive)")
                 continue
-
-            print(f"{indent}  [DOWNLOAD] {item_name}...", end=' ', flush=True)
+            log(f"[FOLDER] {remote_path}/")
+            tasks.append(download_tree_async(dav, remote_path, local_item_path, stats, semaphore,
+                                             root=root, etags=etags))
+            continue
+
+        ext = Path(item_name).suffix.lower()
+        if ext not in IMAGE_EXTENSIONS:
+            continue
+
+        stats['files_found'] += 1
+        rel_path = local_item_path.relative_to(root).as_posix()
+        conditions = needs_download(rel_path, local_item_path, etag, local_names, etags)
+        if conditions is None:
+            log(f"  [SKIP] {remote_path} (exists)")
+            stats['files_skipped'] += 1
+            continue
+
+        tasks.append(download_one(dav, semaphore, stats, etags, remote_path, local_item_path,
+                                  rel_path, etag, conditions))
+
+    await asyncio.gather(*tasks)
+
+
+async def download_folder_async(client, remote_folder, local_folder, stats, recursive=True,
+                                workers=DOWNLOAD_WORKERS, etags=None):
+    """
+    Download a folder (and its subfolders if recursive) on the event loop.
+
+    A recursive download lists the whole tree with one deep PROPFIND,
+    falling back to walking it folder by folder if the server refuses.
+    """
+    root = Path(local_folder)
+    etags = {} if etags is None else etags
+    semaphore = asyncio.Semaphore(max(1, workers))
+
+    async with AsyncWebDAV(client, max(1, workers)) as dav:
+        if recursive:
             try:
-                client.download_sync(remote_path, str(local_item_path))
-                size = local_item_path.stat().st_size if local_item_path.exists() else 0
-                stats['files_downloaded'] += 1
-                stats['total_size'] += size
-                print(f"OK ({size // 1024} KB)")
-            except Exception as e:
-                print(f"ERROR: {e}")
+                entries = await dav.propfind_tree(remote_folder)
+            except httpx.HTTPStatusError as e:
+                log(f"[LIST] Deep listing refused ({e.response.status_code}), listing folder by folder")
+                entries = None
+            except httpx.HTTPError as e:
+                log(f"[ERROR] Cannot list {remote_folder}: {e}")
                 stats['errors'] += 1
+                return
+
+            if entries is not None:
+                try:
+                    downloads = await asyncio.to_thread(plan_tree_downloads, entries, remote_folder,
+                                                        root, stats, etags)
+                except OSError as e:
+                    log(f"[ERROR] Cannot create {local_folder}: {e}")
+                    stats['errors'] += 1
+                    return
+                await asyncio.gather(*(download_one(dav, semaphore, stats, etags, *task)
+                                       for task in downloads))
+                return
+
+        await download_tree_async(dav, remote_folder, root, stats, semaphore, recursive,
+                                  etags=etags)
 
 
 def cmd_upload(args, client):
@@ -204,14 +1036,22 @@ def cmd_upload(args, client):
 
     if source.is_file():
         # Single file upload
-        if upload_file(client, source, args.folder, args.overwrite):
+        result, _ = upload_file(client, source, args.folder, args.overwrite)
+        flush_log()
+        if result == 'uploaded':
             print("\n[SUCCESS] File uploaded")
         else:
             print("\n[FAILED] Upload failed")
     else:
         # Folder upload
-        stats = upload_folder(client, args.source, args.folder, args.recursive, args.overwrite)
+        if HTTPX_SUPPORT:
+            stats = asyncio.run(upload_folder_async(client, args.source, args.folder, args.recursive,
+                                                    args.overwrite, workers=args.workers))
+        else:
+            stats = upload_folder(client, args.source, args.folder, args.recursive, args.overwrite,
+                                  workers=args.workers)
 
+        flush_log()
         print("-" * 50)
         print("[SUMMARY]")
         print(f"  Uploaded: {stats['uploaded']}")
@@ -247,16 +1087,37 @@ def cmd_download(args, client):
         print(f"[ERROR] Cannot access folder: {e}")
         return
 
-    if args.recursive:
-        download_folder_recursive(client, args.folder, args.output, stats)
+    # ETags of the files the last run into this folder saw, so unchanged
+    # files are skipped and changed ones fetched again
+    manifest_path = Path(args.output) / '_download_manifest.json'
+    source = f"https://{args.site}/resources/{args.folder}"
+    etags = {}
+    try:
+        with open(manifest_path) as f:
+            previous = json.load(f)
+        files = previous.get('files')
+        # Only a path -> ETag mapping gives O(1) lookups; ignore anything else
+        if previous.get('source') == source and isinstance(files, dict):
+            etags = files
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    if HTTPX_SUPPORT:
+        asyncio.run(download_folder_async(client, args.folder, args.output, stats,
+                                          recursive=args.recursive, workers=args.workers,
+                                          etags=etags))
+    elif args.recursive:
+        download_folder_recursive(client, args.folder, args.output, stats, workers=args.workers,
+                                  etags=etags)
     else:
         local_path = Path(args.output)
         local_path.mkdir(parents=True, exist_ok=True)
+        local_names = set(os.listdir(local_path))
 
-        items = client.list(args.folder)
-        for item in items:
+        items = list_with_etags(client, args.folder)
+        for item, etag in items:
             if item.endswith('/'):
-                print(f"  [FOLDER] {item} (use --recursive)")
+                log(f"  [FOLDER] {item} (use --recursive)")
                 continue
 
             item_name = item.rstrip('/')
@@ -265,23 +1126,31 @@ def cmd_download(args, client):
                 continue
 
             stats['files_found'] += 1
-            remote_path = f"{args.folder}/{item_name}"
+            remote_path = join_remote(args.folder, item_name)
             local_file = local_path / item_name
 
-            if local_file.exists():
-                print(f"  [SKIP] {item_name} (exists)")
+            conditions = needs_download(item_name, local_file, etag, local_names, etags)
+            if conditions is None:
+                log(f"  [SKIP] {item_name} (exists)")
                 stats['files_skipped'] += 1
                 continue
 
-            print(f"  [DOWNLOAD] {item_name}...", end=' ', flush=True)
             try:
-                client.download_sync(remote_path, str(local_file))
+                size = download_file(client, remote_path, local_file, conditions)
+                if size is None:
+                    stats['files_skipped'] += 1
+                    etags[item_name] = etag or conditions.get('If-None-Match')
+                    log(f"  [SKIP] {item_name} (unchanged)")
+                    continue
+                etags[item_name] = etag
                 stats['files_downloaded'] += 1
-                print("OK")
+                stats['total_size'] += size
+                log(f"  [DOWNLOAD] {item_name} OK ({size // 1024} KB)")
             except Exception as e:
-                print(f"ERROR: {e}")
+                log(f"  [DOWNLOAD] {item_name} ERROR: {e}")
                 stats['errors'] += 1
 
+    flush_log()
     print("-" * 50)
     print("[SUMMARY]")
     print(f"  Folders scanned: {stats['folders_scanned']}")
@@ -292,14 +1161,18 @@ def cmd_download(args, client):
     print(f"  Total size: {stats['total_size'] // (1024*1024)} MB")
 
     # Save manifest
-    manifest_path = Path(args.output) / '_download_manifest.json'
     manifest = {
-        'source': f"https://{args.site}/resources/{args.folder}",
+        'source': source,
         'downloaded_at': datetime.now().isoformat(),
-        'stats': stats
+        'stats': stats,
+        'files': etags
     }
-    with open(manifest_path, 'w') as f:
-        json.dump(manifest, f, indent=2)
+    # Written compactly to a temp file and swapped in, so a crash mid-write
+    # can't leave a corrupt manifest for the next run
+    tmp_path = manifest_path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, separators=(',', ':'))
+    os.replace(tmp_path, manifest_path)
     print(f"\n[MANIFEST] Saved to: {manifest_path}")
 
 
@@ -366,6 +1239,8 @@ Examples:
     dl_parser.add_argument('--folder', required=True, help='Remote folder path')
     dl_parser.add_argument('--output', required=True, help='Local output directory')
     dl_parser.add_argument('--recursive', '-r', action='store_true', help='Download recursively')
+    dl_parser.add_argument('--workers', type=int, default=DOWNLOAD_WORKERS,
+                           help=f'Parallel downloads (default: {DOWNLOAD_WORKERS})')
 
     # Upload command
     ul_parser = subparsers.add_parser('upload', help='Upload photos to WA')
@@ -373,6 +1248,8 @@ Examples:
     ul_parser.add_argument('--folder', required=True, help='Remote folder path')
     ul_parser.add_argument('--recursive', '-r', action='store_true', help='Upload subfolders too')
     ul_parser.add_argument('--overwrite', action='store_true', help='Overwrite existing files')
+    ul_parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                           help=f'Parallel uploads (default: {DEFAULT_WORKERS})')
 
     # List command
     ls_parser = subparsers.add_parser('list', help='List folder contents')
@@ -394,7 +1271,8 @@ Examples:
 
     # Create client
     print(f"[CONNECT] {args.site}")
-    client = get_webdav_client(args.site, username, password)
+    client = get_webdav_client(args.site, username, password,
+                               connections=getattr(args, 'workers', 1) + LISTER_WORKERS)
 
     # Run command
     if args.command == 'download':